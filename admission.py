@@ -0,0 +1,200 @@
+"""
+Cost-aware admission control.
+
+Every processing request is priced before it runs: the upload bytes it holds
+(memory) and the pages it will touch (CPU). Pages are estimated from file sizes
+(ZIP members from the archive's central directory), so pricing never opens or
+decompresses a document; once a job has run, its ticket is refined with the
+pages it actually processed. Work is admitted while the total in
+flight fits the configured budget; the rest waits in a bounded FIFO queue, and
+when that queue is full the request is rejected with ``429 Too Many Requests``
+and a ``Retry-After`` estimated from recent throughput. A request larger than
+the whole budget still runs, but only when nothing else is in flight.
+
+Cached results are served without going through admission.
+
+Configuration (environment variables):
+- ``DISCOVERY_ADMISSION_MAX_PAGES``: pages in flight (default: 4000; ``0`` = no limit).
+- ``DISCOVERY_ADMISSION_MAX_BYTES``: upload bytes in flight (default: 512 MiB; ``0`` = no limit).
+- ``DISCOVERY_ADMISSION_QUEUE_DEPTH``: requests allowed to wait (default: 16).
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import math
+import os
+import zipfile
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+# Throughput assumed before any job has finished (seconds per page)
+DEFAULT_SECONDS_PER_PAGE = 0.05
+# PDF bytes priced as one page: small for text pages, a fraction of a scanned one
+ESTIMATED_BYTES_PER_PAGE = 32 * 1024
+_PAGE_EXTS = {".pdf", ".jpg", ".jpeg", ".png", ".tif", ".tiff"}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass(frozen=True)
+class Cost:
+    pages: int
+    bytes: int
+
+
+def _estimated_pages(name: str, size: int) -> int:
+    if name.lower().endswith(".pdf"):
+        return max(1, math.ceil(size / ESTIMATED_BYTES_PER_PAGE))
+    return 1
+
+
+def _estimate(file_pairs: List[Tuple[str, Any]]) -> Cost:
+    size = pages = 0
+    for name, src in file_pairs:
+        is_bytes = isinstance(src, (bytes, bytearray))
+        n = len(src) if is_bytes else Path(src).stat().st_size
+        size += n
+        if name.lower().endswith(".zip"):
+            try:
+                with zipfile.ZipFile(io.BytesIO(src) if is_bytes else src) as zf:  # central directory only
+                    pages += sum(_estimated_pages(i.filename, i.file_size) for i in zf.infolist()
+                                 if not i.is_dir() and Path(i.filename).suffix.lower() in _PAGE_EXTS)
+            except (zipfile.BadZipFile, OSError):
+                pages += 1
+        else:
+            pages += _estimated_pages(name, n)
+    return Cost(pages=pages, bytes=size)
+
+
+async def estimate(file_pairs: List[Tuple[str, Any]]) -> Cost:
+    """Price spooled uploads: total size plus pages estimated from file sizes (run off the event loop)."""
+    return await asyncio.to_thread(_estimate, file_pairs)
+
+
+class Ticket:
+    """A place in line. `wait()` returns once admitted; `release()` frees the budget (idempotent)."""
+
+    def __init__(self, controller: "AdmissionController", cost: Cost):
+        self.controller = controller
+        self.cost = cost
+        self.admitted = False
+        self.released = False
+        self.admitted_at: Optional[float] = None
+        self._event = asyncio.Event()
+
+    async def wait(self) -> None:
+        await self._event.wait()
+
+    def refine(self, pages: int) -> None:
+        """Replace the estimated page count with the pages actually processed."""
+        self.controller._refine(self, pages)
+
+    def release(self) -> None:
+        self.controller._release(self)
+
+
+class AdmissionController:
+    def __init__(self, max_pages: Optional[int] = None, max_bytes: Optional[int] = None,
+                 queue_depth: Optional[int] = None):
+        self.max_pages = max_pages if max_pages is not None else _env_int("DISCOVERY_ADMISSION_MAX_PAGES", 4000)
+        self.max_bytes = max_bytes if max_bytes is not None else _env_int("DISCOVERY_ADMISSION_MAX_BYTES", 512 * 1024 ** 2)
+        self.queue_depth = queue_depth if queue_depth is not None else _env_int("DISCOVERY_ADMISSION_QUEUE_DEPTH", 16)
+        self.pages_in_flight = 0
+        self.bytes_in_flight = 0
+        self.running = 0
+        self.rejected = 0
+        self.seconds_per_page = DEFAULT_SECONDS_PER_PAGE
+        self._queue: Deque[Ticket] = deque()
+
+    def _fits(self, cost: Cost) -> bool:
+        if self.running == 0:
+            return True  # oversized requests run alone rather than never
+        if self.max_pages and self.pages_in_flight + cost.pages > self.max_pages:
+            return False
+        if self.max_bytes and self.bytes_in_flight + cost.bytes > self.max_bytes:
+            return False
+        return True
+
+    def _admit(self, ticket: Ticket) -> None:
+        ticket.admitted = True
+        ticket.admitted_at = time.monotonic()
+        self.running += 1
+        self.pages_in_flight += ticket.cost.pages
+        self.bytes_in_flight += ticket.cost.bytes
+        ticket._event.set()
+
+    def _drain(self) -> None:
+        # Strict FIFO: a big request at the head is not starved by smaller ones behind it
+        while self._queue and self._fits(self._queue[0].cost):
+            self._admit(self._queue.popleft())
+
+    def retry_after(self) -> int:
+        """Seconds until the queue has likely moved, from recent seconds-per-page."""
+        pages = self.pages_in_flight + sum(t.cost.pages for t in self._queue)
+        return max(1, math.ceil(pages * self.seconds_per_page))
+
+    def reserve(self, cost: Cost) -> Ticket:
+        """Admit now, queue, or raise 429 (with Retry-After) when the queue is full."""
+        ticket = Ticket(self, cost)
+        if not self._queue and self._fits(cost):
+            self._admit(ticket)
+        elif len(self._queue) < self.queue_depth:
+            self._queue.append(ticket)
+        else:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Server is busy; please retry later.",
+                headers={"Retry-After": str(self.retry_after())},
+            )
+        return ticket
+
+    def _refine(self, ticket: Ticket, pages: int) -> None:
+        if ticket.admitted and not ticket.released:
+            self.pages_in_flight += pages - ticket.cost.pages
+        ticket.cost = Cost(pages=pages, bytes=ticket.cost.bytes)
+
+    def _release(self, ticket: Ticket) -> None:
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.admitted:
+            self.running -= 1
+            self.pages_in_flight -= ticket.cost.pages
+            self.bytes_in_flight -= ticket.cost.bytes
+            if ticket.cost.pages and ticket.admitted_at is not None:
+                observed = (time.monotonic() - ticket.admitted_at) / ticket.cost.pages
+                self.seconds_per_page = 0.8 * self.seconds_per_page + 0.2 * observed
+        else:
+            try:
+                self._queue.remove(ticket)
+            except ValueError:
+                pass
+        self._drain()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": len(self._queue),
+            "queue_depth": self.queue_depth,
+            "pages_in_flight": self.pages_in_flight,
+            "bytes_in_flight": self.bytes_in_flight,
+            "queued_pages": sum(t.cost.pages for t in self._queue),
+            "queued_bytes": sum(t.cost.bytes for t in self._queue),
+            "max_pages": self.max_pages,
+            "max_bytes": self.max_bytes,
+            "rejected": self.rejected,
+            "seconds_per_page": round(self.seconds_per_page, 4),
+            "retry_after": self.retry_after(),
+        }
@@ -0,0 +1,527 @@
+"""
+Benchmarks for the Discovery One-Stop API.
+
+Usage:
+    python benchmark.py latency [--pages 800] [--workers N]
+    python benchmark.py ttfb [--files 40] [--pages 25]
+    python benchmark.py stamp [--files 10] [--pages 100] [--repeat 3] [--workers 1,4]
+    python benchmark.py photos [--files 5] [--megapixels 12] [--repeat 3]
+    python benchmark.py compact [--files 20] [--pages 50] [--repeat 3]
+    python benchmark.py scan [--pages 500] [--repeat 3] [--literals 10 100 2000]
+    python benchmark.py ranges [--pages 1000] [--repeat 1] [--workers 1,4]
+    python benchmark.py redact [--files 40] [--pages 5] [--repeat 1] [--workers 1,4]
+
+Each scenario prints a short report to stdout. Scenarios build their own
+synthetic inputs with ReportLab, so no sample corpus is required.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+
+def make_pdf(pages: int, text: str = "Sample page") -> bytes:
+    """Build a simple text PDF with the given number of pages."""
+    from reportlab.pdfgen import canvas
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    for i in range(pages):
+        c.drawString(72, 720, f"{text} {i + 1}")
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(env_overrides: dict) -> tuple:
+    port = _free_port()
+    env = dict(os.environ, **{k: str(v) for k, v in env_overrides.items()})
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{base}/", timeout=1)
+            return proc, base
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def _pct(values, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+# -----------------------------------------------------------------------------
+# latency: health-check latency while a heavy /bates job runs
+# -----------------------------------------------------------------------------
+def bench_latency(args) -> None:
+    env = {}
+    if args.workers is not None:
+        env["DISCOVERY_WORKERS"] = args.workers
+    proc, base = _start_server(env)
+    try:
+        pdf = make_pdf(args.pages)
+        # Warm up the worker pool so process start-up is not measured
+        requests.post(f"{base}/bates", files={"files": ("warm.pdf", make_pdf(1), "application/pdf")})
+
+        idle = []
+        for _ in range(20):
+            t0 = time.perf_counter()
+            requests.get(f"{base}/")
+            idle.append(time.perf_counter() - t0)
+
+        heavy = {}
+        def _heavy():
+            t0 = time.perf_counter()
+            r = requests.post(
+                f"{base}/bates",
+                files={"files": ("big.pdf", pdf, "application/pdf")},
+                data={"zone": "Bottom Center (Z2)"},
+            )
+            heavy["status"] = r.status_code
+            heavy["seconds"] = time.perf_counter() - t0
+
+        t = threading.Thread(target=_heavy)
+        t.start()
+        busy = []
+        while t.is_alive():
+            t0 = time.perf_counter()
+            requests.get(f"{base}/")
+            busy.append(time.perf_counter() - t0)
+            time.sleep(0.05)
+        t.join()
+
+        print(f"heavy /bates job: {args.pages} pages, status {heavy.get('status')}, {heavy.get('seconds', 0):.2f}s")
+        for name, vals in (("idle", idle), ("during job", busy)):
+            print(
+                f"GET / {name:>10}: n={len(vals):4d}  "
+                f"p50={_pct(vals, 0.5) * 1000:7.1f}ms  "
+                f"p95={_pct(vals, 0.95) * 1000:7.1f}ms  "
+                f"max={max(vals) * 1000 if vals else 0:7.1f}ms  "
+                f"mean={statistics.mean(vals) * 1000 if vals else 0:7.1f}ms"
+            )
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+# -----------------------------------------------------------------------------
+# ttfb: time to first byte vs. total time for a multi-file /unlock job
+# (/bates and /redact wait for the finished archive: they send summary headers)
+# -----------------------------------------------------------------------------
+UNLOCK_FORM = {"password_mode": "Try no password (for unencrypted files)"}
+
+
+def bench_ttfb(args) -> None:
+    results = {}
+    for label, stream in (("buffered", "0"), ("streamed", "1")):
+        proc, base = _start_server({"DISCOVERY_STREAM_RESULTS": stream})
+        try:
+            requests.post(f"{base}/unlock", files={"files": ("warm.pdf", make_pdf(1), "application/pdf")},
+                          data=UNLOCK_FORM)
+            pdf = make_pdf(args.pages)
+            files = [("files", (f"doc_{i:03d}.pdf", pdf, "application/pdf")) for i in range(args.files)]
+            t0 = time.perf_counter()
+            with requests.post(f"{base}/unlock", files=files, data=UNLOCK_FORM, stream=True) as r:
+                first = None
+                size = 0
+                for chunk in r.iter_content(64 * 1024):
+                    if first is None:
+                        first = time.perf_counter() - t0
+                    size += len(chunk)
+            results[label] = (first or 0.0, time.perf_counter() - t0, size)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    print(f"/unlock: {args.files} files x {args.pages} pages")
+    for label, (ttfb, total, size) in results.items():
+        print(f"{label:>9}: ttfb={ttfb:6.2f}s  total={total:6.2f}s  bytes={size}")
+
+
+# -----------------------------------------------------------------------------
+# stamp: Bates stamping throughput per engine (in process, no server)
+# -----------------------------------------------------------------------------
+def bench_stamp(args) -> None:
+    import logic
+
+    pdf = make_pdf(args.pages)
+    files = [(f"doc_{i:03d}.pdf", pdf) for i in range(args.files)]
+    total_pages = args.files * args.pages
+    options = dict(prefix="J.DOE", start_num=1, digits=8, font_name="Helvetica", font_size=12,
+                   zone="Bottom Center (Z2)", color_rgb=(0, 0, 255))
+
+    print(f"Bates stamping: {args.files} files x {args.pages} pages, best of {args.repeat}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        pool = None
+        if workers > 1:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            logic.walk_and_label(files[:workers], executor=pool, **options)  # start the workers
+        try:
+            for engine in logic.BATES_ENGINES:
+                best = float("inf")
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    logic.walk_and_label(files, engine=engine, executor=pool, **options)
+                    best = min(best, time.perf_counter() - t0)
+                print(f"{engine:>8} x{workers:<3}: {best:7.2f}s  {total_pages / best:8.0f} pages/s")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+
+# -----------------------------------------------------------------------------
+# photos: image stamping throughput for large phone photos (in process)
+# -----------------------------------------------------------------------------
+def make_photo(megapixels: float) -> bytes:
+    """A noisy 4:3 JPEG of about `megapixels`, tagged portrait via EXIF like a phone photo."""
+    import numpy as np
+    from PIL import Image
+    w = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    h = w * 3 // 4
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:h, 0:w]
+    base = np.stack([x * 255 // w, y * 255 // h, (x + y) * 255 // (w + h)], -1)
+    pixels = np.clip(base + rng.integers(-20, 20, base.shape), 0, 255).astype(np.uint8)
+    exif = Image.Exif()
+    exif[0x0112] = 6  # orientation: rotate 90 degrees on display
+    buf = io.BytesIO()
+    Image.fromarray(pixels, "RGB").save(buf, "JPEG", quality=90, exif=exif.tobytes())
+    return buf.getvalue()
+
+
+def bench_photos(args) -> None:
+    import logic
+
+    photo = make_photo(args.megapixels)
+    files = [(f"IMG_{i:04d}.jpg", photo) for i in range(args.files)]
+    options = dict(prefix="J.DOE", start_num=1, digits=8, font_name="Helvetica", font_size=12,
+                   zone="Bottom Center (Z2)", color_rgb=(0, 0, 255), left_punch_margin=36.0, border_all_pt=9.0)
+
+    print(f"Image stamping: {args.files} photos x {args.megapixels:g} MP, best of {args.repeat}")
+    for quality, optimize in ((logic.JPEG_QUALITY, True), (logic.JPEG_QUALITY, False), (85, False)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            _, _, pairs, _ = logic.walk_and_label(files, jpeg_quality=quality, jpeg_optimize=optimize, **options)
+            best = min(best, time.perf_counter() - t0)
+        size = sum(len(b) for _, b in pairs) / len(pairs) / 1024 ** 2
+        print(f"quality {quality:>3} optimize {str(optimize):<5}: {best / args.files:6.2f}s/photo  {size:5.1f} MiB/photo")
+
+
+# -----------------------------------------------------------------------------
+# compact: labeled PDF size and stamping time per output profile
+# -----------------------------------------------------------------------------
+def make_text_pdf(pages: int, seed: int) -> bytes:
+    """A text-heavy PDF: 50 lines of varied words per page."""
+    import random
+    from reportlab.pdfgen import canvas
+    rnd = random.Random(seed)
+    words = ("court motion discovery plaintiff defendant exhibit order hearing deposition counsel "
+             "record witness agreement payment invoice account statement letter the of and to").split()
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    for _ in range(pages):
+        text = c.beginText(72, 760)
+        text.setFont("Times-Roman", 11)
+        for _ in range(50):
+            text.textLine(" ".join(rnd.choice(words) for _ in range(12)) + f" {rnd.randint(1, 99999)}")
+        c.drawText(text)
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def make_scan_pdf(pages: int) -> bytes:
+    """A scanned-style PDF: one small grayscale JPEG per page plus a text line."""
+    from PIL import Image
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+    img = io.BytesIO()
+    Image.effect_noise((850, 1100), 40).save(img, "JPEG", quality=60)
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    for i in range(pages):
+        img.seek(0)
+        c.drawImage(ImageReader(img), 0, 0, 595, 842)
+        c.drawString(72, 800, f"Scanned page {i + 1}")
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def bench_compact(args) -> None:
+    import zipfile
+    import logic
+
+    # Sample corpus: short and long text PDFs plus some scanned-style PDFs
+    files = []
+    for i in range(args.files):
+        pages = max(1, args.pages * (1 + i % 4) // 4)
+        data = make_scan_pdf(max(1, pages // 5)) if i % 5 == 4 else make_text_pdf(pages, i)
+        files.append((f"doc_{i:03d}.pdf", data))
+    total_pages = sum(len(logic.PdfReader(io.BytesIO(b)).pages) for _, b in files)
+    input_mib = sum(len(b) for _, b in files) / 1024 ** 2
+    options = dict(prefix="J.DOE", start_num=1, digits=8, font_name="Helvetica", font_size=12,
+                   zone="Bottom Center (Z2)", color_rgb=(0, 0, 255))
+
+    print(f"Output profiles: {len(files)} files, {total_pages} pages, {input_mib:.2f} MiB of PDFs in, "
+          f"best of {args.repeat}")
+    for engine in logic.BATES_ENGINES:
+        for profile in logic.PDF_OUTPUT_PROFILES:
+            best = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                _, _, zip_bytes, _ = logic.walk_and_label_zip(files, engine=engine, output_profile=profile, **options)
+                best = min(best, time.perf_counter() - t0)
+            with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
+                pdf_mib = sum(i.file_size for i in zf.infolist() if i.filename.endswith(".pdf")) / 1024 ** 2
+            print(f"{engine:>8} {profile:<8}: PDFs {pdf_mib:6.2f} MiB ({pdf_mib / input_mib:4.2f}x input)"
+                  f"  ZIP {len(zip_bytes) / 1024 ** 2:6.2f} MiB  {best:6.2f}s  {total_pages / best:5.0f} pages/s")
+
+
+# -----------------------------------------------------------------------------
+# scan: redaction pattern scanning, one pass per pattern vs one PatternSet pass
+# -----------------------------------------------------------------------------
+SCAN_CUSTOM_REGEX = "\\bexhibit\\s+\\d+\\b\nacct\\s*#?\\d{6,}\n\\b[A-Z]{2}\\d{6}\\b"
+SCAN_LITERALS = "Acme Corp, Jane Roe, 555-0100, Project Falcon, Case 22-cv-1234"
+
+
+def make_pii_pdf(pages: int, seed: int = 0, pii_rate: float = 0.04) -> bytes:
+    """A text-heavy PDF (50 lines per page) with an SSN, phone, email or date on `pii_rate` of the lines."""
+    import random
+    from reportlab.pdfgen import canvas
+    rnd = random.Random(seed)
+    words = ("court motion discovery plaintiff defendant exhibit order hearing deposition counsel "
+             "record witness agreement payment invoice account statement letter the of and to").split()
+    pii = (lambda: f"SSN {rnd.randint(100, 665)}-{rnd.randint(10, 99)}-{rnd.randint(1000, 9999)}",
+           lambda: f"call ({rnd.randint(200, 999)}) {rnd.randint(200, 999)}-{rnd.randint(1000, 9999)}",
+           lambda: f"j.doe{rnd.randint(1, 99)}@example.com",
+           lambda: f"dated {rnd.randint(1, 12)}/{rnd.randint(1, 28)}/20{rnd.randint(10, 24)}")
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, invariant=1)
+    for _ in range(pages):
+        text = c.beginText(72, 760)
+        text.setFont("Times-Roman", 10)
+        for _ in range(50):
+            line = " ".join(rnd.choice(words) for _ in range(12))
+            if rnd.random() < pii_rate:
+                line += " " + rnd.choice(pii)()
+            text.textLine(line)
+        c.drawText(text)
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def bench_scan(args) -> None:
+    import logic
+
+    pdf = make_pii_pdf(args.pages)
+    doc = logic.fitz.open(stream=pdf, filetype="pdf")
+    texts = [page.get_text("text") for page in doc]
+    doc.close()
+    chars = sum(len(t) for t in texts)
+    print(f"Pattern scanning: {args.pages} pages, {chars / len(texts):.0f} characters/page, best of {args.repeat}")
+    sets = (("all presets", list(logic.PRESETS), "", ""),
+            ("presets + 3 regex + 5 literals", list(logic.PRESETS), SCAN_CUSTOM_REGEX, SCAN_LITERALS))
+    for name, presets, regex, literals in sets:
+        patterns = logic.load_patterns(presets, regex, literals, False)
+        pset = logic.pattern_set(patterns)
+        timings = {}
+        for method, scan in (("per pattern", lambda t: [m for p in patterns for m in p.finditer(t)]),
+                             ("PatternSet", lambda t: [m for _, m in pset.finditer(t)])):
+            best = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                hits = sum(len(scan(t)) for t in texts)
+                best = min(best, time.perf_counter() - t0)
+            timings[method] = best
+            print(f"{name:<31} {method:<11}: {best * 1000 / len(texts):6.2f} ms/page  {hits} matches")
+        print(f"{name:<31} speedup    : {timings['per pattern'] / timings['PatternSet']:6.1f}x")
+
+    # Long literal lists (client names, account numbers): one alternation branch each vs the automaton
+    import random
+    rnd = random.Random(1)
+    first = "James Mary Robert Patricia John Jennifer Michael Linda David Elizabeth William Susan".split()
+    last = "Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez Martinez Hernandez Lopez".split()
+    automaton_min = logic.LITERAL_AUTOMATON_MIN
+    for n in args.literals:
+        literals = set()
+        while len(literals) < n:
+            literals.add(f"{rnd.choice(first)} {rnd.choice(last)} {rnd.randint(1, 999)}" if rnd.random() < 0.7
+                         else f"{rnd.randint(100, 999)}-{rnd.randint(1000, 9999)}")
+        patterns = logic.load_patterns([], "", "\n".join(sorted(literals)), False, tolerant_literals=True)
+        name = f"{n} tolerant literals"
+        for method, threshold in (("alternation", n + 1), ("automaton", 1)):
+            logic.LITERAL_AUTOMATON_MIN = threshold
+            pset = logic.PatternSet(patterns)
+            best = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                hits = sum(1 for t in texts for _ in pset.finditer(t))
+                best = min(best, time.perf_counter() - t0)
+            print(f"{name:<31} {method:<11}: {best * 1000 / len(texts):6.2f} ms/page  {hits} matches")
+    logic.LITERAL_AUTOMATON_MIN = automaton_min
+
+    patterns = logic.load_patterns(list(logic.PRESETS), SCAN_CUSTOM_REGEX, SCAN_LITERALS, False)
+    for name, data in (("PII on 4% of lines", pdf), ("PII on every line", make_pii_pdf(args.pages, pii_rate=1.0))):
+        for keep in (0, 4):
+            with logic.collect_metrics() as metrics:
+                t0 = time.perf_counter()
+                _, hits = logic.redact_pdf_bytes(data, patterns, keep)
+                elapsed = time.perf_counter() - t0
+            scan_s = sum(metrics["timings"]["regex_scan"])
+            print(f"redact_pdf_bytes, {name}, keep_last_digits={keep}: {elapsed:.2f}s "
+                  f"({args.pages / elapsed:.0f} pages/s), regex_scan {scan_s:.2f}s, {len(hits)} hits")
+
+
+# -----------------------------------------------------------------------------
+# ranges: one large PDF redacted in page ranges across worker processes
+# -----------------------------------------------------------------------------
+def bench_ranges(args) -> None:
+    import logic
+
+    pdf = make_pii_pdf(args.pages, pii_rate=0.3)
+    patterns = logic.load_patterns(list(logic.PRESETS), SCAN_CUSTOM_REGEX, SCAN_LITERALS, False)
+    print(f"Redacting one {args.pages}-page PDF in ranges of {logic.REDACT_RANGE_PAGES} pages, best of {args.repeat}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        pool = None
+        if workers > 1:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            list(pool.map(abs, range(workers)))  # start the workers
+        try:
+            best = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                if pool is None:
+                    _, hits = logic.redact_pdf_bytes(pdf, patterns)
+                else:
+                    _, hits = logic.redact_pdf_ranges(pdf, patterns, executor=pool)
+                best = min(best, time.perf_counter() - t0)
+            print(f"x{workers:<3}: {best:7.2f}s  {args.pages / best:6.0f} pages/s  {len(hits)} hits")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+
+# -----------------------------------------------------------------------------
+# redact: a ZIP of small PDFs redacted file by file across worker processes
+# -----------------------------------------------------------------------------
+def bench_redact(args) -> None:
+    import zipfile
+    import logic
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for i in range(args.files):
+            zf.writestr(f"box{i % 4}/doc{i:04d}.pdf", make_pii_pdf(args.pages, seed=i, pii_rate=0.3))
+    zip_bytes = buf.getvalue()
+    patterns = logic.load_patterns(list(logic.PRESETS), SCAN_CUSTOM_REGEX, SCAN_LITERALS, False)
+    print(f"Redacting a ZIP of {args.files} x {args.pages}-page PDFs, best of {args.repeat}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        pool = None
+        if workers > 1:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            list(pool.map(abs, range(workers)))  # start the workers
+        try:
+            best = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                _, hits, _ = logic.process_zip_bytes(zip_bytes, patterns, executor=pool)
+                best = min(best, time.perf_counter() - t0)
+            print(f"x{workers:<3}: {best:7.2f}s  {args.files / best:6.1f} files/s  {len(hits)} hits")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="scenario", required=True)
+
+    p = sub.add_parser("latency", help="GET / latency while a heavy /bates job runs")
+    p.add_argument("--pages", type=int, default=800)
+    p.add_argument("--workers", type=int, default=None, help="DISCOVERY_WORKERS for the server")
+    p.set_defaults(func=bench_latency)
+
+    p = sub.add_parser("ttfb", help="time to first byte for /unlock, buffered vs streamed")
+    p.add_argument("--files", type=int, default=40)
+    p.add_argument("--pages", type=int, default=25)
+    p.set_defaults(func=bench_ttfb)
+
+    p = sub.add_parser("stamp", help="Bates stamping pages/sec per engine (pypdf2 vs pymupdf)")
+    p.add_argument("--files", type=int, default=10)
+    p.add_argument("--pages", type=int, default=100)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--workers", default="1", help="comma-separated worker process counts, e.g. 1,2,4,8")
+    p.set_defaults(func=bench_stamp)
+
+    p = sub.add_parser("photos", help="image stamping seconds/photo for large JPEGs per encoder setting")
+    p.add_argument("--files", type=int, default=5)
+    p.add_argument("--megapixels", type=float, default=12.0)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_photos)
+
+    p = sub.add_parser("compact", help="labeled PDF size and time per engine and output profile")
+    p.add_argument("--files", type=int, default=20)
+    p.add_argument("--pages", type=int, default=50)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_compact)
+
+    p = sub.add_parser("scan", help="redaction pattern scanning ms/page, per pattern vs PatternSet")
+    p.add_argument("--pages", type=int, default=500)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--literals", type=int, nargs="*", default=[10, 100, 2000],
+                   help="literal list sizes to time (alternation vs Aho-Corasick automaton)")
+    p.set_defaults(func=bench_scan)
+
+    p = sub.add_parser("ranges", help="one large PDF redacted in page ranges, per worker count")
+    p.add_argument("--pages", type=int, default=1000)
+    p.add_argument("--repeat", type=int, default=1)
+    p.add_argument("--workers", default="1,4")
+    p.set_defaults(func=bench_ranges)
+
+    p = sub.add_parser("redact", help="a ZIP of small PDFs redacted file by file, per worker count")
+    p.add_argument("--files", type=int, default=40)
+    p.add_argument("--pages", type=int, default=5)
+    p.add_argument("--repeat", type=int, default=1)
+    p.add_argument("--workers", default="1,4")
+    p.set_defaults(func=bench_redact)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
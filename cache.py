@@ -0,0 +1,171 @@
+"""
+Content-addressed result cache.
+
+Resubmitting the same production with the same settings (after a browser crash,
+say) used to redo all OCR, stamping and redaction. Every endpoint now derives a
+key from the SHA-256 of its uploads (name and content, in order) plus all of its
+parameters; a finished artifact is stored under that key and a repeat request
+is answered straight from disk::
+
+    <DISCOVERY_CACHE_DIR>/<key[:2]>/<key>/
+        entry.json      filename, media type, summary headers, size, last access
+        result          the artifact
+
+When the store grows past its size cap the least recently used entries are
+evicted first. Hit/miss counters are kept per process.
+
+Configuration (environment variables):
+- ``DISCOVERY_CACHE_DIR``: store location (default: ``<temp>/discovery-cache``).
+- ``DISCOVERY_CACHE_MAX_BYTES``: size cap (default: 1 GiB; ``0`` disables the cache).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Bump when logic.py output changes so stale artifacts are not served
+CACHE_VERSION = 5
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _link_or_copy(src: Path, dest: Path) -> None:
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+def cache_key(kind: str, params: Dict[str, Any], inputs: List[Tuple[str, str]]) -> str:
+    """SHA-256 over the endpoint, its parameters and the (filename, sha256) of every upload."""
+    payload = json.dumps(
+        {"version": CACHE_VERSION, "kind": kind, "params": params, "inputs": inputs},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.root = Path(root or os.environ.get("DISCOVERY_CACHE_DIR") or Path(tempfile.gettempdir(), "discovery-cache"))
+        self.max_bytes = max_bytes if max_bytes is not None else _env_int("DISCOVERY_CACHE_MAX_BYTES", 1024 ** 3)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if self.enabled:
+            self.root.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str, dest: Path) -> Optional[Dict[str, Any]]:
+        """On a hit, place the cached artifact at `dest` and return its entry; None on a miss."""
+        if not self.enabled:
+            return None
+        d = self._dir(key)
+        entry = _read_json(d / "entry.json")
+        if entry is not None:
+            try:
+                _link_or_copy(d / "result", dest)
+            except OSError:
+                entry = None  # evicted underneath us
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry["last_access"] = time.time()
+            tmp = d / f".entry.{threading.get_ident()}.tmp"
+            try:
+                tmp.write_text(json.dumps(entry))
+                os.replace(tmp, d / "entry.json")
+            except OSError:
+                pass
+        return entry
+
+    def put(self, key: str, src: Path, filename: str, media_type: str, headers: Dict[str, str]) -> None:
+        """Store the artifact at `src` (left in place) under `key`, then evict down to the size cap."""
+        if not self.enabled:
+            return
+        size = src.stat().st_size
+        if size > self.max_bytes:
+            return
+        d = self._dir(key)
+        d.parent.mkdir(parents=True, exist_ok=True)
+        # Build the entry beside its final place and rename it in, so readers
+        # never see a partial entry and concurrent writers of the same key are harmless.
+        tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=d.parent))
+        try:
+            _link_or_copy(src, tmp / "result")
+            now = time.time()
+            (tmp / "entry.json").write_text(json.dumps({
+                "key": key, "filename": filename, "media_type": media_type, "headers": headers,
+                "size": size, "created_at": now, "last_access": now,
+            }))
+            try:
+                os.rename(tmp, d)
+            except OSError:
+                pass  # already cached by a concurrent request
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def evict(self) -> None:
+        """Drop least recently used entries while over the size cap."""
+        entries = []
+        total = 0
+        for d in self.root.glob("*/*"):
+            if d.name.startswith("."):
+                continue
+            entry = _read_json(d / "entry.json")
+            if entry is None:
+                continue
+            total += entry.get("size", 0)
+            entries.append((entry.get("last_access", 0), entry.get("size", 0), d))
+        for _, size, d in sorted(entries, key=lambda t: t[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(d, ignore_errors=True)
+            total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        entries = 0
+        size = 0
+        if self.enabled:
+            for p in self.root.glob("*/*/entry.json"):
+                entry = _read_json(p)
+                if entry is not None:
+                    entries += 1
+                    size += entry.get("size", 0)
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
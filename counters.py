@@ -0,0 +1,175 @@
+"""
+Bates number reservations.
+
+A large production is often labeled as several /bates requests. Instead of
+carrying ``X-Last-Bates-Number`` from one to the next by hand, a request can
+reserve its page range from a counter kept per matter and prefix. Each
+reservation takes the next free numbers atomically, so independent batches can
+be labeled at the same time, on any worker, without overlapping ranges. Every
+reservation is kept, so any Bates number can be traced back to the one that
+holds it. A run that labels fewer pages than it reserved (or fails) settles its
+reservation afterwards; the latest one of a counter hands the rest back.
+
+The store is a single SQLite file. Reservations run in an ``IMMEDIATE``
+transaction, which serializes them across threads and processes on the host.
+
+Configuration (environment variables):
+- ``DISCOVERY_COUNTERS_DB``: SQLite file (default: ``<temp>/discovery-counters.sqlite3``).
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    matter TEXT NOT NULL,
+    prefix TEXT NOT NULL,
+    next_number INTEGER NOT NULL,
+    PRIMARY KEY (matter, prefix)
+);
+CREATE TABLE IF NOT EXISTS reservations (
+    id TEXT PRIMARY KEY,
+    matter TEXT NOT NULL,
+    prefix TEXT NOT NULL,
+    first_number INTEGER NOT NULL,
+    last_number INTEGER NOT NULL,
+    pages INTEGER NOT NULL,
+    note TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reservations_range ON reservations (matter, prefix, first_number);
+"""
+
+_COLUMNS = ("id", "matter", "prefix", "first_number", "last_number", "pages", "note", "created_at")
+
+
+def _row(row: Optional[tuple]) -> Optional[Dict[str, Any]]:
+    return dict(zip(_COLUMNS, row)) if row is not None else None
+
+
+class BatesCounters:
+    """Per-matter, per-prefix Bates counters with atomic range reservation."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or os.environ.get("DISCOVERY_COUNTERS_DB")
+                         or Path(tempfile.gettempdir(), "discovery-counters.sqlite3"))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode; transactions are opened explicitly where needed
+        return sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+
+    @staticmethod
+    def _check(matter: str, prefix: str) -> None:
+        if not matter.strip():
+            raise HTTPException(status_code=400, detail="matter must not be empty.")
+        if not prefix.strip():
+            raise HTTPException(status_code=400, detail="prefix must not be empty.")
+
+    def reserve(self, matter: str, prefix: str, pages: int, start_num: int = 1, note: str = "") -> Dict[str, Any]:
+        """
+        Take the next `pages` numbers for (matter, prefix). `start_num` only seeds a
+        counter that has no reservations yet. A 0-page reservation is recorded but
+        holds no numbers (last_number = first_number - 1).
+        """
+        self._check(matter, prefix)
+        if pages < 0:
+            raise HTTPException(status_code=400, detail="pages must be >= 0.")
+        if start_num < 0:
+            raise HTTPException(status_code=400, detail="start_num must be >= 0.")
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT next_number FROM counters WHERE matter = ? AND prefix = ?",
+                                 (matter, prefix)).fetchone()
+                first = row[0] if row is not None else start_num
+                reservation = (uuid.uuid4().hex, matter, prefix, first, first + pages - 1, pages, note, time.time())
+                db.execute("INSERT INTO reservations VALUES (?, ?, ?, ?, ?, ?, ?, ?)", reservation)
+                db.execute("INSERT OR REPLACE INTO counters VALUES (?, ?, ?)", (matter, prefix, first + pages))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return _row(reservation)
+
+    def settle(self, reservation_id: str, pages_used: int) -> Dict[str, Any]:
+        """
+        Shrink (or void, with 0) a reservation to the pages actually labeled. The
+        latest reservation of a counter hands its unused numbers back; an earlier one
+        keeps them unassigned. Growing is only possible for the latest reservation
+        (409 otherwise, as the numbers belong to the next one).
+        """
+        if pages_used < 0:
+            raise HTTPException(status_code=400, detail="pages_used must be >= 0.")
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                reservation = _row(db.execute("SELECT * FROM reservations WHERE id = ?", (reservation_id,)).fetchone())
+                if reservation is None:
+                    raise HTTPException(status_code=404, detail="Unknown reservation.")
+                matter, prefix, first = reservation["matter"], reservation["prefix"], reservation["first_number"]
+                next_number = db.execute("SELECT next_number FROM counters WHERE matter = ? AND prefix = ?",
+                                         (matter, prefix)).fetchone()[0]
+                latest = next_number == reservation["last_number"] + 1
+                if pages_used > reservation["pages"] and not latest:
+                    raise HTTPException(status_code=409, detail=(
+                        f"{pages_used} pages were labeled but only {reservation['pages']} were reserved, "
+                        f"and the numbers after {prefix} {reservation['last_number']} are already reserved."))
+                reservation.update(last_number=first + pages_used - 1, pages=pages_used)
+                db.execute("UPDATE reservations SET last_number = ?, pages = ? WHERE id = ?",
+                           (reservation["last_number"], pages_used, reservation_id))
+                if latest:
+                    db.execute("UPDATE counters SET next_number = ? WHERE matter = ? AND prefix = ?",
+                               (first + pages_used, matter, prefix))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return reservation
+
+    def counter(self, matter: str, prefix: str) -> Dict[str, Any]:
+        """The next free number (None before the first reservation) and all reservations, oldest first."""
+        self._check(matter, prefix)
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT next_number FROM counters WHERE matter = ? AND prefix = ?",
+                             (matter, prefix)).fetchone()
+            rows = db.execute("SELECT * FROM reservations WHERE matter = ? AND prefix = ? ORDER BY first_number",
+                              (matter, prefix)).fetchall()
+        return {
+            "matter": matter,
+            "prefix": prefix,
+            "next_number": row[0] if row is not None else None,
+            "reservations": [_row(r) for r in rows],
+        }
+
+    def lookup(self, matter: str, prefix: str, number: int) -> Dict[str, Any]:
+        """The reservation holding `number`; 404 if no reservation does."""
+        self._check(matter, prefix)
+        with closing(self._connect()) as db:
+            # Ranges never overlap, so the candidate is the last one starting at or before `number`
+            row = db.execute(
+                "SELECT * FROM reservations WHERE matter = ? AND prefix = ? AND first_number <= ? AND pages > 0 "
+                "ORDER BY first_number DESC LIMIT 1",
+                (matter, prefix, number),
+            ).fetchone()
+        reservation = _row(row)
+        if reservation is None or reservation["last_number"] < number:
+            raise HTTPException(status_code=404, detail=f"No reservation holds {prefix} {number} in this matter.")
+        return reservation
+
+    def matters(self) -> List[Dict[str, Any]]:
+        """Every counter with its next free number."""
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT matter, prefix, next_number FROM counters ORDER BY matter, prefix").fetchall()
+        return [{"matter": m, "prefix": p, "next_number": n} for m, p, n in rows]
@@ -0,0 +1,286 @@
+"""
+Asynchronous jobs: submit work, poll progress, download the result later.
+
+Long /bates and /redact runs outlive Render's request timeout, so every
+processing endpoint also has a job form (``POST /jobs/<kind>``). Each job gets
+a directory in the job store::
+
+    <DISCOVERY_JOBS_DIR>/<job id>/
+        job.json        status, timestamps, result metadata
+        progress.json   written by the worker process while it runs
+        result.<ext>    the finished artifact
+
+Finished jobs expire after a TTL; when the store grows past its size cap the
+least recently used finished jobs are evicted first. Running jobs are never
+evicted.
+
+Several server processes can share one store. job.json records the process that
+owns a job (host, pid and the process's start time), so a restarting process only
+fails the queued/running jobs whose owner is gone, not those of its siblings.
+
+Configuration (environment variables):
+- ``DISCOVERY_JOBS_DIR``: store location (default: ``<temp>/discovery-jobs``).
+- ``DISCOVERY_JOBS_MAX_BYTES``: size cap for stored results (default: 2 GiB).
+- ``DISCOVERY_JOBS_TTL_SECONDS``: how long finished jobs are kept (default: 24h).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    """Write JSON atomically so readers never see a half-written file."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _process_started(pid: int) -> Optional[str]:
+    """Boot id and start time of process `pid` (tells a reused pid apart); None where /proc can't tell."""
+    try:
+        boot_id = Path("/proc/sys/kernel/random/boot_id").read_text().strip()
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # Fields after the parenthesized command name; the start time is field 22 of the line
+    return f"{boot_id}:{stat.rsplit(')', 1)[1].split()[19]}"
+
+
+def _owner() -> Dict[str, Any]:
+    pid = os.getpid()
+    return {"host": socket.gethostname(), "pid": pid, "started": _process_started(pid)}
+
+
+def _owner_alive(owner: Optional[Dict[str, Any]]) -> bool:
+    """Whether the process that owns a job is still running. Owners on other hosts are assumed alive."""
+    if not owner or not owner.get("pid"):
+        return False
+    if owner.get("host") != socket.gethostname():
+        return True
+    try:
+        os.kill(owner["pid"], 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    started = _process_started(owner["pid"])
+    return started is None or owner.get("started") is None or started == owner["started"]
+
+
+class ProgressFile:
+    """
+    Picklable progress callback for worker processes (see logic.ProgressCallback).
+    Writes the latest fields to progress.json, at most every `interval` seconds.
+    """
+
+    def __init__(self, path: Path, interval: float = 0.5):
+        self.path = Path(path)
+        self.interval = interval
+        self._last = 0.0
+        self._state: Dict[str, Any] = {}
+
+    def __getstate__(self):
+        return {"path": self.path, "interval": self.interval}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["interval"])
+
+    def __call__(self, **fields: Any) -> None:
+        self._state.update({k: v for k, v in fields.items() if v is not None})
+        if "current" in fields and "current_pages_done" not in fields:
+            self._state.pop("current_pages_done", None)
+            self._state.pop("current_pages_total", None)
+        # Start/finish reports carry no current file and are always written
+        now = time.monotonic()
+        if now - self._last >= self.interval or fields.get("current") is None:
+            self._last = now
+            _write_json(self.path, dict(self._state, updated_at=time.time()))
+
+
+class JobStore:
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None, ttl_seconds: Optional[int] = None):
+        self.root = Path(root or os.environ.get("DISCOVERY_JOBS_DIR") or Path(tempfile.gettempdir(), "discovery-jobs"))
+        self.max_bytes = max_bytes if max_bytes is not None else _env_int("DISCOVERY_JOBS_MAX_BYTES", 2 * 1024 ** 3)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else _env_int("DISCOVERY_JOBS_TTL_SECONDS", 24 * 3600)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._tasks: Set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+
+    # ---- paths ----
+    def _dir(self, job_id: str) -> Path:
+        # Job ids are uuid4 hex; reject anything else so ids can't escape the store
+        if len(job_id) != 32 or not all(c in "0123456789abcdef" for c in job_id):
+            raise KeyError(job_id)
+        return self.root / job_id
+
+    def progress_path(self, job_id: str) -> Path:
+        return self._dir(job_id) / "progress.json"
+
+    def result_path(self, job_id: str) -> Optional[Path]:
+        meta = self._meta(job_id)
+        if not meta or meta.get("status") != DONE:
+            return None
+        return self._dir(job_id) / meta["result_file"]
+
+    # ---- metadata ----
+    def _meta(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return _read_json(self._dir(job_id) / "job.json")
+        except KeyError:
+            return None
+
+    def _update(self, job_id: str, **fields: Any) -> Dict[str, Any]:
+        with self._lock:
+            meta = self._meta(job_id) or {}
+            meta.update(fields)
+            _write_json(self._dir(job_id) / "job.json", meta)
+            return meta
+
+    def create(self, kind: str, filename: str, media_type: str) -> str:
+        job_id = uuid.uuid4().hex
+        self._dir(job_id).mkdir(parents=True)
+        now = time.time()
+        self._update(job_id, id=job_id, kind=kind, status=QUEUED, created_at=now, last_access=now,
+                     filename=filename, media_type=media_type, owner=_owner())
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Public view of a job: status, timestamps, progress and result info."""
+        meta = self._meta(job_id)
+        if meta is None:
+            return None
+        progress = _read_json(self.progress_path(job_id)) or {}
+        status = meta["status"]
+        if status == QUEUED and progress:
+            status = RUNNING
+        view = {
+            "id": meta["id"],
+            "kind": meta["kind"],
+            "status": status,
+            "created_at": meta.get("created_at"),
+            "started_at": meta.get("started_at"),
+            "finished_at": meta.get("finished_at"),
+            "progress": progress,
+        }
+        if status == FAILED:
+            view["error"] = meta.get("error")
+        if status == DONE:
+            view["result"] = {
+                "url": f"/jobs/{job_id}/result",
+                "filename": meta["filename"],
+                "size": meta.get("size"),
+                "headers": meta.get("headers", {}),
+                "expires_at": meta.get("finished_at", 0) + self.ttl_seconds,
+            }
+        return view
+
+    def touch(self, job_id: str) -> Dict[str, Any]:
+        return self._update(job_id, last_access=time.time())
+
+    # ---- running ----
+    def submit(
+        self,
+        kind: str,
+        run: Callable[[ProgressFile, Callable[[], None]], Awaitable[Dict[str, str]]],
+        out_path: Path,
+        filename: str,
+        media_type: str,
+        cleanup: Optional[Callable[[], None]] = None,
+    ) -> str:
+        """
+        Start `run(progress, started)` in the background; it calls `started()` when the
+        work actually begins (e.g. once admitted), which marks the job running. Its
+        artifact at `out_path` is kept when it finishes, and the summary headers it
+        returns are sent with the download.
+        """
+        self.evict()
+        job_id = self.create(kind, filename, media_type)
+
+        async def _job() -> None:
+            try:
+                headers = await run(ProgressFile(self.progress_path(job_id)),
+                                    lambda: self._update(job_id, status=RUNNING, started_at=time.time()))
+                dest = self._dir(job_id) / ("result" + Path(filename).suffix)
+                await asyncio.to_thread(shutil.move, str(out_path), str(dest))
+                self._update(
+                    job_id, status=DONE, finished_at=time.time(), last_access=time.time(),
+                    result_file=dest.name, size=dest.stat().st_size,
+                    headers=headers,
+                )
+            except Exception as e:
+                self._update(job_id, status=FAILED, finished_at=time.time(), error=str(e) or e.__class__.__name__)
+            finally:
+                if cleanup is not None:
+                    cleanup()
+                self.evict()
+
+        task = asyncio.ensure_future(_job())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job_id
+
+    def recover(self) -> None:
+        """Mark jobs left queued/running by a process that is gone as failed."""
+        for d in self.root.iterdir():
+            meta = _read_json(d / "job.json")
+            if meta and meta.get("status") in (QUEUED, RUNNING) and not _owner_alive(meta.get("owner")):
+                self._update(meta["id"], status=FAILED, finished_at=time.time(),
+                             error="Server restarted before the job finished.")
+
+    # ---- eviction ----
+    def evict(self) -> None:
+        """Drop expired jobs, then least recently used finished jobs while over the size cap."""
+        now = time.time()
+        finished = []
+        total = 0
+        for d in list(self.root.iterdir()):
+            meta = _read_json(d / "job.json")
+            if meta is None:
+                # Half-created or foreign directory; leave young ones alone
+                if d.is_dir() and now - d.stat().st_mtime > self.ttl_seconds:
+                    shutil.rmtree(d, ignore_errors=True)
+                continue
+            if meta.get("status") not in (DONE, FAILED):
+                continue
+            if now - meta.get("finished_at", now) > self.ttl_seconds:
+                shutil.rmtree(d, ignore_errors=True)
+                continue
+            size = meta.get("size") or 0
+            total += size
+            finished.append((meta.get("last_access", 0), size, d))
+        if self.max_bytes <= 0:
+            return
+        for _, size, d in sorted(finished, key=lambda t: t[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(d, ignore_errors=True)
+            total -= size
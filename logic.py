@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-import io, os, re, csv, zipfile, tempfile, shutil, json, platform, logging
+import io, os, re, csv, zipfile, json, hashlib, platform, logging, threading, time, warnings, bisect
 import concurrent.futures
-from dataclasses import dataclass
+import contextlib
+import functools
+from dataclasses import asdict, dataclass, fields
 from datetime import datetime, date
-from pathlib import Path
-from typing import Dict, Optional, Tuple, List, Iterable, Set
-from collections import Counter
+from pathlib import Path, PurePosixPath
+from typing import Callable, Deque, Dict, FrozenSet, Optional, Tuple, List, Iterable, Iterator, Set, Union, BinaryIO
+from collections import Counter, defaultdict, deque
 
 import pandas as pd
 import numpy as np
@@ -59,10 +61,15 @@ except Exception:
 # ------------------------
 # Global helpers
 # ------------------------
-def load_font(font_name: str, size: int) -> ImageFont.FreeTypeFont:
-    """
-    Load a font from common system paths or fallback to default.
-    """
+# ---------- Font registry ----------
+# Font names are resolved to a file once per process; PIL fonts are memoized per
+# (name, size) and ReportLab registrations per name (LRU, FONT_CACHE_SIZE), and
+# per-character advance widths are cached so zone math costs a dict lookup per page.
+FONT_CACHE_SIZE = 64
+
+@functools.lru_cache(maxsize=None)
+def _font_path(font_name: str) -> Optional[str]:
+    """First candidate file that loads for `font_name`, or None for PIL's default font."""
     # Common paths for Arial or similar sans-serif
     candidates = [
         # User requested specific path (if provided as absolute path)
@@ -74,40 +81,286 @@ def load_font(font_name: str, size: int) -> ImageFont.FreeTypeFont:
         f"/usr/share/fonts/truetype/msttcorefonts/{font_name}.ttf",
         f"/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", # Fallback 1
         f"/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf", # Fallback 2
+        # If all else fails, try loading by name (OS might resolve it)
+        f"{font_name}.ttf",
     ]
-    
     for path in candidates:
         try:
-            return ImageFont.truetype(path, size)
+            ImageFont.truetype(path, 10)
+            return path
         except Exception:
             continue
-            
-    # If all else fails, try loading by name (OS might resolve it)
+    return None
+
+@functools.lru_cache(maxsize=FONT_CACHE_SIZE)
+def load_font(font_name: str, size: int) -> ImageFont.FreeTypeFont:
+    """
+    Load a font from common system paths or fallback to default.
+    Cached per (font_name, size); treat the returned font as shared and read-only.
+    """
+    path = _font_path(font_name)
+    if path is not None:
+        try:
+            return ImageFont.truetype(path, size)
+        except Exception:
+            pass
+    return ImageFont.load_default()
+
+@functools.lru_cache(maxsize=FONT_CACHE_SIZE)
+def _reportlab_font(font_name: str) -> str:
+    """
+    Font name to hand ReportLab: the standard PDF fonts as-is, anything else
+    registered once from the file load_font would use (Helvetica if none loads).
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    if font_name in pdfmetrics.standardFonts or font_name in pdfmetrics.getRegisteredFontNames():
+        return font_name
+    path = _font_path(font_name)
+    if path is not None:
+        try:
+            pdfmetrics.registerFont(TTFont(font_name, path))
+            return font_name
+        except Exception:
+            pass
+    return "Helvetica"
+
+@functools.lru_cache(maxsize=FONT_CACHE_SIZE)
+def _char_widths(rl_font: str, font_size: float) -> Dict[str, float]:
+    return {}  # filled lazily by _pdf_text_width
+
+def _pdf_text_width(text: str, font_name: str, font_size: float) -> float:
+    """Width of `text` in points as ReportLab draws it (drawRightString uses the same metrics)."""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    rl_font = _reportlab_font(font_name)
+    widths = _char_widths(rl_font, font_size)
+    total = 0.0
+    for ch in text:
+        w = widths.get(ch)
+        if w is None:
+            w = widths[ch] = stringWidth(ch, rl_font, font_size)
+        total += w
+    return total
+
+# ---------- Inputs / outputs ----------
+# Inputs are (display_name, source) pairs where source is the file's bytes or a
+# path to it on disk (spooled uploads), so a production never has to be held in
+# memory all at once. Outputs go to `out` (a path or binary file) when given;
+# otherwise the ZIP is built in memory and returned as bytes.
+Source = Union[bytes, str, os.PathLike]
+Output = Union[str, os.PathLike, BinaryIO]
+
+def _read_source(src: Source) -> bytes:
+    if isinstance(src, (bytes, bytearray)):
+        return bytes(src)
+    return Path(src).read_bytes()
+
+def _open_zip_source(src: Source) -> zipfile.ZipFile:
+    if isinstance(src, (bytes, bytearray)):
+        return zipfile.ZipFile(io.BytesIO(src), "r")
+    return zipfile.ZipFile(src, "r")
+
+def _expand_zip_sources(pairs: Iterable[Tuple[str, Source]]) -> Iterator[Tuple[str, bytes]]:
+    """Yield (name, bytes) per input file; ZIP inputs are expanded one member at a time."""
+    for name, src in pairs:
+        if name.lower().endswith(".zip"):
+            with _open_zip_source(src) as zf:
+                for info in zf.infolist():
+                    if not info.is_dir() and not _is_mac_resource_junk(info.filename):
+                        yield info.filename, zf.read(info)
+        else:
+            yield name, _read_source(src)
+
+@contextlib.contextmanager
+def _lazy_sources(pairs: Iterable[Tuple[str, Source]]) -> Iterator[List[Tuple[str, Callable[[], bytes]]]]:
+    """
+    Like _expand_zip_sources, but as (name, load) pairs: nothing is read until `load()`
+    is called, so the file list can be ordered first. ZIP inputs stay open while in use.
+    """
+    with contextlib.ExitStack() as stack:
+        items: List[Tuple[str, Callable[[], bytes]]] = []
+        for name, src in pairs:
+            if name.lower().endswith(".zip"):
+                zf = stack.enter_context(_open_zip_source(src))
+                items.extend((info.filename, functools.partial(zf.read, info)) for info in zf.infolist()
+                             if not info.is_dir() and not _is_mac_resource_junk(info.filename))
+            else:
+                items.append((name, functools.partial(_read_source, src)))
+        yield items
+
+def _count_inputs(pairs: Iterable[Tuple[str, Source]], exts: Optional[Set[str]] = None) -> int:
+    """Number of input files (ZIP members included) matching `exts`. Only ZIP directories are read."""
+    def _wanted(name: str) -> bool:
+        return not _is_mac_resource_junk(name) and (exts is None or Path(name).suffix.lower() in exts)
+    n = 0
+    for name, src in pairs:
+        if name.lower().endswith(".zip"):
+            try:
+                with _open_zip_source(src) as zf:
+                    n += sum(1 for i in zf.infolist() if not i.is_dir() and _wanted(i.filename))
+            except zipfile.BadZipFile:
+                pass
+        elif _wanted(name):
+            n += 1
+    return n
+
+def _pdf_page_count(data: bytes) -> int:
+    if fitz is not None:
+        try:
+            with fitz.open(stream=data, filetype="pdf") as doc:
+                return doc.page_count
+        except Exception:
+            pass
     try:
-        return ImageFont.truetype(f"{font_name}.ttf", size)
+        return len(PdfReader(io.BytesIO(data)).pages)
+    except Exception:
+        return 1
+
+# Long-running functions accept an optional `progress` callback, called with keyword
+# fields as work advances: files_done, files_total, pages_done, current (file name),
+# and, for page-level work, current_pages_done / current_pages_total.
+ProgressCallback = Callable[..., None]
+
+def _report(progress: Optional[ProgressCallback], **fields) -> None:
+    if progress is None:
+        return
+    try:
+        progress(**fields)
     except Exception:
         pass
-        
-    return ImageFont.load_default()
 
-def _zip_dir(dir_path: Path) -> bytes:
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-        for p in dir_path.rglob("*"):
-            if p.is_file():
-                zf.write(p, p.relative_to(dir_path))
-    buf.seek(0)
-    return buf.read()
-
-def _zip_from_pairs(pairs: List[Tuple[str, bytes]]) -> bytes:
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+# What a pool raises when it can't run calls any more: submit() after shutdown or once
+# broken (RuntimeError), and a future whose worker died (BrokenExecutor, e.g.
+# BrokenProcessPool). Only these repeat a call in the calling process; an error
+# raised by the call itself is the call's result.
+_POOL_SUBMIT_ERRORS = (RuntimeError,)
+_POOL_RESULT_ERRORS = (concurrent.futures.BrokenExecutor,)
+
+def _ordered_map(fn: Callable[..., object], calls: Iterable[Tuple[object, tuple]],
+                 executor: Optional[concurrent.futures.Executor] = None) -> Iterator[Tuple[object, object]]:
+    """
+    (key, fn(*args)) for each (key, args) of `calls`, in order. With an `executor`,
+    calls run on it a bounded window ahead of the consumer (only their args are sent;
+    keys stay here), and a call the executor could not run (see _POOL_RESULT_ERRORS)
+    is repeated here; an exception raised by `fn` propagates as it does without one.
+    """
+    if executor is None:
+        for key, args in calls:
+            yield key, fn(*args)
+        return
+    ahead = 2 * max(1, getattr(executor, "_max_workers", None) or os.cpu_count() or 1)
+    window: Deque[Tuple[object, tuple, Optional[concurrent.futures.Future]]] = deque()
+    calls = iter(calls)
+
+    def _submit() -> None:
+        call = next(calls, None)
+        if call is None:
+            return
+        key, args = call
+        try:
+            future = executor.submit(fn, *args)
+        except _POOL_SUBMIT_ERRORS:
+            future = None  # executor unusable (e.g. a broken pool): call fn here
+        window.append((key, args, future))
+
+    for _ in range(ahead):
+        _submit()
+    while window:
+        key, args, future = window.popleft()
+        _submit()
+        if future is not None:
+            try:
+                result = future.result()
+            except _POOL_RESULT_ERRORS:
+                pass  # executor failed (e.g. a worker died): call fn here
+            else:
+                yield key, result
+                continue
+        yield key, fn(*args)
+
+# Stage instrumentation. Inside `collect_metrics()` the calling thread records how
+# long each stage took (pdf_parse, overlay_render, merge, ocr, regex_scan,
+# apply_redactions, zip_compress, xlsx_build) and counts pages; outside it the
+# hooks are no-ops. workers.py collects per call and main.py exports /metrics.
+_instrumentation = threading.local()
+
+@contextlib.contextmanager
+def collect_metrics() -> Iterator[Dict[str, Dict]]:
+    data = {"timings": defaultdict(list), "counters": Counter()}
+    previous = getattr(_instrumentation, "data", None)
+    _instrumentation.data = data
+    try:
+        yield data
+    finally:
+        _instrumentation.data = previous
+
+@contextlib.contextmanager
+def _timed(stage: str) -> Iterator[None]:
+    data = getattr(_instrumentation, "data", None)
+    if data is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        data["timings"][stage].append(time.perf_counter() - t0)
+
+def _count(name: str, n: int = 1) -> None:
+    data = getattr(_instrumentation, "data", None)
+    if data is not None:
+        data["counters"][name] += n
+
+class _TimedZipFile(zipfile.ZipFile):
+    """ZipFile whose writes are recorded as the zip_compress stage."""
+
+    def write(self, *args, **kwargs):
+        with _timed("zip_compress"):
+            return super().write(*args, **kwargs)
+
+    def writestr(self, *args, **kwargs):
+        with _timed("zip_compress"):
+            return super().writestr(*args, **kwargs)
+
+class _AppendOnlyFile(io.RawIOBase):
+    """Write-only, non-seekable file. zipfile then never rewrites local headers and
+    emits data descriptors instead, so the archive only ever grows at the end."""
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self._fh = open(path, "wb", buffering=0)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        return self._fh.write(b)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._fh.close()
+        super().close()
+
+@contextlib.contextmanager
+def _zip_writer(out: Output) -> Iterator[zipfile.ZipFile]:
+    """
+    ZipFile writing to `out`. A path is written append-only, so a reader can stream
+    the archive while entries are still being added (Zip64 is used when needed).
+    """
+    if isinstance(out, (str, os.PathLike)):
+        with _AppendOnlyFile(out) as fh, _TimedZipFile(fh, "w", zipfile.ZIP_DEFLATED) as zf:
+            yield zf
+    else:
+        with _TimedZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+            yield zf
+
+def _zip_from_pairs(pairs: Iterable[Tuple[str, bytes]], out: Optional[Output] = None) -> Optional[bytes]:
+    target = io.BytesIO() if out is None else out
+    with _zip_writer(target) as zf:
         for rel, b in pairs:
             if rel.endswith("/"):
                 continue
             zf.writestr(rel, b)
-    buf.seek(0)
-    return buf.read()
+    return target.getvalue() if out is None else None
 
 def _color_from_hex(hex_str: str) -> Tuple[int, int, int]:
     hex_str = hex_str.strip("#")
@@ -254,7 +507,9 @@ def _pdf_page_text_or_ocr(pdf_bytes: bytes, page_index_zero: int) -> str:
                 if pytesseract is not None:
                     pix = page.get_pixmap()
                     img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                    ocr_txt = pytesseract.image_to_string(img) or ""
+                    _count("ocr_pages")
+                    with _timed("ocr"):
+                        ocr_txt = pytesseract.image_to_string(img) or ""
                     doc.close()
                     return ocr_txt
             doc.close()
@@ -264,7 +519,9 @@ def _pdf_page_text_or_ocr(pdf_bytes: bytes, page_index_zero: int) -> str:
         try:
             imgs = convert_from_bytes(pdf_bytes, first_page=page_index_zero+1, last_page=page_index_zero+1, dpi=200)
             if imgs:
-                return pytesseract.image_to_string(imgs[0]) or ""
+                _count("ocr_pages")
+                with _timed("ocr"):
+                    return pytesseract.image_to_string(imgs[0]) or ""
         except Exception:
             pass
     return ""
@@ -274,7 +531,9 @@ def _image_bytes_text_ocr(img_bytes: bytes) -> str:
         with Image.open(io.BytesIO(img_bytes)) as im:
             im = ImageOps.exif_transpose(im)
             if pytesseract is not None:
-                return pytesseract.image_to_string(im) or ""
+                _count("ocr_pages")
+                with _timed("ocr"):
+                    return pytesseract.image_to_string(im) or ""
     except Exception:
         pass
     return ""
@@ -340,33 +599,38 @@ def _extract_bates_for_file(rel_path: str, data: bytes) -> Tuple[Optional[str],
     else:
         return None, None
 
-def scan_pairs_for_bates(pairs: List[Tuple[str, bytes]]) -> pd.DataFrame:
+def _bates_range_of(rel_path: str, data: bytes) -> Tuple[Optional[str], Optional[str]]:
+    """_extract_bates_for_file, or (None, None) for a file it can't read."""
+    try:
+        return _extract_bates_for_file(rel_path, data)
+    except Exception:
+        return None, None
+
+def scan_pairs_for_bates(pairs: Iterable[Tuple[str, bytes]], progress: Optional[ProgressCallback] = None,
+                         files_total: Optional[int] = None,
+                         executor: Optional[concurrent.futures.Executor] = None) -> pd.DataFrame:
+    """One row per file with the first/last Bates labels read (or OCR'd) from it; files are read on `executor` if given."""
     rows: List[Dict[str, str]] = []
-    for i, (rel, b) in enumerate(pairs, start=1):
-        if _is_mac_resource_junk(rel):
-            continue
+    calls = ((rel, (rel, b)) for rel, b in pairs if not _is_mac_resource_junk(rel))
+    for i, (rel, (first, last)) in enumerate(_ordered_map(_bates_range_of, calls, executor), start=1):
+        _report(progress, files_done=i - 1, files_total=files_total, current=rel)
         p = Path(rel)
         rel_dir = str(p.parent) if str(p.parent) != "." else ""
         fname = p.name
-        try:
-            first, last = _extract_bates_for_file(rel, b)
-        except Exception:
-            first, last = None, None
         rows.append({
             "rel_dir": rel_dir,
             "filename": fname,
             "first_label": first or "",
             "last_label": last or ""
         })
+    _report(progress, files_done=len(rows), files_total=files_total)
     return pd.DataFrame(rows)
 
 # ======================================================
 # 1) Unlock PDFs
 # ======================================================
-def unlock_pdfs(files: List[Tuple[str, bytes]], password_mode: str, password_for_all: Optional[str], password_map: Dict[str, str]) -> bytes:
-    if not PIKEPDF_AVAILABLE:
-        raise RuntimeError("pikepdf is not installed")
-
+def _password_resolver(password_mode: str, password_for_all: Optional[str],
+                       password_map: Dict[str, str]) -> Callable[[str], Optional[str]]:
     def _resolve_password(path: str) -> Optional[str]:
         if password_mode == "Single password for all":
             return (password_for_all or "").strip() or None
@@ -376,36 +640,55 @@ def unlock_pdfs(files: List[Tuple[str, bytes]], password_mode: str, password_for
             return password_map.get(path) or password_map.get(base) or password_map.get(stem)
         else:
             return None
+    return _resolve_password
 
-    def _process_pdf(src_bytes: bytes, password: Optional[str]) -> Tuple[str, Optional[bytes]]:
-        try:
-            with io.BytesIO(src_bytes) as src_buf:
-                try:
-                    pdf = pikepdf.open(src_buf) if password is None else pikepdf.open(src_buf, password=password)
-                except PasswordError:
-                    return "Password required or incorrect", None
-                except PdfError as e:
-                    return f"PDF error: {e.__class__.__name__}", None
-                out_mem = io.BytesIO()
-                pdf.save(out_mem)  # saved without encryption
-                pdf.close()
-                return "Unlocked", out_mem.getvalue()
-        except Exception as e:
-            return f"Unexpected error: {e}", None
+def _unlock_pdf_bytes(src_bytes: bytes, password: Optional[str]) -> Tuple[str, Optional[bytes]]:
+    try:
+        with io.BytesIO(src_bytes) as src_buf:
+            try:
+                pdf = pikepdf.open(src_buf) if password is None else pikepdf.open(src_buf, password=password)
+            except PasswordError:
+                return "Password required or incorrect", None
+            except PdfError as e:
+                return f"PDF error: {e.__class__.__name__}", None
+            out_mem = io.BytesIO()
+            pdf.save(out_mem)  # saved without encryption
+            pdf.close()
+            return "Unlocked", out_mem.getvalue()
+    except Exception as e:
+        return f"Unexpected error: {e}", None
+
+def _unlock_each(pdfs: Iterable[Tuple[str, bytes]], resolve_password: Callable[[str], Optional[str]], *,
+                 executor: Optional[concurrent.futures.Executor] = None,
+                 progress: Optional[ProgressCallback] = None,
+                 files_total: Optional[int] = None) -> Iterator[Tuple[str, str, Optional[bytes]]]:
+    """(name, status, unlocked bytes or None) per PDF of `pdfs`, in order; unlocked on `executor` if given."""
+    calls = ((name, (data, resolve_password(name))) for name, data in pdfs)
+    files_done = 0
+    for name, (status, unlocked) in _ordered_map(_unlock_pdf_bytes, calls, executor):
+        _report(progress, files_done=files_done, files_total=files_total, current=name)
+        yield name, status, unlocked
+        files_done += 1
+    _report(progress, files_done=files_done, files_total=files_total)
+
+def unlock_pdfs(files: List[Tuple[str, Source]], password_mode: str, password_for_all: Optional[str], password_map: Dict[str, str],
+                out: Optional[Output] = None, progress: Optional[ProgressCallback] = None) -> Optional[bytes]:
+    if not PIKEPDF_AVAILABLE:
+        raise RuntimeError("pikepdf is not installed")
 
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+    _resolve_password = _password_resolver(password_mode, password_for_all, password_map)
+
+    files_total = _count_inputs(files, {".pdf"})
+
+    def _pdfs() -> Iterator[Tuple[str, bytes]]:
         for fname, data in files:
             if _is_mac_resource_junk(fname):
                 continue
             if fname.lower().endswith(".pdf"):
-                status, unlocked_data = _process_pdf(data, _resolve_password(fname))
-                out_name = os.path.splitext(fname)[0] + "_unlocked.pdf"
-                if unlocked_data is not None:
-                    zf.writestr(out_name, unlocked_data)
+                yield fname, _read_source(data)
             elif fname.lower().endswith(".zip"):
                 try:
-                    with zipfile.ZipFile(io.BytesIO(data), 'r') as inzip:
+                    with _open_zip_source(data) as inzip:
                         for member in inzip.namelist():
                             if member.endswith('/'):
                                 continue
@@ -413,16 +696,18 @@ def unlock_pdfs(files: List[Tuple[str, bytes]], password_mode: str, password_for
                                 continue
                             if not member.lower().endswith('.pdf'):
                                 continue
-                            pw = _resolve_password(member)
-                            status, unlocked_data = _process_pdf(inzip.read(member), pw)
-                            out_name = f"{os.path.splitext(member)[0]}_unlocked.pdf"
-                            if unlocked_data is not None:
-                                zf.writestr(out_name, unlocked_data)
+                            yield member, inzip.read(member)
                 except zipfile.BadZipFile:
                     pass
-    
-    zip_buffer.seek(0)
-    return zip_buffer.read()
+
+    zip_buffer = io.BytesIO() if out is None else out
+    with _zip_writer(zip_buffer) as zf:
+        for name, status, unlocked_data in _unlock_each(_pdfs(), _resolve_password, progress=progress,
+                                                        files_total=files_total):
+            if unlocked_data is not None:
+                zf.writestr(os.path.splitext(name)[0] + "_unlocked.pdf", unlocked_data)
+
+    return zip_buffer.getvalue() if out is None else None
 
 # ======================================================
 # 2) Organize by Year
@@ -647,45 +932,69 @@ def extract_year_cascading(
     return YearExtractionResult(year=None, method="none", reason="all-methods-failed:non-pdf-no-content-scan")
 
 
-def organize_by_year(files: List[Tuple[str, bytes]], min_year: int, max_year: int, year_policy: str, unknown_folder: str) -> bytes:
+def _year_folder(display_name: str, data: bytes, min_year: int, max_year: int, year_policy: str,
+                 unknown_folder: str) -> str:
+    """Target folder (the year, or `unknown_folder`) for one file."""
     logger = logging.getLogger(__name__)
+    try:
+        # Use cascading extraction: filename → metadata → content
+        result = extract_year_cascading(
+            Path(display_name).name,
+            data,
+            min_year,
+            max_year,
+            year_policy
+        )
 
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        tmp = Path(tmp_dir)
-        out_root = tmp / f"organized_{datetime.now().strftime('%Y%m%d-%H%M%S')}"
-        out_root.mkdir(parents=True, exist_ok=True)
-
-        for display_name, data in files:
-            try:
-                # Use cascading extraction: filename → metadata → content
-                result = extract_year_cascading(
-                    Path(display_name).name,
-                    data,
-                    min_year,
-                    max_year,
-                    year_policy
-                )
+        logger.debug(
+            f"File '{display_name}': year={result.year}, "
+            f"method={result.method}, reason={result.reason}"
+        )
 
-                logger.debug(
-                    f"File '{display_name}': year={result.year}, "
-                    f"method={result.method}, reason={result.reason}"
-                )
+        return str(result.year) if result.year is not None else unknown_folder
+    except Exception as e:
+        logger.warning(f"Error extracting year from '{display_name}': {e}")
+        return unknown_folder
 
-                folder = str(result.year) if result.year is not None else unknown_folder
-            except Exception as e:
-                logger.warning(f"Error extracting year from '{display_name}': {e}")
-                folder = unknown_folder
-
-            target_dir = out_root / folder
-            target_dir.mkdir(parents=True, exist_ok=True)
-            dest = target_dir / Path(display_name).name
-            i = 1
-            while dest.exists():
-                dest = target_dir / f"{Path(display_name).stem}__{i}{Path(display_name).suffix}"
+def _organize_each(files: Iterable[Tuple[str, bytes]], min_year: int, max_year: int, year_policy: str,
+                   unknown_folder: str, *, executor: Optional[concurrent.futures.Executor] = None,
+                   progress: Optional[ProgressCallback] = None,
+                   files_total: Optional[int] = None) -> Iterator[Tuple[str, bytes]]:
+    """
+    ("<year>/<name>", data) per file, in order (`unknown_folder` when no year is found;
+    years detected on `executor` if given). A name already taken in its folder gets the
+    first free "__i" suffix before its extension.
+    """
+    # Names taken per year folder, and the next "__i" suffix to try per original name
+    taken: Dict[str, Set[str]] = defaultdict(set)
+    next_suffix: Dict[Tuple[str, str], int] = {}
+    calls = (((display_name, data), (display_name, data, min_year, max_year, year_policy, unknown_folder))
+             for display_name, data in files)
+    for files_done, ((display_name, data), folder) in enumerate(_ordered_map(_year_folder, calls, executor)):
+        _report(progress, files_done=files_done, files_total=files_total, current=display_name)
+        src = Path(display_name)
+        name = src.name
+        if name in taken[folder]:
+            i = next_suffix.get((folder, src.name), 1)
+            while f"{src.stem}__{i}{src.suffix}" in taken[folder]:
                 i += 1
-            dest.write_bytes(data)
+            name = f"{src.stem}__{i}{src.suffix}"
+            next_suffix[(folder, src.name)] = i + 1
+        taken[folder].add(name)
+        yield f"{folder}/{name}", data
+
+def organize_by_year(files: List[Tuple[str, Source]], min_year: int, max_year: int, year_policy: str, unknown_folder: str,
+                     out: Optional[Output] = None, progress: Optional[ProgressCallback] = None) -> Optional[bytes]:
+    files_total = _count_inputs(files)
+    target = io.BytesIO() if out is None else out
+
+    with _zip_writer(target) as zf:
+        for dest, data in _organize_each(_expand_zip_sources(files), min_year, max_year, year_policy, unknown_folder,
+                                         progress=progress, files_total=files_total):
+            zf.writestr(dest, data)
 
-        return _zip_dir(out_root)
+    _report(progress, files_done=files_total, files_total=files_total)
+    return target.getvalue() if out is None else None
 
 # ======================================================
 # 3) Bates Labeler
@@ -700,84 +1009,294 @@ class BatesRecord:
     first_label: str
     last_label: str
     category: str  # deepest folder
+    source_sha256: str = ""  # input file, before labeling
+    output_sha256: str = ""  # labeled file as written
+
+# Machine-readable copy of the records, written into every labeled ZIP so
+# build_index_from_zip can read the ranges instead of OCR-ing them back.
+# With the label settings and hashes it also lets walk_and_label(previous=...)
+# reuse the stamped files of a prior run.
+BATES_MANIFEST_JSON = "bates_records.json"
+BATES_MANIFEST_CSV = "bates_records.csv"
+BATES_MANIFEST_NAMES = {BATES_MANIFEST_JSON, BATES_MANIFEST_CSV}
+
+def bates_manifest_entries(records: List[BatesRecord], last_used: int,
+                           report: Optional[Dict[str, object]] = None) -> List[Tuple[str, bytes]]:
+    """(name, bytes) pairs for bates_records.json and bates_records.csv (`report` from walk_and_label)."""
+    rows = [asdict(r) for r in records]
+    report = report or {}
+    manifest = {"version": 2, "last_bates_number": last_used, "settings": report.get("settings"),
+                "engine": report.get("engine"), "files_reused": report.get("files_reused", 0), "records": rows}
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=[f.name for f in fields(BatesRecord)])
+    writer.writeheader()
+    writer.writerows(rows)
+    return [
+        (BATES_MANIFEST_JSON, json.dumps(manifest, indent=2).encode("utf-8")),
+        (BATES_MANIFEST_CSV, buf.getvalue().encode("utf-8")),
+    ]
+
+def read_bates_manifest(zf: zipfile.ZipFile) -> Optional[List[BatesRecord]]:
+    """Records from a labeled ZIP's manifest (JSON preferred, CSV otherwise); None when absent or unreadable."""
+    names = set(zf.namelist())
+    try:
+        if BATES_MANIFEST_JSON in names:
+            rows = json.loads(zf.read(BATES_MANIFEST_JSON))["records"]
+        elif BATES_MANIFEST_CSV in names:
+            rows = list(csv.DictReader(io.StringIO(zf.read(BATES_MANIFEST_CSV).decode("utf-8"))))
+        else:
+            return None
+        return [BatesRecord(
+            rel_dir=str(r["rel_dir"]), filename=str(r["filename"]), pages_or_files=int(r["pages_or_files"]),
+            first_label=str(r["first_label"]), last_label=str(r["last_label"]), category=str(r.get("category") or ""),
+            source_sha256=str(r.get("source_sha256") or ""), output_sha256=str(r.get("output_sha256") or ""),
+        ) for r in rows]
+    except (KeyError, TypeError, ValueError):
+        return None
 
 def _page_size(page) -> Tuple[float, float]:
     return float(page.mediabox.width), float(page.mediabox.height)
 
+# One overlay page per PDF page: (label, width, height, margin_right, margin_bottom, left_punch_margin)
+OverlayPage = Tuple[str, float, float, float, float, float]
+
 def _overlay_pdf(
-    label: str,
-    w: float, h: float,
+    pages: List[OverlayPage],
     font_name: str, font_size: int,
-    margin_right: float, margin_bottom: float,
     color_rgb: Tuple[int,int,int],
-    left_punch_margin: float = 0.0,
     border_all_pt: float = 0.0,
 ) -> PdfReader:
+    """
+    Render the labels for every page of a file into one multi-page overlay in a
+    single canvas pass (one document, one font resource, one parse); overlay page i
+    is merged onto page i.
+    """
     from io import BytesIO
     r, g, b = color_rgb
+    rl_font = _reportlab_font(font_name)
     packet = BytesIO()
-    can = rl_canvas.Canvas(packet, pagesize=(w, h))
+    can = rl_canvas.Canvas(packet)
+
+    for label, w, h, margin_right, margin_bottom, left_punch_margin in pages:
+        can.setPageSize((w, h))
+
+        if border_all_pt and border_all_pt > 0:
+            can.setFillColor(Color(1, 1, 1))
+            B = float(border_all_pt)
+            can.rect(0, h - B, w, B, stroke=0, fill=1)
+            can.rect(0, 0, w, B, stroke=0, fill=1)
+            can.rect(0, 0, B, h, stroke=0, fill=1)
+            can.rect(w - B, 0, B, h, stroke=0, fill=1)
+
+        # Fallback for older PyPDF2 versions without Transformation support:
+        # Draw white rectangle to cover left margin area
+        if left_punch_margin and left_punch_margin > 0:
+            can.setFillColor(Color(1, 1, 1))
+            can.rect(0, 0, left_punch_margin, h, stroke=0, fill=1)
+
+        can.setFont(rl_font, font_size)
+        can.setFillColor(Color(r/255, g/255, b/255))
+        eff_mr = max(margin_right, border_all_pt or 0.0)
+        eff_mb = max(margin_bottom, border_all_pt or 0.0)
+        can.drawRightString(w - eff_mr, eff_mb, label)
+        can.showPage()
 
-    if border_all_pt and border_all_pt > 0:
-        can.setFillColor(Color(1, 1, 1))
-        B = float(border_all_pt)
-        can.rect(0, h - B, w, B, stroke=0, fill=1)
-        can.rect(0, 0, w, B, stroke=0, fill=1)
-        can.rect(0, 0, B, h, stroke=0, fill=1)
-        can.rect(w - B, 0, B, h, stroke=0, fill=1)
+    can.save()
+    packet.seek(0)
+    return PdfReader(packet)
+
+# ---------- PyMuPDF stamping engine ----------
+# engine="pymupdf" draws the same label, border and punch-margin fill straight
+# into each page's content stream: one parse and one save per file instead of a
+# ReportLab document, a PdfReader and a merge per page. Geometry is computed in
+# PDF user space exactly as _overlay_pdf does and mapped with the page's
+# transformation matrix, so output is pixel-compatible with engine="pypdf2".
+BATES_ENGINES = ("pypdf2", "pymupdf")
+
+def _pymupdf_engine_available(font_name: str) -> bool:
+    # ReportLab and MuPDF share the 14 standard PDF fonts; anything else stays on PyPDF2
+    return fitz is not None and font_name in fitz.Base14_fontnames
+
+# Output profiles for labeled PDFs. "standard" saves what the engine produces.
+# "compact" saves through PyMuPDF with identical objects merged (the font and
+# resource dictionaries the overlay merge repeats on every page), streams deflated
+# and objects packed into object streams. Without PyMuPDF it is the same as "standard".
+PDF_OUTPUT_PROFILES = ("standard", "compact")
+COMPACT_SAVE_OPTIONS = dict(garbage=4, deflate=True, use_objstms=1)
+
+def _compact_pdf(data: bytes) -> bytes:
+    """`data` re-saved with COMPACT_SAVE_OPTIONS (returned unchanged without PyMuPDF)."""
+    if fitz is None:
+        return data
+    with _timed("compact"):
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            return doc.tobytes(no_new_id=True, **COMPACT_SAVE_OPTIONS)
+
+def _scale_page_content(doc: "fitz.Document", page: "fitz.Page", matrix: Tuple[float, ...]) -> None:
+    """Wrap the page's content streams in `q <matrix> cm ... Q` (PyPDF2's add_transformation)."""
+    contents = page.get_contents()
+    if not contents:
+        return
+    wrapped = []
+    for stream in (b"q %s cm\n" % " ".join(f"{v:.6f}" for v in matrix).encode("ascii"), b"\nQ\n"):
+        xref = doc.get_new_xref()
+        doc.update_object(xref, "<<>>")
+        doc.update_stream(xref, stream)
+        wrapped.append(xref)
+    refs = [wrapped[0], *contents, wrapped[1]]
+    doc.xref_set_key(page.xref, "Contents", "[" + " ".join(f"{x} 0 R" for x in refs) + "]")
+
+def _stamp_page_pymupdf(
+    doc: "fitz.Document", page: "fitz.Page", label: str,
+    w: float, h: float,
+    font_name: str, font_size: int,
+    margin_right: float, margin_bottom: float,
+    color_rgb: Tuple[int,int,int],
+    left_punch_margin: float = 0.0,
+    border_all_pt: float = 0.0,
+) -> None:
+    # Draw in PDF user space, as the pypdf2 overlay is merged: with /Rotate cleared the
+    # label runs along the unrotated page whatever the viewer's rotation is
+    rotation = page.rotation
+    if rotation:
+        page.set_rotation(0)
+    try:
+        _stamp_unrotated_page_pymupdf(doc, page, label, w, h, font_name, font_size, margin_right, margin_bottom,
+                                      color_rgb, left_punch_margin, border_all_pt)
+    finally:
+        if rotation:
+            page.set_rotation(rotation)
+
+def _stamp_unrotated_page_pymupdf(
+    doc: "fitz.Document", page: "fitz.Page", label: str,
+    w: float, h: float,
+    font_name: str, font_size: int,
+    margin_right: float, margin_bottom: float,
+    color_rgb: Tuple[int,int,int],
+    left_punch_margin: float,
+    border_all_pt: float,
+) -> None:
+    to_page = page.transformation_matrix  # PDF user space -> MuPDF page space (mediabox offset, y flip)
+
+    def _fill_rect(x: float, y: float, rw: float, rh: float) -> None:
+        rect = (fitz.Rect(x, y, x + rw, y + rh) * to_page).normalize()
+        page.draw_rect(rect, color=None, fill=(1, 1, 1), width=0, overlay=True)
 
-    # Fallback for older PyPDF2 versions without Transformation support:
-    # Draw white rectangle to cover left margin area
     if left_punch_margin and left_punch_margin > 0:
-        can.setFillColor(Color(1, 1, 1))
-        can.rect(0, 0, left_punch_margin, h, stroke=0, fill=1)
+        scale = (w - left_punch_margin) / w
+        _scale_page_content(doc, page, (scale, 0, 0, scale, left_punch_margin, (h - h * scale) / 2))
 
-    can.setFont(font_name, font_size)
-    can.setFillColor(Color(r/255, g/255, b/255))
+    if border_all_pt and border_all_pt > 0:
+        B = float(border_all_pt)
+        _fill_rect(0, h - B, w, B)
+        _fill_rect(0, 0, w, B)
+        _fill_rect(0, 0, B, h)
+        _fill_rect(w - B, 0, B, h)
+
+    r, g, b = color_rgb
     eff_mr = max(margin_right, border_all_pt or 0.0)
     eff_mb = max(margin_bottom, border_all_pt or 0.0)
-    can.drawRightString(w - eff_mr, eff_mb, label)
+    x = w - eff_mr - _pdf_text_width(label, font_name, font_size)
+    page.insert_text(fitz.Point(x, eff_mb) * to_page, label, fontname=font_name, fontsize=font_size,
+                     color=(r / 255, g / 255, b / 255))
 
-    can.save()
-    packet.seek(0)
-    return PdfReader(packet)
+def _label_pdf_pymupdf(
+    data: bytes, number: int, *,
+    prefix: str, digits: int,
+    font_name: str, font_size: int,
+    margin_right: float, margin_bottom: float,
+    zone: Optional[str], zone_padding: float,
+    color_rgb: Tuple[int,int,int],
+    left_punch_margin: float, border_all_pt: float,
+    on_page: Callable[[int, int], None],
+    compact: bool = False,
+) -> Optional[Tuple[bytes, int]]:
+    """
+    Label every page of one PDF starting at Bates `number`; returns (pdf_bytes, pages),
+    or None when the file is encrypted with a non-empty password.
+    `on_page(pages_done, pages_total)` is called after each page. `compact` saves
+    with COMPACT_SAVE_OPTIONS.
+    """
+    with _timed("pdf_parse"):
+        doc = fitz.open(stream=data, filetype="pdf")
+    try:
+        if doc.needs_pass and not doc.authenticate(""):
+            return None
+        n_pages = doc.page_count
+        for i, page in enumerate(doc):
+            w, h = page.mediabox.width, page.mediabox.height
+            label = _format_label(prefix, number + i, digits, with_space=True)
+            mr, mb = margin_right, margin_bottom
+            if zone:
+                mr, mb = _compute_margins_for_page(
+                    zone, w, h, label, font_name, font_size, zone_padding, border_all_pt
+                )
+            with _timed("overlay_render"):
+                _stamp_page_pymupdf(doc, page, label, w, h, font_name, font_size,
+                                    mr, mb, color_rgb, left_punch_margin, border_all_pt)
+            _count("pages_processed")
+            on_page(i + 1, n_pages)
+        with _timed("merge"):
+            # Keep the source /ID so the same input always gives the same bytes
+            save_options = COMPACT_SAVE_OPTIONS if compact else {}
+            return doc.tobytes(encryption=fitz.PDF_ENCRYPT_NONE, no_new_id=True, **save_options), n_pages
+    finally:
+        doc.close()
+
+# Encoder settings for labeled JPEGs (walk_and_label's jpeg_quality / jpeg_optimize)
+JPEG_QUALITY = 92
+IMAGE_ENCODER_OPTIONS = ("jpeg_quality", "jpeg_optimize")
+
+def _decode_image(data: bytes) -> Image.Image:
+    """Decode an image once, upright (EXIF orientation applied in place)."""
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    ImageOps.exif_transpose(img, in_place=True)
+    return img
+
+def _pad_image(img: Image.Image, left: int, border: int) -> Image.Image:
+    """
+    `img` on a white canvas widened by `left` (punch margin) plus `border` on every side,
+    in one allocation. Fills match padding for the punch margin and then the border:
+    RGBA sources (and non-RGB ones that got a punch margin) get a transparent border.
+    """
+    mode = "RGB" if img.mode == "RGB" else "RGBA"
+    opaque = (255, 255, 255) if mode == "RGB" else (255, 255, 255, 255)
+    clear = (255, 255, 255) if mode == "RGB" else (255, 255, 255, 0)
+    left_fill = clear if img.mode == "RGBA" else opaque
+    border_fill = clear if img.mode == "RGBA" or (left > 0 and img.mode != "RGB") else opaque
+    canvas = Image.new(mode, (img.width + left + 2 * border, img.height + 2 * border),
+                       border_fill if border > 0 else left_fill)
+    if left > 0 and border > 0 and left_fill != border_fill:
+        canvas.paste(left_fill, (border, border, border + left, border + img.height))
+    canvas.paste(img, (left + border, border))
+    return canvas
 
 def _label_image(
-    in_file: Path, out_file: Path, label: str,
+    img: Image.Image, suffix: str, label: str,
     font_name: str, font_size_pt: int,
     margin_right_pt: float, margin_bottom_pt: float,
     color_rgb: Tuple[int,int,int],
     left_punch_margin_pt: float = 0.0,
     border_all_pt: float = 0.0,
-):
-    img = Image.open(in_file)
-    img = ImageOps.exif_transpose(img)
-
+    jpeg_quality: int = JPEG_QUALITY,
+    jpeg_optimize: bool = True,
+) -> bytes:
+    """
+    Stamp `label` on a decoded, upright image (see _decode_image); `suffix` picks the
+    output format. The image may be modified in place. Returns the encoded image.
+    """
     dpi = _pil_dpi(img)
     px_per_point = dpi / 72.0
 
     mx = int(round(margin_right_pt * px_per_point))
     my = int(round(margin_bottom_pt * px_per_point))
-    lp = int(round(left_punch_margin_pt * px_per_point))
-    bp = int(round(border_all_pt * px_per_point))
-
-    if lp > 0:
-        new_img = Image.new(
-            "RGB" if img.mode == "RGB" else "RGBA",
-            (img.width + lp, img.height),
-            (255, 255, 255) if img.mode != "RGBA" else (255, 255, 255, 0),
-        )
-        new_img.paste(img, (lp, 0))
-        img = new_img
+    lp = max(0, int(round(left_punch_margin_pt * px_per_point)))
+    bp = max(0, int(round(border_all_pt * px_per_point)))
 
+    if lp > 0 or bp > 0:
+        img = _pad_image(img, lp, bp)
     if bp > 0:
-        new_img = Image.new(
-            "RGB" if img.mode == "RGB" else "RGBA",
-            (img.width + 2 * bp, img.height + 2 * bp),
-            (255, 255, 255) if img.mode != "RGBA" else (255, 255, 255, 0),
-        )
-        new_img.paste(img, (bp, bp))
-        img = new_img
         mx = max(mx, bp)
         my = max(my, bp)
 
@@ -800,25 +1319,20 @@ def _label_image(
     x = max(0, img.width - mx - tw)
     y = max(0, img.height - my - th)
 
-    for ox, oy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
-        draw.text((x + ox, y + oy), label, font=font, fill=(0, 0, 0))
+    # Black 1px outline and the colored fill in a single pass
+    draw.text((x, y), label, font=font, fill=color_rgb, stroke_width=1, stroke_fill=(0, 0, 0))
 
-    draw.text((x, y), label, font=font, fill=color_rgb)
-
-    if out_file.suffix.lower() in [".jpg", ".jpeg"]:
-        img.convert("RGB").save(out_file, quality=92, optimize=True)
+    out = io.BytesIO()
+    if suffix in [".jpg", ".jpeg"]:
+        (img if img.mode == "RGB" else img.convert("RGB")).save(
+            out, format="JPEG", quality=jpeg_quality, optimize=jpeg_optimize)
     else:
-        img.save(out_file)
+        img.save(out, format="PNG")
+    return out.getvalue()
 
+@functools.lru_cache(maxsize=4096)
 def _measure_text_px(txt: str, font_name: str, font_size_px: int) -> Tuple[int, int]:
-    try:
-        font = load_font(font_name, font_size_px)
-    except Exception:
-        font = ImageFont.load_default()
-    # Create a dummy image to draw on
-    dummy = Image.new("RGB", (10, 10))
-    draw = ImageDraw.Draw(dummy)
-    bbox = draw.textbbox((0, 0), txt, font=font)
+    bbox = load_font(font_name, font_size_px).getbbox(txt)
     tw = bbox[2] - bbox[0]
     th = bbox[3] - bbox[1]
     return tw, th
@@ -826,15 +1340,15 @@ def _measure_text_px(txt: str, font_name: str, font_size_px: int) -> Tuple[int,
 def _compute_margins_for_page(
     zone: str, w: float, h: float,
     text: str, font_name: str, font_size: int,
-    padding_pt: float, border_pt: float
+    padding_pt: float, border_pt: float,
+    text_width: Optional[float] = None,
 ) -> Tuple[float, float]:
-    # Convert points to pixels (assuming 72 DPI for PDF coordinate system match)
-    # Actually, ReportLab uses points directly (1/72 inch).
-    # PIL uses pixels. If we treat PDF points as "pixels" for PIL measurement:
-    
-    # Measure text in "points" (treating them as pixels for the font loader)
-    # This is an approximation, but consistent with how _overlay_pdf works
-    tw, th = _measure_text_px(text, font_name, font_size)
+    """
+    Right/bottom margins (points) that place `text` in `zone` on a w x h page.
+    The label width defaults to the ReportLab metrics the overlay is drawn with;
+    images pass their own `text_width`.
+    """
+    tw = _pdf_text_width(text, font_name, font_size) if text_width is None else text_width
     
     pad = padding_pt
     border = border_pt
@@ -851,8 +1365,330 @@ def _compute_margins_for_page(
         
     return mr, mb
 
+def _sort_procset(page) -> None:
+    # merge_page unions /ProcSet through a set, whose order varies with the process's
+    # hash seed; sort it so it doesn't depend on the process. This does not make labeled
+    # files byte-identical: PyPDF2 also renames merged fonts with random suffixes.
+    try:
+        resources = page["/Resources"].get_object()
+        procset = resources["/ProcSet"].get_object()
+        procset.sort(key=str)
+    except Exception:
+        pass
+
+def _label_pdf_pypdf2(
+    data: bytes, number: int, *,
+    prefix: str, digits: int,
+    font_name: str, font_size: int,
+    margin_right: float, margin_bottom: float,
+    zone: Optional[str], zone_padding: float,
+    color_rgb: Tuple[int,int,int],
+    left_punch_margin: float, border_all_pt: float,
+    on_page: Callable[[int, int], None],
+) -> Optional[Tuple[bytes, int]]:
+    """engine="pypdf2" counterpart of _label_pdf_pymupdf (one batched ReportLab overlay per file)."""
+    with _timed("pdf_parse"):
+        reader = PdfReader(io.BytesIO(data))
+    if getattr(reader, "is_encrypted", False):
+        try:
+            reader.decrypt("")
+        except Exception:
+            return None
+
+    writer = PdfWriter()
+    pages = list(reader.pages)
+    n_pages = len(pages)
+    overlay_pages: List[OverlayPage] = []
+    for i, page in enumerate(pages):
+        w, h = _page_size(page)
+        label = _format_label(prefix, number + i, digits, with_space=True)
+
+        # Apply scaling transformation for left punch margin
+        # This scales content to fit and shifts it right, preserving all content
+        use_transform = False
+        if left_punch_margin and left_punch_margin > 0 and Transformation is not None:
+            try:
+                scale = (w - left_punch_margin) / w
+                # Scale uniformly to maintain aspect ratio, then translate right
+                # The vertical offset centers the scaled content vertically
+                vertical_offset = (h - (h * scale)) / 2
+                op = Transformation().scale(scale, scale).translate(
+                    left_punch_margin, vertical_offset
+                )
+                page.add_transformation(op)
+                use_transform = True
+            except Exception:
+                use_transform = False
+
+        # Calculate margins dynamically if zone is provided
+        mr, mb = margin_right, margin_bottom
+        if zone:
+            mr, mb = _compute_margins_for_page(
+                zone, w, h, label, font_name, font_size, zone_padding, border_all_pt
+            )
+
+        # If transformation was used, don't pass left_punch_margin to overlay
+        # (no need for white rectangle). Otherwise, use fallback white rectangle.
+        overlay_margin = 0 if use_transform else left_punch_margin
+        overlay_pages.append((label, w, h, mr, mb, overlay_margin))
+
+    with _timed("overlay_render"):
+        overlay = _overlay_pdf(overlay_pages, font_name, font_size, color_rgb, border_all_pt)
+
+    for i, (page, overlay_page) in enumerate(zip(pages, overlay.pages)):
+        with _timed("merge"):
+            page.merge_page(overlay_page)
+            _sort_procset(page)
+        writer.add_page(page)
+        _count("pages_processed")
+        on_page(i + 1, n_pages)
+
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue(), n_pages
+
+def _label_image_file(
+    data: bytes, suffix: str, number: int, *,
+    prefix: str, digits: int,
+    font_name: str, font_size: int,
+    margin_right: float, margin_bottom: float,
+    zone: Optional[str], zone_padding: float,
+    color_rgb: Tuple[int,int,int],
+    left_punch_margin: float, border_all_pt: float,
+    jpeg_quality: int = JPEG_QUALITY, jpeg_optimize: bool = True,
+) -> Tuple[bytes, int]:
+    """Label one image with Bates `number`; returns (image_bytes, 1). The image is decoded once."""
+    label = _format_label(prefix, number, digits, with_space=True)
+    with _timed("overlay_render"):
+        img = _decode_image(data)
+        mr, mb = margin_right, margin_bottom
+        if zone:
+            # Zone math works in points; convert the (EXIF-rotated) image size using its DPI
+            px_per_pt = _pil_dpi(img) / 72.0
+            mr, mb = _compute_margins_for_page(
+                zone, img.width / px_per_pt, img.height / px_per_pt, label, font_name, font_size,
+                zone_padding, border_all_pt, text_width=_measure_text_px(label, font_name, font_size)[0],
+            )
+        labeled = _label_image(
+            img, suffix, label, font_name, font_size,
+            mr, mb, color_rgb,
+            left_punch_margin, border_all_pt,
+            jpeg_quality=jpeg_quality, jpeg_optimize=jpeg_optimize,
+        )
+    _count("pages_processed")
+    return labeled, 1
+
+def _label_file(data: bytes, suffix: str, number: int, options: Dict[str, object],
+                on_page: Optional[Callable[[int, int], None]] = None) -> Optional[Tuple[bytes, int]]:
+    """
+    Label one PDF or image starting at Bates `number`: (labeled_bytes, numbers_used),
+    or None when the file can't be labeled (it then uses no numbers).
+    `options` are walk_and_label's styling keyword arguments plus `engine`.
+    """
+    options = dict(options)
+    engine = options.pop("engine", "pypdf2")
+    compact = options.pop("output_profile", "standard") == "compact"
+    encoder = {k: options.pop(k) for k in IMAGE_ENCODER_OPTIONS if k in options}
+    on_page = on_page or (lambda done, total: None)
+    try:
+        if suffix == ".pdf":
+            if _label_engine(engine, str(options["font_name"])) == "pymupdf":
+                return _label_pdf_pymupdf(data, number, on_page=on_page, compact=compact, **options)
+            result = _label_pdf_pypdf2(data, number, on_page=on_page, **options)
+            if compact and result is not None:
+                result = (_compact_pdf(result[0]), result[1])
+            return result
+        return _label_image_file(data, suffix, number, **options, **encoder)
+    except Exception:
+        return None
+
+def _label_file_in_worker(data: bytes, suffix: str, number: int,
+                          options: Dict[str, object]) -> Tuple[Optional[Tuple[bytes, int]], Dict[str, Dict]]:
+    """_label_file for a label-pool process; stage metrics travel back with the result."""
+    with collect_metrics() as m:
+        result = _label_file(data, suffix, number, options)
+    return result, {"timings": dict(m["timings"]), "counters": dict(m["counters"])}
+
+def _merge_metrics(data: Dict[str, Dict]) -> None:
+    """Fold metrics collected in another process into the current collect_metrics() block."""
+    current = getattr(_instrumentation, "data", None)
+    if current is None:
+        return
+    for stage, durations in data.get("timings", {}).items():
+        current["timings"][stage].extend(durations)
+    current["counters"].update(data.get("counters", {}))
+
+def _label_engine(engine: str, font_name: str) -> str:
+    """The engine that actually stamps PDFs: "pymupdf" falls back to "pypdf2" for non-standard fonts."""
+    return "pymupdf" if engine == "pymupdf" and _pymupdf_engine_available(font_name) else "pypdf2"
+
+def _label_count(data: bytes, suffix: str, engine: str = "pypdf2") -> int:
+    """
+    Bates numbers a file will use when stamped by `engine` (see _label_engine), from
+    the page tree alone (no content is parsed). Each engine's own parser counts, as
+    PyMuPDF and PyPDF2 can disagree on a damaged page tree.
+    """
+    if suffix != ".pdf":
+        return 1
+    if engine == "pymupdf":
+        try:
+            with fitz.open(stream=data, filetype="pdf") as doc:
+                if doc.needs_pass and not doc.authenticate(""):
+                    return 0
+                return doc.page_count
+        except Exception:
+            return 0
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        if getattr(reader, "is_encrypted", False):
+            reader.decrypt("")
+        return len(reader.pages)
+    except Exception:
+        return 0
+
+LabelEntry = Tuple[str, str, Callable[[], bytes]]  # (rel_dir, filename, load)
+
+def _category(rel_dir: str) -> str:
+    """Deepest folder of a labeled file ("" at the top level)."""
+    return Path(rel_dir).parts[-1] if rel_dir not in (".", "") and Path(rel_dir).parts else ""
+
+def _label_entries(sources: Iterable[Tuple[str, Callable[[], bytes]]]) -> List[LabelEntry]:
+    """
+    PDFs and images in labeling order: a directory's own files (PDFs, then images, each
+    in natural order) before its subdirectories, which are visited in natural order.
+    This is os.walk order over the extracted tree; a repeated path keeps the last copy.
+    """
+    tree: Dict[Tuple[str, ...], Tuple[str, Callable[[], bytes]]] = {}
+    for name, load in sources:
+        parts = tuple(p for p in PurePosixPath(name).parts if p not in ("/", ".", ".."))
+        if not parts or _is_mac_resource_junk(name) or any(_is_mac_resource_junk(p) for p in parts):
+            continue
+        tree[parts] = (name, load)
+
+    def _key(parts: Tuple[str, ...]):
+        fname = parts[-1]
+        kind = 0 if fname.lower().endswith(".pdf") else 1
+        return [(1, natural_key(d)) for d in parts[:-1]] + [(0, kind, natural_key(fname))]
+
+    entries: List[LabelEntry] = []
+    for parts in sorted(tree, key=_key):
+        fname = parts[-1]
+        if fname.lower().endswith(".pdf") or Path(fname).suffix.lower() in IMAGE_EXTS:
+            entries.append(("/".join(parts[:-1]) or ".", fname, tree[parts][1]))
+    return entries
+
+def _label_parallel(entries: List[LabelEntry], counts: List[int], start_num: int, options: Dict[str, object],
+                    executor: concurrent.futures.Executor, skip: Callable[[int, int], bool] = lambda i, start: False
+                    ) -> Iterator[Tuple[Callable[[], bytes], Callable[[int], Optional[Tuple[bytes, int]]]]]:
+    """
+    Yield, per entry in order, (load, label): load() returns the entry's data (read once)
+    and label(number) returns _label_file's result for the actual starting number.
+    `counts` (a page-count prepass) gives every file its starting number up front, so
+    files are stamped concurrently on `executor`, a bounded window ahead of the consumer.
+    If a file starts at a different number than predicted, the window is cancelled and
+    the remaining files are resubmitted from the corrected number, so every file gets
+    the same labels and range as in the sequential run. A file for which
+    `skip(index, start)` holds (e.g. one expected to be reused) is only stamped if
+    label() is called for it.
+    """
+    ahead = 2 * max(1, getattr(executor, "_max_workers", None) or os.cpu_count() or 1)
+    starts = [start_num] * len(entries)
+    for i in range(1, len(entries)):
+        starts[i] = starts[i - 1] + counts[i - 1]
+    # [index, data or None, future or None] per entry taken from `entries`, in order
+    window: Deque[List] = deque()
+    taken = 0
+
+    def _submit(i: int, data: bytes, number: int) -> Optional[concurrent.futures.Future]:
+        try:
+            return executor.submit(_label_file_in_worker, data, Path(entries[i][1]).suffix.lower(), number, options)
+        except _POOL_SUBMIT_ERRORS:
+            return None  # executor unusable (e.g. a broken pool): label this file here
+
+    def _schedule(job: List) -> None:
+        i = job[0]
+        if not skip(i, starts[i]):
+            if job[1] is None:
+                job[1] = entries[i][2]()
+            job[2] = _submit(i, job[1], starts[i])
+
+    def _fill() -> None:
+        nonlocal taken
+        while taken < len(entries) and sum(job[2] is not None for job in window) < ahead:
+            job = [taken, None, None]
+            taken += 1
+            _schedule(job)
+            window.append(job)
+
+    def _rebase(i: int, number: int) -> None:
+        """Entry i starts at `number`: move the later predictions and resubmit the window."""
+        starts[i] = number
+        for j in range(i + 1, len(entries)):
+            starts[j] = starts[j - 1] + counts[j - 1]
+        for job in window:
+            if job[2] is not None:
+                job[2].cancel()
+                job[2] = None
+            _schedule(job)
+
+    def _entry(job: List) -> Tuple[Callable[[], bytes], Callable[[int], Optional[Tuple[bytes, int]]]]:
+        i = job[0]
+
+        def _load() -> bytes:
+            if job[1] is None:
+                job[1] = entries[i][2]()
+            return job[1]
+
+        def _label(number: int) -> Optional[Tuple[bytes, int]]:
+            if number != starts[i] or job[2] is None:
+                if number != starts[i]:
+                    _rebase(i, number)
+                job[2] = _submit(i, _load(), number)
+            if job[2] is not None:
+                try:
+                    result, stage_data = job[2].result()
+                except _POOL_RESULT_ERRORS:
+                    pass  # the worker died: label this file here
+                else:
+                    _merge_metrics(stage_data)
+                    return result
+            return _label_file(_load(), Path(entries[i][1]).suffix.lower(), number, options)
+
+        return _load, _label
+
+    for _ in range(len(entries)):
+        _fill()
+        yield _entry(window.popleft())
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _previous_outputs(previous: Source, settings: Dict[str, object], stack: contextlib.ExitStack
+                      ) -> Dict[str, Tuple[BatesRecord, Callable[[], bytes]]]:
+    """
+    {rel_path: (record, load)} for the stamped files of a prior walk_and_label_zip
+    output. Empty unless its manifest was written with the same label settings.
+    The ZIP comes from the client and is trusted: its hashes only show that a stamped
+    file matches the manifest, not that this code stamped it.
+    """
+    zf = stack.enter_context(_open_zip_source(previous))
+    try:
+        manifest = json.loads(zf.read(BATES_MANIFEST_JSON))
+    except (KeyError, ValueError):
+        return {}
+    records = read_bates_manifest(zf)
+    if not isinstance(manifest, dict) or manifest.get("settings") != settings or records is None:
+        return {}
+    names = set(zf.namelist())
+    found = {}
+    for r in records:
+        rel_path = r.filename if r.rel_dir == "." else f"{r.rel_dir}/{r.filename}"
+        if r.source_sha256 and r.output_sha256 and rel_path in names:
+            found[rel_path] = (r, functools.partial(zf.read, rel_path))
+    return found
+
 def walk_and_label(
-    input_zip_or_pdfs: List[Tuple[str, bytes]], *,
+    input_zip_or_pdfs: List[Tuple[str, Source]], *,
     prefix: str, start_num: int, digits: int,
     font_name: str, font_size: int,
     margin_right: float = 18.0, margin_bottom: float = 18.0,
@@ -860,178 +1696,191 @@ def walk_and_label(
     color_rgb: Tuple[int,int,int],
     left_punch_margin: float = 0.0,
     border_all_pt: float = 0.0,
-) -> Tuple[List[BatesRecord], int, List[Tuple[str,bytes]]]:
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        tmp = Path(tmp_dir)
-        staged = tmp / "staged"
-        staged.mkdir(parents=True, exist_ok=True)
-        output = tmp / "labeled"
-        output.mkdir(parents=True, exist_ok=True)
-
-        for disp, data in input_zip_or_pdfs:
-            if _is_mac_resource_junk(disp):
-                continue
-            p = staged / disp
-            p.parent.mkdir(parents=True, exist_ok=True)
-            p.write_bytes(data)
-
+    engine: str = "pypdf2",
+    output_profile: str = "standard",
+    jpeg_quality: int = JPEG_QUALITY,
+    jpeg_optimize: bool = True,
+    previous: Optional[Source] = None,
+    executor: Optional[concurrent.futures.Executor] = None,
+    sink: Optional[Callable[[str, bytes], None]] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Tuple[List[BatesRecord], int, List[Tuple[str,bytes]], Dict[str, object]]:
+    """
+    Label every PDF page / image in natural tree order.
+    ZIP inputs are expanded. Labeled files are collected into the returned pairs,
+    or handed to `sink(rel_path, data)` one at a time when a sink is given.
+    `engine` picks how PDF pages are stamped: "pypdf2" (ReportLab overlay merged
+    per page) or "pymupdf" (drawn in place, one parse/save per file); see BATES_ENGINES.
+    `output_profile` "compact" writes smaller PDFs (see PDF_OUTPUT_PROFILES).
+    Labeled JPEGs are encoded at `jpeg_quality` (1-100), with Huffman table optimization
+    when `jpeg_optimize` is set (smaller files, slower on large photos).
+    With an `executor` (e.g. a process pool), files are stamped on it concurrently
+    (see _label_parallel). Files, their order and names, labels, Bates ranges and records
+    match the sequential run, except output_sha256: labeled PDF bytes are not reproducible
+    from run to run (the "pypdf2" engine's differ even between two sequential runs).
+    `previous` is a labeled ZIP from an earlier run with the same settings: a file
+    whose path and content are unchanged and whose range starts at the same number
+    is copied from it instead of being stamped again.
+    The report holds the label settings (for the manifest), the engine that stamped the
+    PDFs ("pypdf2" when "pymupdf" was asked for with a font outside the standard 14)
+    and files_labeled / files_reused.
+    """
+    if engine not in BATES_ENGINES:
+        raise ValueError(f"engine must be one of {', '.join(BATES_ENGINES)}")
+    if output_profile not in PDF_OUTPUT_PROFILES:
+        raise ValueError(f"output_profile must be one of {', '.join(PDF_OUTPUT_PROFILES)}")
+    if not 1 <= jpeg_quality <= 100:
+        raise ValueError("jpeg_quality must be between 1 and 100")
+    options: Dict[str, object] = dict(
+        prefix=prefix, digits=digits, font_name=font_name, font_size=font_size,
+        margin_right=margin_right, margin_bottom=margin_bottom, zone=zone, zone_padding=zone_padding,
+        color_rgb=color_rgb, left_punch_margin=left_punch_margin, border_all_pt=border_all_pt, engine=engine,
+        output_profile=output_profile, jpeg_quality=jpeg_quality, jpeg_optimize=jpeg_optimize,
+    )
+    settings = json.loads(json.dumps(options))  # as stored in the manifest (tuples become lists)
+    with contextlib.ExitStack() as stack:
+        entries = _label_entries(stack.enter_context(_lazy_sources(input_zip_or_pdfs)))
+        prior = _previous_outputs(previous, settings, stack) if previous is not None else {}
+
+        def _prior_for(i: int, digest: str) -> Optional[Tuple[BatesRecord, Callable[[], bytes]]]:
+            rel_dir, fname, _ = entries[i]
+            found = prior.get(fname if rel_dir == "." else f"{rel_dir}/{fname}")
+            return found if found is not None and found[0].source_sha256 == digest else None
+
+        files_total = len(entries)
+        pages_done = 0
         current = start_num
+        reused = 0
         records: List[BatesRecord] = []
         labeled_pairs: List[Tuple[str, bytes]] = []
+        emit = sink or (lambda rel, b: labeled_pairs.append((rel, b)))
+        parallel = None
+        digests: Dict[int, str] = {}
+        if executor is not None and files_total > 1:
+            # Page-count prepass (each file is read once); files expected to be reused keep
+            # their prior page counts and are not sent to the executor
+            counts: List[int] = []
+            unchanged: Dict[int, BatesRecord] = {}
+            for i, (_, fname, load) in enumerate(entries):
+                data = load()
+                found = None
+                if prior:
+                    digests[i] = _sha256(data)
+                    found = _prior_for(i, digests[i])
+                if found is not None:
+                    unchanged[i] = found[0]
+                counts.append(found[0].pages_or_files if found is not None
+                              else _label_count(data, Path(fname).suffix.lower(), _label_engine(engine, font_name)))
+            data = None
+            parallel = _label_parallel(
+                entries, counts, start_num, options, executor,
+                skip=lambda i, start: i in unchanged and unchanged[i].first_label == _format_label(prefix, start, digits))
+
+        for files_done, (rel_dir, fname, load) in enumerate(entries):
+            rel_path = fname if rel_dir == "." else f"{rel_dir}/{fname}"
+            _report(progress, files_done=files_done, files_total=files_total, pages_done=pages_done,
+                    current=rel_path)
+
+            pending = None
+            if parallel is not None:
+                load, pending = next(parallel)
+            if files_done in digests:
+                digest = digests[files_done]
+            else:
+                data = load()
+                digest = _sha256(data)
+            found = _prior_for(files_done, digest) if prior else None
+            result = None
+            if found is not None and found[0].first_label == _format_label(prefix, current, digits):
+                labeled = found[1]()
+                if _sha256(labeled) == found[0].output_sha256:
+                    result = (labeled, found[0].pages_or_files)
+                    reused += 1
+            if result is None:
+                if pending is not None:
+                    result = pending(current)
+                else:
+                    def _on_page(n: int, total: int) -> None:
+                        _report(progress, files_done=files_done, files_total=files_total,
+                                pages_done=pages_done + n, current=rel_path,
+                                current_pages_done=n, current_pages_total=total)
+                    result = _label_file(data, Path(fname).suffix.lower(), current, options, _on_page)
+            if result is None:
+                continue
 
-        for dirpath, dirnames, filenames in os.walk(staged, topdown=True):
-            dirnames[:] = [d for d in sorted(dirnames, key=natural_key) if not _is_mac_resource_junk(d)]
-            filenames = [f for f in sorted(filenames, key=natural_key) if not _is_mac_resource_junk(f)]
-
-            rel_dir = str(Path(dirpath).relative_to(staged))
-            out_dir = output / rel_dir if rel_dir != "." else output
-            out_dir.mkdir(parents=True, exist_ok=True)
-
-            pdfs = [f for f in filenames if f.lower().endswith(".pdf")]
-            imgs = [f for f in filenames if Path(f).suffix.lower() in IMAGE_EXTS]
-
-            for fname in pdfs:
-                src = Path(dirpath) / fname
-                out = out_dir / fname
-                first = current
-                pages_count = 0
-
-                try:
-                    reader = PdfReader(str(src))
-                    if getattr(reader, "is_encrypted", False):
-                        try:
-                            reader.decrypt("")
-                        except Exception:
-                            continue
-
-                    writer = PdfWriter()
-                    for page in reader.pages:
-                        w, h = _page_size(page)
-                        label = _format_label(prefix, current, digits, with_space=True)
-
-                        # Apply scaling transformation for left punch margin
-                        # This scales content to fit and shifts it right, preserving all content
-                        use_transform = False
-                        if left_punch_margin and left_punch_margin > 0 and Transformation is not None:
-                            try:
-                                scale = (w - left_punch_margin) / w
-                                # Scale uniformly to maintain aspect ratio, then translate right
-                                # The vertical offset centers the scaled content vertically
-                                vertical_offset = (h - (h * scale)) / 2
-                                op = Transformation().scale(scale, scale).translate(
-                                    left_punch_margin, vertical_offset
-                                )
-                                page.add_transformation(op)
-                                use_transform = True
-                            except Exception:
-                                use_transform = False
-
-                        # Calculate margins dynamically if zone is provided
-                        mr, mb = margin_right, margin_bottom
-                        if zone:
-                            mr, mb = _compute_margins_for_page(
-                                zone, w, h, label, font_name, font_size, zone_padding, border_all_pt
-                            )
-
-                        # If transformation was used, don't pass left_punch_margin to overlay
-                        # (no need for white rectangle). Otherwise, use fallback white rectangle.
-                        overlay_margin = 0 if use_transform else left_punch_margin
-                        overlay = _overlay_pdf(
-                            label, w, h, font_name, font_size,
-                            mr, mb, color_rgb,
-                            overlay_margin, border_all_pt
-                        )
-                        page.merge_page(overlay.pages[0])
-                        writer.add_page(page)
-                        current += 1
-                        pages_count += 1
-
-                    with open(out, "wb") as f:
-                        writer.write(f)
-
-                    labeled_pairs.append((str(out.relative_to(output)), out.read_bytes()))
-
-                except Exception:
-                    continue
-
-                last = current - 1
-                cat = Path(rel_dir).parts[-1] if rel_dir not in (".", "") and Path(rel_dir).parts else ""
-
-                records.append(BatesRecord(
-                    rel_dir=rel_dir,
-                    filename=fname,
-                    pages_or_files=pages_count,
-                    first_label=_format_label(prefix, first, digits, with_space=True),
-                    last_label=_format_label(prefix, last, digits, with_space=True),
-                    category=cat,
-                ))
-
-            for fname in imgs:
-                src = Path(dirpath) / fname
-                out = out_dir / fname
-                first = current
+            labeled, used = result
+            emit(rel_path, labeled)
+            first, last = current, current + used - 1
+            current += used
+            pages_done += used
+            records.append(BatesRecord(
+                rel_dir=rel_dir,
+                filename=fname,
+                pages_or_files=used,
+                first_label=_format_label(prefix, first, digits, with_space=True),
+                last_label=_format_label(prefix, last, digits, with_space=True),
+                category=_category(rel_dir),
+                source_sha256=digest,
+                output_sha256=_sha256(labeled),
+            ))
+
+    _report(progress, files_done=files_total, files_total=files_total, pages_done=pages_done)
+    report = {"settings": settings, "engine": _label_engine(engine, font_name),
+              "files_labeled": len(records) - reused, "files_reused": reused}
+    return records, current - 1, labeled_pairs, report
+
+def plan_labels(
+    input_zip_or_pdfs: List[Tuple[str, Source]], *,
+    prefix: str, start_num: int, digits: int,
+    engine: str = "pypdf2", font_name: str = "Helvetica",
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, object]:
+    """
+    Dry run of walk_and_label: the files it would label, in the same order, with the
+    numbers each would use. Pages are counted from the page tree only, by the parser
+    of the engine that would stamp them (`engine` and `font_name` as for
+    walk_and_label); nothing is rendered or stamped. A file that can't be opened
+    (e.g. password protected) is listed with 0 pages and no labels, as labeling
+    would skip it.
+    """
+    engine = _label_engine(engine, font_name)
+    planned: List[Dict[str, object]] = []
+    current = start_num
+    with _lazy_sources(input_zip_or_pdfs) as sources:
+        entries = _label_entries(sources)
+        for files_done, (rel_dir, fname, load) in enumerate(entries):
+            _report(progress, files_done=files_done, files_total=len(entries), current=fname)
+            used = _label_count(load(), Path(fname).suffix.lower(), engine)
+            planned.append({
+                "rel_dir": rel_dir,
+                "filename": fname,
+                "category": _category(rel_dir),
+                "pages": used,
+                "first_label": _format_label(prefix, current, digits) if used else None,
+                "last_label": _format_label(prefix, current + used - 1, digits) if used else None,
+            })
+            current += used
+    _report(progress, files_done=len(entries), files_total=len(entries))
+    return {
+        "files": planned,
+        "files_total": len(planned),
+        "pages_total": current - start_num,
+        "first_bates_number": start_num,
+        "last_bates_number": current - 1,
+    }
 
-                try:
-                    label = _format_label(prefix, current, digits, with_space=True)
-                    
-                    # For images, we need to open it to get dimensions for zone calculation
-                    # _label_image opens it again, but that's okay for now.
-                    # Or we can let _label_image handle it if we passed zone?
-                    # For now, let's just stick to the passed fixed margins for images 
-                    # OR we can open it here quickly.
-                    
-                    mr, mb = margin_right, margin_bottom
-                    if zone:
-                        with Image.open(io.BytesIO(src.read_bytes())) as tmp_img:
-                            tmp_img = ImageOps.exif_transpose(tmp_img)
-                            # DPI adjustment logic from _label_image is complex to replicate here perfectly
-                            # without refactoring _label_image.
-                            # However, _label_image takes POINTS for margins.
-                            # Our _compute_margins_for_page returns POINTS.
-                            # So we just need width/height in POINTS? 
-                            # No, _compute_margins_for_page assumes W/H are comparable to font size units.
-                            
-                            # Let's simplify: For images, _label_image does its own drawing.
-                            # It doesn't support "Zone" param natively yet.
-                            # But we can calculate the margins if we know the image size.
-                            
-                            # Actually, _label_image converts points to pixels using DPI.
-                            # If we pass margins in points, it handles it.
-                            # So we just need to know the image width/height in POINTS to center it?
-                            # Image width in points = width_px / (dpi/72).
-                            
-                            dpi = _pil_dpi(tmp_img)
-                            px_per_pt = dpi / 72.0
-                            w_pt = tmp_img.width / px_per_pt
-                            h_pt = tmp_img.height / px_per_pt
-                            
-                            mr, mb = _compute_margins_for_page(
-                                zone, w_pt, h_pt, label, font_name, font_size, zone_padding, border_all_pt
-                            )
-
-                    _label_image(
-                        src, out, label, font_name, font_size,
-                        mr, mb, color_rgb,
-                        left_punch_margin, border_all_pt
-                    )
-                    labeled_pairs.append((str(out.relative_to(output)), out.read_bytes()))
-                    current += 1
-                except Exception:
-                    continue
-
-                last = current - 1
-                cat = Path(rel_dir).parts[-1] if rel_dir not in (".", "") and Path(rel_dir).parts else ""
-
-                records.append(BatesRecord(
-                    rel_dir=rel_dir,
-                    filename=fname,
-                    pages_or_files=1,
-                    first_label=_format_label(prefix, first, digits, with_space=True),
-                    last_label=_format_label(prefix, last, digits, with_space=True),
-                    category=cat,
-                ))
-
-    return records, current - 1, labeled_pairs
+def walk_and_label_zip(input_zip_or_pdfs: List[Tuple[str, Source]], out: Optional[Output] = None,
+                       **kwargs) -> Tuple[List[BatesRecord], int, Optional[bytes], Dict[str, object]]:
+    """
+    walk_and_label writing each labeled file straight into a ZIP (`out`, or returned bytes),
+    followed by the bates_records.json / .csv manifest.
+    """
+    target = io.BytesIO() if out is None else out
+    with _zip_writer(target) as zf:
+        records, last_used, _, report = walk_and_label(input_zip_or_pdfs, sink=zf.writestr, **kwargs)
+        for name, data in bates_manifest_entries(records, last_used, report):
+            zf.writestr(name, data)
+    return records, last_used, target.getvalue() if out is None else None, report
 
 # ---------------- Excel builder ----------------
 def build_discovery_xlsx(
@@ -1126,6 +1975,95 @@ def build_discovery_xlsx(
     out.seek(0)
     return out.getvalue()
 
+def _index_xlsx(rel_paths: List[str], det: pd.DataFrame, party: str, title_text: str) -> bytes:
+    """Discovery Index workbook for files at `rel_paths`, with Bates ranges from `det`
+    (columns rel_dir, filename, first_label, last_label)."""
+    rows: List[Dict[str, str]] = []
+    for rel_path in rel_paths:
+        # Basic metadata
+        p = Path(rel_path)
+        rel_dir = str(p.parent) if str(p.parent) != "." else ""
+        cat = p.parts[-2] if len(p.parts) > 1 else ""
+        rows.append({"rel_dir": rel_dir, "filename": p.name, "category": cat})
+
+    df = pd.DataFrame(rows, columns=["rel_dir", "filename", "category"])
+    if not det.empty:
+        df = df.merge(det[["rel_dir","filename","first_label","last_label"]], on=["rel_dir","filename"], how="left")
+
+    # Prepare for Excel
+    if {"first_label","last_label"}.issubset(df.columns):
+        fl = df["first_label"].fillna("").astype(str)
+        ll = df["last_label"].fillna("").astype(str)
+        df["Bates Range"] = np.where(
+            (fl != "") & (ll != "") & (fl != ll),
+            fl + " - " + ll,
+            np.where(fl != "", fl, ll)
+        )
+    else:
+        df["Bates Range"] = ""
+
+    df.rename(columns={"category":"Category", "filename":"Document Name/Title"}, inplace=True)
+
+    df["Date Produced"] = df.apply(
+        lambda r: _extract_date_produced_from_rel(r.get("rel_dir",""), r.get("Document Name/Title","")),
+        axis=1
+    )
+    df["Date Produced"] = df["Date Produced"].apply(
+        lambda d: d if pd.notnull(d) and d != "" else datetime.today().date()
+    )
+
+    with _timed("xlsx_build"):
+        return build_discovery_xlsx(
+            df[["Date Produced","Document Name/Title","Category","Bates Range"]],
+            party=party,
+            title_text=title_text
+        )
+
+def _records_frame(records: List[BatesRecord]) -> pd.DataFrame:
+    """Bates ranges known from labeling, in the shape scan_pairs_for_bates returns."""
+    return pd.DataFrame(
+        [{
+            "rel_dir": r.rel_dir if r.rel_dir != "." else "",
+            "filename": r.filename,
+            "first_label": r.first_label,
+            "last_label": r.last_label,
+        } for r in records],
+        columns=["rel_dir", "filename", "first_label", "last_label"],
+    )
+
+def build_index_from_zip(zip_src: Source, party: str = "Client", title_text: str = "CLIENT NAME - DOCUMENTS",
+                         out: Optional[Output] = None, progress: Optional[ProgressCallback] = None) -> Optional[bytes]:
+    """
+    Build the Discovery Index workbook for a ZIP of labeled files.
+    Bates ranges come from the ZIP's bates_records manifest when it has one; files
+    it does not cover are scanned (first/last page text, OCR as a fallback).
+    The workbook is written to `out` when given, otherwise returned as bytes.
+    """
+    with _open_zip_source(zip_src) as zf:
+        infos = [i for i in zf.infolist()
+                 if not i.is_dir() and not _is_mac_resource_junk(i.filename) and i.filename not in BATES_MANIFEST_NAMES]
+        records = read_bates_manifest(zf)
+        known = _records_frame(records) if records is not None else _records_frame([])
+        covered = {str(Path(d, f)) for d, f in zip(known["rel_dir"], known["filename"])}
+        todo = [info for info in infos if str(Path(info.filename)) not in covered]
+        # Scan for Bates (members are read one at a time)
+        scanned = scan_pairs_for_bates(((info.filename, zf.read(info)) for info in todo),
+                                       progress=progress, files_total=len(todo))
+    det = pd.concat([known, scanned], ignore_index=True) if not scanned.empty else known
+
+    xlsx_bytes = _index_xlsx([info.filename for info in infos], det, party, title_text)
+    return _write_output(xlsx_bytes, out)
+
+def _write_output(data: bytes, out: Optional[Output]) -> Optional[bytes]:
+    """Write a finished (non-ZIP) artifact to `out`, or return it when `out` is None."""
+    if out is None:
+        return data
+    if isinstance(out, (str, os.PathLike)):
+        Path(out).write_bytes(data)
+    else:
+        out.write(data)
+    return None
+
 # ======================================================
 # 5) REDACTION
 # ======================================================
@@ -1152,6 +2090,8 @@ PRESETS: Dict[str, List[str]] = {
     "8-digit number": [r"\b\d{8}\b"],
 }
 
+_SSN_PRESETS = frozenset(PRESETS["SSN"])
+
 @dataclass
 class Hit:
     rel_path: str
@@ -1159,7 +2099,13 @@ class Hit:
     pattern: str
     matched_text: str
 
-def load_patterns(preset_keys: List[str], text_block: str, literals_block: str, case_sensitive: bool) -> List[re.Pattern]:
+# Separators between the words of a literal with `tolerant_literals`: "Acme Corp" then
+# also matches "Acme\nCorp", and "555-0100" matches "555 \u2013 0100"
+LITERAL_SEPARATOR = r"[\s\-\u2010-\u2015\u2212]"
+_SEPARATOR_RUN_RE = re.compile(LITERAL_SEPARATOR + "+")
+
+def load_patterns(preset_keys: List[str], text_block: str, literals_block: str, case_sensitive: bool,
+                  tolerant_literals: bool = False) -> List[re.Pattern]:
     raw: List[str] = []
     for key in preset_keys:
         raw.extend(PRESETS.get(key, []))
@@ -1172,7 +2118,12 @@ def load_patterns(preset_keys: List[str], text_block: str, literals_block: str,
     if literals_block:
         for token in re.split(r"[\n,]", literals_block):
             s = token.strip()
-            if s:
+            if not s:
+                continue
+            words = [w for w in _SEPARATOR_RUN_RE.split(s) if w] if tolerant_literals else []
+            if len(words) > 1:
+                raw.append((LITERAL_SEPARATOR + "+").join(re.escape(w) for w in words))
+            else:
                 raw.append(re.escape(s))
     flags = 0 if case_sensitive else re.IGNORECASE
     compiled = [re.compile(p, flags) for p in raw]
@@ -1180,6 +2131,398 @@ def load_patterns(preset_keys: List[str], text_block: str, literals_block: str,
         raise ValueError("Provide at least one pattern: select a preset, add regex, or include literal strings.")
     return compiled
 
+try:
+    from re import _parser as _re_parser  # Python 3.11+
+except ImportError:  # Python < 3.11
+    import sre_parse as _re_parser
+
+_CLASS_CATEGORIES = {
+    _re_parser.CATEGORY_DIGIT: r"\d", _re_parser.CATEGORY_NOT_DIGIT: r"\D",
+    _re_parser.CATEGORY_SPACE: r"\s", _re_parser.CATEGORY_NOT_SPACE: r"\S",
+    _re_parser.CATEGORY_WORD: r"\w", _re_parser.CATEGORY_NOT_WORD: r"\W",
+}
+_ZERO_WIDTH_OPS = {_re_parser.AT, _re_parser.ASSERT, _re_parser.ASSERT_NOT}
+_REPEAT_OPS = {_re_parser.MAX_REPEAT, _re_parser.MIN_REPEAT, getattr(_re_parser, "POSSESSIVE_REPEAT", None)}
+
+def _class_items(op, av) -> Optional[Set[str]]:
+    """A LITERAL or IN node as character class items (e.g. {"\\d", "a-z"}); None if not expressible."""
+    if op is _re_parser.LITERAL:
+        return {"\\U%08x" % av}
+    items = set()
+    for item_op, item_av in av:
+        if item_op is _re_parser.LITERAL:
+            items.add("\\U%08x" % item_av)
+        elif item_op is _re_parser.RANGE:
+            items.add("\\U%08x-\\U%08x" % item_av)
+        elif item_op is _re_parser.CATEGORY and item_av in _CLASS_CATEGORIES:
+            items.add(_CLASS_CATEGORIES[item_av])
+        else:
+            return None  # negated sets and the like
+    return items
+
+def _first_chars(items) -> Tuple[Optional[Set[str]], bool]:
+    """
+    Characters a match of the parsed sequence `items` can begin with, as class items,
+    and whether it can match the empty string. None when any character might start one.
+    """
+    first: Set[str] = set()
+    for op, av in items:
+        if op in _ZERO_WIDTH_OPS:
+            continue
+        if op is _re_parser.LITERAL or op is _re_parser.IN:
+            chars, nullable = _class_items(op, av), False
+        elif op is _re_parser.SUBPATTERN:
+            if av[1] or av[2]:
+                return None, True  # scoped flags, e.g. (?i:...)
+            chars, nullable = _first_chars(av[-1])
+        elif op is _re_parser.BRANCH:
+            chars, nullable = set(), False
+            for branch in av[1]:
+                branch_chars, branch_nullable = _first_chars(branch)
+                if branch_chars is None:
+                    return None, True
+                chars |= branch_chars
+                nullable = nullable or branch_nullable
+        elif op in _REPEAT_OPS:
+            chars, nullable = _first_chars(av[2])
+            nullable = nullable or av[0] == 0
+        else:
+            return None, True
+        if chars is None:
+            return None, True
+        first |= chars
+        if not nullable:
+            return first, False
+    return first, True
+
+def _required_chars(items, ignorecase: bool) -> Set[str]:
+    """Characters every match of the parsed sequence `items` contains (uncased ones only under IGNORECASE)."""
+    required: Set[str] = set()
+    for op, av in items:
+        if op is _re_parser.LITERAL:
+            ch = chr(av)
+            if not ch.isspace() and not (ignorecase and ch.lower() != ch.upper()):
+                required.add(ch)
+        elif op is _re_parser.SUBPATTERN and not (av[1] or av[2]):
+            required |= _required_chars(av[-1], ignorecase)
+        elif op in _REPEAT_OPS and av[0] >= 1:
+            required |= _required_chars(av[2], ignorecase)
+    return required
+
+def _analyze(pattern: re.Pattern) -> Tuple[Optional[str], FrozenSet[str], bool]:
+    """
+    (start guard, required characters, may match empty) of a pattern: a character
+    class every match starts with (None: any character, or empty matches), the
+    characters every match contains, and whether it can match the empty string.
+    """
+    try:
+        parsed = _re_parser.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return None, frozenset(), True
+    chars, nullable = _first_chars(parsed)
+    guard = "[" + "".join(sorted(chars)) + "]" if chars and not nullable else None
+    return guard, frozenset(_required_chars(parsed, bool(pattern.flags & re.IGNORECASE))), nullable
+
+# Patterns that can't share one alternation with others: backreferences and
+# conditionals (group numbers shift) and leading inline flags (they would apply to all)
+_SOLO_PATTERN_RE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(|^\(\?[aiLmsux]+\)")
+_LITERAL_GUARD_RE = re.compile(r"\[(?:\\U[0-9a-f]{8})+\]")
+# Above this many pattern.match() calls per character of text, matching each pattern
+# at the positions inside the combined scan's spans costs more than rescanning the text
+SPAN_CHECK_LIMIT = 0.25
+
+_SEPARATOR_CLASS = _re_parser.parse(LITERAL_SEPARATOR)[0]
+# From this many literal patterns on, a PatternSet finds them with an Aho-Corasick
+# automaton instead of one alternation branch each
+LITERAL_AUTOMATON_MIN = 25
+# The non-ASCII characters IGNORECASE matches to ASCII letters: İ and ı (i), ſ (s), Kelvin sign (k)
+_ASCII_CASE_EQUIVALENTS = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"})
+
+def _literal_words(pattern: re.Pattern) -> Optional[Tuple[str, ...]]:
+    """
+    The words of a pattern that only matches literal text: one for `re.escape(s)`,
+    several for words joined by LITERAL_SEPARATOR+. None for any other pattern, and
+    for non-ASCII text under IGNORECASE, whose case rules the automaton doesn't model.
+    """
+    if pattern.flags & ~(re.IGNORECASE | re.UNICODE):
+        return None
+    try:
+        parsed = _re_parser.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return None
+    words: List[str] = []
+    current: List[str] = []
+    for op, av in parsed:
+        if op is _re_parser.LITERAL:
+            current.append(chr(av))
+        elif (op is _re_parser.MAX_REPEAT and av[0] == 1 and av[1] == _re_parser.MAXREPEAT
+              and list(av[2]) == [_SEPARATOR_CLASS] and current):
+            words.append("".join(current))
+            current = []
+        else:
+            return None
+    if not current:
+        return None
+    words.append("".join(current))
+    if len(words) > 1 and any(_SEPARATOR_RUN_RE.search(w) for w in words):
+        return None
+    if pattern.flags & re.IGNORECASE and not all(w.isascii() for w in words):
+        return None
+    return tuple(words)
+
+class _Automaton:
+    """Aho-Corasick automaton: every occurrence of every (key, word) in one pass over a text."""
+
+    def __init__(self, words: List[Tuple[int, str]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.out: List[List[Tuple[int, int]]] = [[]]  # (key, word length) ending in each state
+        for key, word in words:
+            state = 0
+            for ch in word:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = self.goto[state][ch] = len(self.goto)
+                    self.goto.append({})
+                    self.out.append([])
+                state = nxt
+            self.out[state].append((key, len(word)))
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0) if state else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def occurrences(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """(key, start, end) of every occurrence, overlapping ones included, in order of their end."""
+        goto, fail, out = self.goto, self.fail, self.out
+        root = goto[0]
+        state = 0
+        for pos, ch in enumerate(text):
+            if not state and ch not in root:
+                continue
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for key, length in out[state]:
+                yield key, pos + 1 - length, pos + 1
+
+class LiteralMatcher:
+    """
+    Literal patterns found in one linear pass per page, however many there are.
+    Plain literals are searched in the (case-folded) text; separator-tolerant ones
+    in a copy with every separator run collapsed to one space, with positions mapped
+    back. Keeping each pattern's leftmost non-overlapping occurrences gives exactly
+    the matches of its `finditer`.
+    """
+
+    def __init__(self, literals: List[Tuple[int, Tuple[str, ...]]], ignorecase: bool):
+        self.ignorecase = ignorecase
+        plain = [(i, self._fold(words[0])) for i, words in literals if len(words) == 1]
+        tolerant = [(i, self._fold(" ".join(words))) for i, words in literals if len(words) > 1]
+        self._plain = _Automaton(plain) if plain else None
+        self._tolerant = _Automaton(tolerant) if tolerant else None
+        # Whole-word lookups for OCR words
+        self._plain_words: Dict[str, List[int]] = defaultdict(list)
+        self._tolerant_words: Dict[str, List[int]] = defaultdict(list)
+        for i, word in plain:
+            self._plain_words[word].append(i)
+        for i, word in tolerant:
+            self._tolerant_words[word].append(i)
+
+    def _fold(self, text: str) -> str:
+        # Only İ lowercases to two characters, and it is translated first, so positions are kept
+        return text.translate(_ASCII_CASE_EQUIVALENTS).lower() if self.ignorecase else text
+
+    @staticmethod
+    def _origin(text: str) -> List[int]:
+        """Where each character of `text` with its separator runs collapsed came from in `text`."""
+        origin: List[int] = []
+        last = 0
+        for m in _SEPARATOR_RUN_RE.finditer(text):
+            origin.extend(range(last, m.start() + 1))
+            last = m.end()
+        origin.extend(range(last, len(text)))
+        return origin
+
+    def spans(self, text: str) -> Dict[int, List[Tuple[int, int]]]:
+        """Pattern index -> (start, end) of each of its matches in `text`, left to right."""
+        found: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        folded = self._fold(text)
+        if self._plain is not None:
+            for i, start, end in self._plain.occurrences(folded):
+                spans = found[i]
+                if not spans or start >= spans[-1][1]:
+                    spans.append((start, end))
+        if self._tolerant is not None:
+            origin: Optional[List[int]] = None  # only needed once something matches
+            for i, start, end in self._tolerant.occurrences(_SEPARATOR_RUN_RE.sub(" ", folded)):
+                if origin is None:
+                    origin = self._origin(folded)
+                start, end = origin[start], origin[end - 1] + 1
+                spans = found[i]
+                if not spans or start >= spans[-1][1]:
+                    spans.append((start, end))
+        return found
+
+    def fullmatches(self, word: str) -> List[int]:
+        """Indices of the patterns matching all of `word`."""
+        folded = self._fold(word)
+        return self._plain_words.get(folded, []) + self._tolerant_words.get(_SEPARATOR_RUN_RE.sub(" ", folded), [])
+
+class PatternSet:
+    """
+    Redaction patterns scanned in one pass. The patterns are joined into a single
+    alternation with one named group each, `(?P<_p0>...)|(?P<_p1>...)|...`, so a page
+    with no hits, the usual case, is read once instead of once per pattern.
+
+    Two cheap filters keep that pass fast. Patterns are grouped under a lookahead
+    on the characters their matches can start with, so at most positions a whole
+    group is ruled out with one check. A pattern whose matches must contain some
+    character (the "@" of an email address) is left out on pages without it.
+
+    An alternation reports one alternative per position and skips what it consumed,
+    so it can hide a match of another pattern at the same place. The combined scan
+    is therefore only used to find which patterns match at all: every match of any
+    pattern starts inside one of its spans. `finditer` then gives exactly the
+    (pattern, match) pairs of calling each pattern's `finditer` in order.
+
+    Long lists of literal strings (names, account numbers) would make that
+    alternation as slow as scanning them one by one. From LITERAL_AUTOMATON_MIN
+    literals on, they are matched by a LiteralMatcher instead.
+    """
+
+    def __init__(self, patterns: List[re.Pattern]):
+        self.patterns = list(patterns)
+        self.ssn = [p.pattern in _SSN_PRESETS for p in self.patterns]
+        analyzed = [_analyze(p) for p in self.patterns]
+        self._guards = [guard for guard, _, _ in analyzed]
+        self._required = [required for _, required, _ in analyzed]
+        self._nullable = [nullable for _, _, nullable in analyzed]
+        self._flags = self.patterns[0].flags if self.patterns else 0
+        literals = [(i, words) for i, words in ((i, _literal_words(p)) for i, p in enumerate(self.patterns))
+                    if words is not None and self.patterns[i].flags == self._flags]
+        self._matcher = None
+        self._literals: Tuple[int, ...] = ()
+        if len(literals) >= LITERAL_AUTOMATON_MIN:
+            self._matcher = LiteralMatcher(literals, bool(self._flags & re.IGNORECASE))
+            self._literals = tuple(i for i, _ in literals)
+        literal_ids = set(self._literals)
+        shared = tuple(i for i, p in enumerate(self.patterns)
+                       if p.flags == self._flags and not _SOLO_PATTERN_RE.search(p.pattern)
+                       and i not in literal_ids)
+        self._alternations: Dict[Tuple[int, ...], Optional[re.Pattern]] = {}
+        self._combined = self._alternation(shared) if len(shared) > 1 else None
+        self._shared = shared if self._combined is not None else ()
+        self._solo = tuple(i for i in range(len(self.patterns)) if i not in self._shared and i not in literal_ids)
+
+    def _alternation(self, members: Tuple[int, ...]) -> Optional[re.Pattern]:
+        """The combined scanner over `members` (cached); None if they can't be combined."""
+        if members in self._alternations:
+            return self._alternations[members]
+        groups: Dict[Optional[str], List[int]] = {}
+        for i in members:
+            groups.setdefault(self._guards[i], []).append(i)
+        # Literal patterns with a guard of their own share one union guard (which may
+        # already be the guard of another group: merge into it, never replace it)
+        singles = [g for g, ids in groups.items() if g is not None and len(ids) == 1 and _LITERAL_GUARD_RE.fullmatch(g)]
+        if len(singles) > 1:
+            union = [groups.pop(g)[0] for g in singles]
+            groups.setdefault("[" + "".join(g[1:-1] for g in singles) + "]", []).extend(union)
+        branches = []
+        for guard, ids in groups.items():
+            alternation = "|".join(f"(?P<_p{i}>{self.patterns[i].pattern})" for i in ids)
+            branches.append(alternation if guard is None else f"(?={guard})(?:{alternation})")
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                compiled = re.compile("|".join(branches), self._flags)
+        except (re.error, Warning):
+            compiled = None  # e.g. two patterns define the same group name
+        if len(self._alternations) < 64:
+            self._alternations[members] = compiled
+        return compiled
+
+    def _possible(self, i: int, text: str) -> bool:
+        return all(ch in text for ch in self._required[i])
+
+    def _matches_in_spans(self, i: int, text: str, spans: List[Tuple[int, int]]) -> Iterator[re.Match]:
+        """pattern.finditer(text), trying only the positions inside `spans` (pattern must not match empty)."""
+        pattern = self.patterns[i]
+        pos = 0
+        for start, end in spans:
+            x = max(start, pos)
+            while x < end:
+                m = pattern.match(text, x)
+                if m is None:
+                    x += 1
+                else:
+                    yield m
+                    pos = x = m.end()
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, re.Match]]:
+        """(pattern index, match) for every match of every pattern, pattern by pattern."""
+        found: Dict[int, List[re.Match]] = {}
+        for i in self._solo:
+            if self._possible(i, text):
+                found[i] = list(self.patterns[i].finditer(text))
+        active = tuple(i for i in self._shared if self._possible(i, text))
+        scanner = self._alternation(active) if active else None
+        if scanner is not None:
+            # A pattern without its own group in the scanner is scanned on its own
+            missing = [i for i in active if f"_p{i}" not in scanner.groupindex]
+            for i in missing:
+                found[i] = list(self.patterns[i].finditer(text))
+            active = tuple(i for i in active if i not in missing)
+        if scanner is not None and active:
+            combined = list(scanner.finditer(text))
+            if len(active) == 1:
+                found[active[0]] = combined  # the same matches the pattern finds on its own
+            elif combined:
+                # Every match of every pattern starts inside a span of the combined scan
+                spans = [(m.start(), max(m.end(), m.start() + 1)) for m in combined]
+                in_spans = sum(e - s for s, e in spans) * len(active) <= SPAN_CHECK_LIMIT * len(text)
+                for i in active:
+                    if in_spans and not self._nullable[i]:
+                        found[i] = list(self._matches_in_spans(i, text, spans))
+                    else:
+                        found[i] = list(self.patterns[i].finditer(text))
+        if self._matcher is not None:
+            for i, spans in self._matcher.spans(text).items():
+                pattern = self.patterns[i]
+                matches = [pattern.match(text, start) for start, _ in spans]
+                if all(m is not None and m.end() == end for m, (_, end) in zip(matches, spans)):
+                    found[i] = matches
+                else:  # not expected; the pattern's own scan is authoritative
+                    found[i] = list(pattern.finditer(text))
+        for i in sorted(found):
+            for m in found[i]:
+                yield i, m
+
+    def fullmatches(self, word: str) -> List[int]:
+        """Indices of the patterns matching all of `word` (one combined test rules most words out)."""
+        candidates = list(self._solo)
+        if self._combined is None or self._combined.fullmatch(word) is not None:
+            candidates += self._shared
+        else:  # patterns without their own group in the combined scanner can't be ruled out by it
+            candidates += [i for i in self._shared if f"_p{i}" not in self._combined.groupindex]
+        if self._matcher is not None:
+            candidates += self._matcher.fullmatches(word)
+        return [i for i in sorted(candidates) if self.patterns[i].fullmatch(word)]
+
+@functools.lru_cache(maxsize=32)
+def _pattern_set(key: Tuple[Tuple[str, int], ...]) -> PatternSet:
+    return PatternSet([re.compile(pattern, flags) for pattern, flags in key])
+
+def pattern_set(patterns: List[re.Pattern]) -> PatternSet:
+    """The PatternSet for `patterns`, built once per process for each distinct pattern list."""
+    return _pattern_set(tuple((p.pattern, p.flags) for p in patterns))
+
 def _iter_zip(file: zipfile.ZipFile, allowed_exts: Set[str]) -> Iterable[Tuple[str, bytes]]:
     for info in file.infolist():
         if info.is_dir():
@@ -1240,11 +2583,15 @@ def _repair_pdf_if_needed(raw: bytes) -> bytes:
     except Exception:
         return raw
 
+# What extractWORDS treats as space between words
+_WORD_GAP_RE = re.compile(r"[\x00-\x20\xa0\u200d\u202a-\u202e]*")
+
 _HYPHENS = ["-", "\u2010", "\u2011", "\u2012", "\u2013", "\u2212"]
 _SPACES  = [" ", "\u00A0"]
 _PIPES   = ["|", "\u00A6"]
 
 def _search_variants(s: str) -> List[str]:
+    """Spellings of `s` to search a page for (dash, space and pipe variants), longest first."""
     s = s.replace("\u200B", "").replace("\u2009", "")
     variants = {s}
     if "-" in s:
@@ -1260,36 +2607,189 @@ def _search_variants(s: str) -> List[str]:
         variants.add(s.replace("|", ""))
     return sorted(variants, key=len, reverse=True)
 
+def _span_chars(page_dict: Dict) -> Iterator[Tuple[int, str, Tuple[float, float, float, float]]]:
+    """(line number, character, box) of every character of a rawdict extraction, in text order."""
+    line_no = 0
+    for block in page_dict["blocks"]:
+        for line in block.get("lines", ()):
+            for span in line["spans"]:
+                for ch in span["chars"]:
+                    yield line_no, ch["c"], ch["bbox"]
+            line_no += 1
+
+# Words split into characters one by one (each re-reads the page) before the
+# character boxes of the whole page are extracted instead
+_CLIPPED_WORDS_PER_PAGE = 6
+
+class _TextBoxes:
+    """
+    Rectangles around ranges of a page's extracted text, one per text line.
+    Words are located in the text from a single `extractWORDS` call; a word only
+    partly inside a range (the masked part of an SSN with `keep_last_digits`)
+    is split into the boxes of its characters. The character boxes of the whole
+    page cost several times more to extract and are only read if the words can't
+    be lined up with the text.
+    """
+
+    def __init__(self, page: "fitz.Page", textpage: "fitz.TextPage", text: str):
+        self.page = page
+        self.textpage = textpage
+        self.text = text
+        self._words = self._locate(textpage.extractWORDS(), text)
+        self._starts = [w[0] for w in self._words or ()]
+        self._word_chars: Dict[int, List[Tuple[float, float, float, float]]] = {}
+        self._chars: Optional[List[Optional[Tuple[int, Tuple[float, float, float, float]]]]] = None
+        self._searched: Set[str] = set()
+
+    @staticmethod
+    def _locate(words: List[tuple], text: str) -> Optional[List[Tuple[int, int, int, Tuple[float, float, float, float]]]]:
+        """(start, end, line number, box) of each word in `text`; None unless they account for all of it."""
+        lines: Dict[Tuple[int, int], List[Tuple[str, Tuple[float, float, float, float]]]] = {}
+        for x0, y0, x1, y1, word, block_no, line_no, _ in words:
+            lines.setdefault((block_no, line_no), []).append((word, (x0, y0, x1, y1)))
+        groups = iter(lines.values())
+        located = []
+        line_start = 0
+        for line_no, line in enumerate(text.split("\n")):
+            if _WORD_GAP_RE.fullmatch(line) is None:
+                cursor = 0
+                for word, bbox in next(groups, ()):
+                    at = line.find(word, cursor)
+                    if at < 0 or _WORD_GAP_RE.fullmatch(line, cursor, at) is None:
+                        return None
+                    located.append((line_start + at, line_start + at + len(word), line_no, bbox))
+                    cursor = at + len(word)
+                if _WORD_GAP_RE.fullmatch(line, cursor) is None:
+                    return None
+            line_start += len(line) + 1
+        return located if next(groups, None) is None else None
+
+    def _page_chars(self) -> Optional[List[Optional[Tuple[int, Tuple[float, float, float, float]]]]]:
+        """Line number and box of each character of the text (None for line breaks); None if they don't line up."""
+        if self._chars is None:
+            chars: List[Optional[Tuple[int, Tuple[float, float, float, float]]]] = []
+            text: List[str] = []
+            last_line = 0
+            for line_no, c, bbox in _span_chars(self.page.get_text("rawdict", textpage=self.textpage)):
+                for _ in range(line_no - last_line):
+                    chars.append(None)
+                    text.append("\n")
+                last_line = line_no
+                chars.append((line_no, bbox))
+                text.append(c)
+            if chars:
+                chars.append(None)
+                text.append("\n")
+            self._chars = chars if "".join(text) == self.text else []
+        return self._chars or None
+
+    def _chars_of_word(self, index: int) -> Optional[List[Tuple[float, float, float, float]]]:
+        """Boxes of the characters of a word, from an extraction clipped to the word's box."""
+        if index not in self._word_chars:
+            start, end, _, bbox = self._words[index]
+            word = self.text[start:end]
+            clipped = list(_span_chars(self.page.get_text("rawdict", clip=fitz.Rect(bbox), flags=fitz.TEXTFLAGS_TEXT)))
+            at = "".join(c for _, c, _ in clipped).find(word)
+            self._word_chars[index] = [b for _, _, b in clipped[at:at + len(word)]] if at >= 0 else None
+        return self._word_chars[index]
+
+    def rects(self, start: int, end: int) -> List["fitz.Rect"]:
+        """The rectangles covering text[start:end]."""
+        rects: Dict[int, "fitz.Rect"] = {}
+
+        def _add(line_no: int, bbox: Tuple[float, float, float, float]) -> None:
+            if line_no in rects:
+                rects[line_no].include_rect(bbox)
+            else:
+                rects[line_no] = fitz.Rect(bbox)
+
+        if self._words is None:
+            chars = self._page_chars()
+            if chars is None:
+                # Neither lines up: as a last resort, search for the text (once, it finds every occurrence)
+                needle = self.text[start:end]
+                if needle in self._searched:
+                    return []
+                self._searched.add(needle)
+                for candidate in _search_variants(needle):
+                    quads = self.page.search_for(candidate, quads=True, textpage=self.textpage)
+                    if quads:
+                        return [q.rect for q in quads]
+                return []
+            for entry in chars[start:end]:
+                if entry is not None:
+                    _add(*entry)
+        else:
+            index = max(0, bisect.bisect_right(self._starts, start) - 1)
+            while index < len(self._words) and self._words[index][0] < end:
+                w_start, w_end, line_no, bbox = self._words[index]
+                if start <= w_start and w_end <= end:
+                    _add(line_no, bbox)
+                elif w_end > start:
+                    # A few words are cheaper to extract one by one than the whole page
+                    chars = self._page_chars() if len(self._word_chars) >= _CLIPPED_WORDS_PER_PAGE else None
+                    boxes = self._chars_of_word(index) if chars is None else None
+                    if chars is None and boxes is None:
+                        chars = self._page_chars()
+                    for k in range(max(start, w_start), min(end, w_end)):
+                        if boxes is not None:
+                            _add(line_no, boxes[k - w_start])
+                        elif chars is not None and chars[k] is not None:
+                            _add(*chars[k])
+                        else:
+                            _add(line_no, bbox)  # the whole word rather than nothing
+                index += 1
+        return [r for r in rects.values() if not r.is_empty]
+
 def redact_pdf_bytes(pdf_bytes: bytes, patterns: List[re.Pattern], keep_last_digits: int = 0, *,
-                     require_ssn_context: bool = DEFAULT_REQUIRE_SSN_CONTEXT) -> Tuple[bytes, List[Hit]]:
+                     require_ssn_context: bool = DEFAULT_REQUIRE_SSN_CONTEXT,
+                     progress: Optional[ProgressCallback] = None) -> Tuple[bytes, List[Hit]]:
     if fitz is None:
         raise RuntimeError("PyMuPDF (pymupdf) is required. Install with: pip install pymupdf")
     hits: List[Hit] = []
-
-    SSN_PATTERNS = {p for p in PRESETS["SSN"]}
-    def _is_ssn_pat(pat: re.Pattern) -> bool:
-        return pat.pattern in SSN_PATTERNS
+    pset = pattern_set(patterns)
 
     def _passes_ssn_context_text(full_text: str, m: re.Match) -> bool:
         window = full_text[max(0, m.start()-60): m.end()+60]
         return bool(SSN_CONTEXT_WORDS.search(window))
 
-    try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    except Exception:
-        repaired = _repair_pdf_if_needed(pdf_bytes)
-        doc = fitz.open(stream=repaired, filetype="pdf")
+    def _scan_text(text: str) -> List[Tuple[str, str, int, int, bool]]:
+        """(pattern, match, start, end of the redaction, partial) for each accepted match in `text`."""
+        found = []
+        for i, m in pset.finditer(text):
+            s = m.group(0)
+            if not s.strip():
+                continue
+            if require_ssn_context and pset.ssn[i] and not _passes_ssn_context_text(text, m):
+                continue
+            end, partial = m.end(), False
+            if keep_last_digits > 0:
+                prefix = prefix_excluding_last_n_digits(s, keep_last_digits)
+                if prefix:
+                    end, partial = m.start() + len(prefix), True
+            found.append((pset.patterns[i].pattern, s, m.start(), end, partial))
+        return found
+
+    with _timed("pdf_parse"):
+        try:
+            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        except Exception:
+            repaired = _repair_pdf_if_needed(pdf_bytes)
+            doc = fitz.open(stream=repaired, filetype="pdf")
 
     for page_index in range(doc.page_count):
         page = doc.load_page(page_index)
-        page_text = page.get_text("text") or ""
+        textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+        page_text = page.get_text("text", textpage=textpage) or ""
         page_had_text = bool(page_text.strip())
 
         if not page_had_text and pytesseract is not None:
             try:
                 pix = page.get_pixmap()
                 img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                ocr = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
+                _count("ocr_pages")
+                with _timed("ocr"):
+                    ocr = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
                 words = ocr.get("text", [])
 
                 for idx, word in enumerate(words):
@@ -1297,24 +2797,24 @@ def redact_pdf_bytes(pdf_bytes: bytes, patterns: List[re.Pattern], keep_last_dig
                         continue
                     l = ocr["left"][idx]; t = ocr["top"][idx]
                     w = ocr["width"][idx]; h = ocr["height"][idx]
-                    for pat in patterns:
-                        if pat.fullmatch(word):
-                            if require_ssn_context and _is_ssn_pat(pat):
-                                lo = max(0, idx-6); hi = min(len(words), idx+7)
-                                snippet = " ".join(wd for wd in words[lo:hi] if wd)
-                                if not SSN_CONTEXT_WORDS.search(snippet or ""):
-                                    continue
-                            if keep_last_digits > 0:
-                                num_digits = sum(ch.isdigit() for ch in word)
-                                if num_digits > keep_last_digits:
-                                    redact_ratio = (num_digits - keep_last_digits) / max(num_digits, 1)
-                                    rect = fitz.Rect(l, t, l + int(w * redact_ratio), t + h)
-                                    add_black_redaction_leftmask(page, rect)
-                                    hits.append(Hit("", page_index + 1, pat.pattern, word))
-                                    continue
-                            rect = fitz.Rect(l, t, l + w, t + h)
-                            add_black_redaction(page, rect)
-                            hits.append(Hit("", page_index + 1, pat.pattern, word))
+                    for i in pset.fullmatches(word):
+                        pat = pset.patterns[i]
+                        if require_ssn_context and pset.ssn[i]:
+                            lo = max(0, idx-6); hi = min(len(words), idx+7)
+                            snippet = " ".join(wd for wd in words[lo:hi] if wd)
+                            if not SSN_CONTEXT_WORDS.search(snippet or ""):
+                                continue
+                        if keep_last_digits > 0:
+                            num_digits = sum(ch.isdigit() for ch in word)
+                            if num_digits > keep_last_digits:
+                                redact_ratio = (num_digits - keep_last_digits) / max(num_digits, 1)
+                                rect = fitz.Rect(l, t, l + int(w * redact_ratio), t + h)
+                                add_black_redaction_leftmask(page, rect)
+                                hits.append(Hit("", page_index + 1, pat.pattern, word))
+                                continue
+                        rect = fitz.Rect(l, t, l + w, t + h)
+                        add_black_redaction(page, rect)
+                        hits.append(Hit("", page_index + 1, pat.pattern, word))
 
                 N = len(words)
                 def _bbox(i):
@@ -1346,111 +2846,295 @@ def redact_pdf_bytes(pdf_bytes: bytes, patterns: List[re.Pattern], keep_last_dig
             except Exception:
                 pass
         else:
-            full_targets: List[str] = []
-            partial_prefixes: List[str] = []
-            for pat in patterns:
-                for m in pat.finditer(page_text):
-                    s = m.group(0)
-                    if not s.strip():
-                        continue
-                    if require_ssn_context and _is_ssn_pat(pat) and not _passes_ssn_context_text(page_text, m):
-                        continue
-                    if keep_last_digits > 0:
-                        prefix = prefix_excluding_last_n_digits(s, keep_last_digits)
-                        if prefix:
-                            partial_prefixes.append(prefix)
-                            hits.append(Hit("", page_index + 1, pat.pattern, s))
-                            continue
-                    full_targets.append(s)
-                    hits.append(Hit("", page_index + 1, pat.pattern, s))
-
-            for s_lit in set(partial_prefixes):
-                # increased from 20 to 60 for emails
-                if len(re.sub(r"\s+", "", s_lit)) > 60:
-                    continue
-                for candidate in _search_variants(s_lit):
-                    try:
-                        rects = page.search_for(candidate, quads=True) or []
-                        for q in rects:
-                            add_black_redaction_leftmask(page, q.rect)
-                        if rects:
-                            break
-                    except Exception:
-                        rects = page.search_for(candidate) or []
-                        for r in rects:
-                            add_black_redaction_leftmask(page, r)
-                        if rects:
-                            break
-
-            for s_lit in set(full_targets):
-                # increased from 20 to 60 for emails
-                if len(re.sub(r"\s+", "", s_lit)) > 60:
-                    continue
-                for candidate in _search_variants(s_lit):
-                    try:
-                        rects = page.search_for(candidate, quads=True) or []
-                        for q in rects:
-                            add_black_redaction(page, q.rect)
-                        if rects:
-                            break
-                    except Exception:
-                        rects = page.search_for(candidate) or []
-                        for r in rects:
-                            add_black_redaction(page, r)
-                        if rects:
-                            break
+            with _timed("regex_scan"):
+                found = _scan_text(page_text)
+            if found:
+                # Each redaction goes on the boxes of its own match's characters
+                boxes = _TextBoxes(page, textpage, page_text)
+                for pattern, s, start, end, partial in found:
+                    for rect in boxes.rects(start, end):
+                        if partial:
+                            add_black_redaction_leftmask(page, rect)
+                        else:
+                            add_black_redaction(page, rect)
+                    hits.append(Hit("", page_index + 1, pattern, s))
 
+        with _timed("apply_redactions"):
+            try:
+                page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE)
+            except Exception:
+                pass
+
+        _count("pages_processed")
+        _report(progress, current_pages_done=page_index + 1, current_pages_total=doc.page_count)
+
+    with _timed("apply_redactions"):
         try:
-            page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE)
+            doc.apply_redactions()
         except Exception:
             pass
 
-    try:
-        doc.apply_redactions()
-    except Exception:
-        pass
-
     out = doc.tobytes()
     doc.close()
     return out, hits
 
-def process_zip_bytes(zip_bytes: bytes, patterns: List[re.Pattern], keep_last_digits: int = 0, *,
-                      require_ssn_context: bool = DEFAULT_REQUIRE_SSN_CONTEXT) -> Tuple[bytes, List[Hit], Dict]:
-    redacted_files: List[Tuple[str, bytes]] = []
-    audit_hits: List[Hit] = []
-
-    with zipfile.ZipFile(io.BytesIO(zip_bytes), 'r') as zin:
-        for rel_path, data in _iter_zip(zin, {".pdf", ".jpg", ".jpeg", ".png"}):
-            ext = Path(rel_path).suffix.lower()
+# Pages per range when a PDF is redacted across a process pool (see redact_pdf_ranges)
+REDACT_RANGE_PAGES = 50
+
+def _redact_range_in_worker(pdf_bytes: bytes, patterns: List[re.Pattern], keep_last_digits: int,
+                            require_ssn_context: bool, first_page: int) -> Tuple[bytes, List[Hit], Dict[str, Dict]]:
+    """redact_pdf_bytes for a pool process, on pages starting at `first_page` (0-based) of a larger document."""
+    with collect_metrics() as m:
+        out, hits = redact_pdf_bytes(pdf_bytes, patterns, keep_last_digits, require_ssn_context=require_ssn_context)
+    for h in hits:
+        h.page_num += first_page
+    return out, hits, {"timings": dict(m["timings"]), "counters": dict(m["counters"])}
+
+def redact_pdf_ranges(pdf_bytes: bytes, patterns: List[re.Pattern], keep_last_digits: int = 0, *,
+                      executor: concurrent.futures.Executor,
+                      require_ssn_context: bool = DEFAULT_REQUIRE_SSN_CONTEXT,
+                      range_pages: int = REDACT_RANGE_PAGES,
+                      progress: Optional[ProgressCallback] = None) -> Tuple[bytes, List[Hit]]:
+    """
+    redact_pdf_bytes on `executor` (e.g. a process pool). A PDF of more than
+    `range_pages` pages is split into ranges of that many pages, which are OCR'd and
+    redacted concurrently (a bounded window ahead of the merge) and merged back in
+    page order. Hits and their page numbers are those of redacting the whole
+    document at once; metadata and bookmarks are kept, links between ranges are not.
+    A range that fails in a worker raises its error here; only a range the executor
+    could not run (see _POOL_RESULT_ERRORS) is redacted in this process instead.
+    """
+    with _timed("pdf_parse"):
+        try:
+            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        except Exception:
+            pdf_bytes = _repair_pdf_if_needed(pdf_bytes)
+            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        n = doc.page_count
+        ranges = [(a, min(a + range_pages, n)) for a in range(0, n, max(1, range_pages))] or [(0, 0)]
+        ahead = 2 * max(1, getattr(executor, "_max_workers", None) or os.cpu_count() or 1)
+        window: Deque[Tuple[int, int, bytes, Optional[concurrent.futures.Future]]] = deque()
+
+        def _submit(k: int) -> None:
+            a, b = ranges[k]
+            data = pdf_bytes
+            if len(ranges) > 1:
+                with _timed("pdf_parse"):
+                    part = fitz.open()
+                    part.insert_pdf(doc, from_page=a, to_page=b - 1)
+                    data = part.tobytes()
+                    part.close()
             try:
-                if ext == ".pdf":
-                    red_pdf, hits = redact_pdf_bytes(data, patterns, keep_last_digits, require_ssn_context=require_ssn_context)
+                future = executor.submit(_redact_range_in_worker, data, patterns, keep_last_digits,
+                                         require_ssn_context, a)
+            except _POOL_SUBMIT_ERRORS:
+                future = None  # executor unusable (e.g. a broken pool): redact this range here
+            window.append((a, b, data, future))
+
+        for k in range(min(len(ranges), ahead)):
+            _submit(k)
+        merged = fitz.open() if len(ranges) > 1 else None
+        out = b""
+        hits: List[Hit] = []
+        for k in range(len(ranges)):
+            a, b, data, future = window.popleft()
+            if k + len(window) + 1 < len(ranges):
+                _submit(k + len(window) + 1)
+            if future is not None:
+                try:
+                    out, range_hits, stage_data = future.result()
+                    _merge_metrics(stage_data)
+                except _POOL_RESULT_ERRORS:
+                    future = None  # executor failed (e.g. a worker died): redact this range here
+            if future is None:
+                out, range_hits = redact_pdf_bytes(data, patterns, keep_last_digits,
+                                                   require_ssn_context=require_ssn_context)
+                for h in range_hits:
+                    h.page_num += a
+            hits.extend(range_hits)
+            if merged is not None:
+                with _timed("merge"):
+                    part = fitz.open(stream=out, filetype="pdf")
+                    merged.insert_pdf(part)
+                    part.close()
+            _report(progress, current_pages_done=b, current_pages_total=n)
+
+        if merged is None:
+            return out, hits
+        with _timed("merge"):
+            try:
+                merged.set_metadata({k: v for k, v in doc.metadata.items() if v and k not in ("format", "encryption")})
+                merged.set_toc(doc.get_toc(simple=False))
+            except Exception:
+                pass
+            out = merged.tobytes(garbage=3)
+            merged.close()
+        return out, hits
+    finally:
+        doc.close()
+
+# Files the redaction tools take (images are converted to PDF)
+REDACT_EXTS = {".pdf", ".jpg", ".jpeg", ".png"}
+
+def _redact_file(rel_path: str, data: bytes, patterns: List[re.Pattern], keep_last_digits: int,
+                 require_ssn_context: bool, progress: Optional[ProgressCallback] = None,
+                 executor: Optional[concurrent.futures.Executor] = None) -> Tuple[str, bytes, List[Hit]]:
+    """Redact one PDF or image (converted to PDF); returns (output name, redacted PDF, hits)."""
+    if Path(rel_path).suffix.lower() != ".pdf":
+        data = image_bytes_to_pdf(data)
+    if executor is not None:
+        red_pdf, hits = redact_pdf_ranges(data, patterns, keep_last_digits, executor=executor,
+                                          require_ssn_context=require_ssn_context, progress=progress)
+    else:
+        red_pdf, hits = redact_pdf_bytes(data, patterns, keep_last_digits, require_ssn_context=require_ssn_context,
+                                         progress=progress)
+    for h in hits:
+        h.rel_path = rel_path
+    return str(Path(rel_path).with_suffix(".pdf")), red_pdf, hits
+
+def _redact_file_in_worker(rel_path: str, data: bytes, patterns: List[re.Pattern], keep_last_digits: int,
+                           require_ssn_context: bool) -> Tuple[Tuple[str, bytes, List[Hit]], Dict[str, Dict]]:
+    """_redact_file for a pool process; stage metrics travel back with the result."""
+    with collect_metrics() as m:
+        result = _redact_file(rel_path, data, patterns, keep_last_digits, require_ssn_context)
+    return result, {"timings": dict(m["timings"]), "counters": dict(m["counters"])}
+
+def _redact_parallel(files: Iterable[Tuple[str, bytes]], patterns: List[re.Pattern], keep_last_digits: int,
+                     require_ssn_context: bool, executor: concurrent.futures.Executor
+                     ) -> Iterator[Tuple[str, Callable[..., Tuple[str, bytes, List[Hit]]]]]:
+    """
+    Yield, per file in order, (rel_path, redact) where redact(progress=None) returns
+    _redact_file's result. Files are redacted concurrently on `executor`, a bounded
+    window ahead of the consumer, so only the files in that window are in memory.
+    A PDF of more than REDACT_RANGE_PAGES pages is not submitted whole; it is split
+    into page ranges across the executor when the consumer reaches it. A file that
+    fails in a worker raises its error from redact(); only a file the executor could
+    not run (see _POOL_RESULT_ERRORS) is redacted here instead.
+    """
+    ahead = 2 * max(1, getattr(executor, "_max_workers", None) or os.cpu_count() or 1)
+    window: Deque[Tuple[str, bytes, int, Optional[concurrent.futures.Future]]] = deque()
+    files = iter(files)
+
+    def _submit() -> None:
+        entry = next(files, None)
+        if entry is None:
+            return
+        rel_path, data = entry
+        pages = _pdf_page_count(data) if Path(rel_path).suffix.lower() == ".pdf" else 1
+        future = None
+        if pages <= REDACT_RANGE_PAGES:
+            try:
+                future = executor.submit(_redact_file_in_worker, rel_path, data, patterns, keep_last_digits,
+                                         require_ssn_context)
+            except _POOL_SUBMIT_ERRORS:
+                pass  # executor unusable (e.g. a broken pool): redact this file here
+        window.append((rel_path, data, pages, future))
+
+    for _ in range(ahead):
+        _submit()
+    while window:
+        rel_path, data, pages, future = window.popleft()
+        _submit()
+
+        def _redact(progress: Optional[ProgressCallback] = None, rel_path: str = rel_path, data: bytes = data,
+                    pages: int = pages, future=future) -> Tuple[str, bytes, List[Hit]]:
+            if future is not None:
+                try:
+                    result, stage_data = future.result()
+                except _POOL_RESULT_ERRORS:
+                    pass  # the worker died: redact this file here
                 else:
-                    pdf_data = image_bytes_to_pdf(data)
-                    red_pdf, hits = redact_pdf_bytes(pdf_data, patterns, keep_last_digits, require_ssn_context=require_ssn_context)
+                    _merge_metrics(stage_data)
+                    _report(progress, current_pages_done=pages, current_pages_total=pages)
+                    return result
+            return _redact_file(rel_path, data, patterns, keep_last_digits, require_ssn_context, progress=progress,
+                                executor=executor if pages > REDACT_RANGE_PAGES else None)
+        yield rel_path, _redact
+
+def _redact_each(files: Iterable[Tuple[str, bytes]], patterns: List[re.Pattern], keep_last_digits: int,
+                 require_ssn_context: bool, *, executor: Optional[concurrent.futures.Executor] = None,
+                 progress: Optional[ProgressCallback] = None, files_total: Optional[int] = None
+                 ) -> Iterator[Tuple[str, Union[Tuple[str, bytes, List[Hit]], Exception]]]:
+    """
+    Redact each PDF/image of `files`, yielding (rel_path, (output name, redacted PDF,
+    hits)), or (rel_path, exception) for a file that failed, in input order, with file
+    and page progress. With an `executor`, files are redacted on it concurrently.
+    """
+    if executor is not None:
+        jobs = _redact_parallel(files, patterns, keep_last_digits, require_ssn_context, executor)
+    else:
+        jobs = ((rel_path, functools.partial(_redact_file, rel_path, data, patterns, keep_last_digits,
+                                             require_ssn_context))
+                for rel_path, data in files)
+    files_done = 0
+    pages_done = 0
+    for rel_path, redact in jobs:
+        _report(progress, files_done=files_done, files_total=files_total, pages_done=pages_done, current=rel_path)
+        file_pages = [0]
+
+        def _page_progress(current_pages_done: int, current_pages_total: int) -> None:
+            file_pages[0] = current_pages_done
+            _report(progress, files_done=files_done, files_total=files_total,
+                    pages_done=pages_done + current_pages_done, current=rel_path,
+                    current_pages_done=current_pages_done, current_pages_total=current_pages_total)
 
-                for h in hits:
-                    h.rel_path = rel_path
+        try:
+            result: Union[Tuple[str, bytes, List[Hit]], Exception] = redact(progress=_page_progress)
+        except Exception as e:
+            result = e
+        yield rel_path, result
+        files_done += 1
+        pages_done += file_pages[0]
+    _report(progress, files_done=files_done, files_total=files_total, pages_done=pages_done)
+
+def _error_entry(rel_path: str, e: Exception) -> Tuple[str, bytes]:
+    msg = f"Failed to process {rel_path}: {e}"
+    return f"_errors/{rel_path}.txt".replace('..','.'), msg.encode("utf-8")
+
+def _audit_csv(hits: List[Hit]) -> bytes:
+    csv_s = io.StringIO()
+    cw = csv.writer(csv_s)
+    cw.writerow(["file", "page", "pattern", "match"])
+    for h in hits:
+        cw.writerow([h.rel_path, h.page_num, h.pattern, h.matched_text])
+    return csv_s.getvalue().encode("utf-8")
+
+def process_zip_bytes(zip_bytes: Source, patterns: List[re.Pattern], keep_last_digits: int = 0, *,
+                      require_ssn_context: bool = DEFAULT_REQUIRE_SSN_CONTEXT,
+                      out: Optional[Output] = None,
+                      executor: Optional[concurrent.futures.Executor] = None,
+                      progress: Optional[ProgressCallback] = None) -> Tuple[Optional[bytes], List[Hit], Dict]:
+    """
+    Redact every PDF/image in a ZIP (bytes or path). Each redacted file is written
+    to the output ZIP as soon as it is done, followed by audit.csv and report.json.
+    With an `executor` (e.g. a process pool), several files are redacted on it at
+    once and large PDFs in page ranges side by side (see _redact_parallel); files,
+    audit.csv rows and errors stay in input order.
+    """
+    audit_hits: List[Hit] = []
+    files_processed = 0
+    allowed_exts = REDACT_EXTS
+
+    out_buf = io.BytesIO() if out is None else out
+    with _open_zip_source(zip_bytes) as zin, \
+            _zip_writer(out_buf) as zout:
+        files_total = sum(1 for i in zin.infolist() if not i.is_dir() and not _is_mac_resource_junk(i.filename)
+                          and Path(i.filename).suffix.lower() in allowed_exts)
+        for rel_path, result in _redact_each(_iter_zip(zin, allowed_exts), patterns, keep_last_digits,
+                                             require_ssn_context, executor=executor, progress=progress,
+                                             files_total=files_total):
+            if isinstance(result, Exception):
+                zout.writestr(*_error_entry(rel_path, result))
+            else:
+                out_name, red_pdf, hits = result
                 audit_hits.extend(hits)
+                zout.writestr(out_name, red_pdf)
+            files_processed += 1
 
-                out_name = str(Path(rel_path).with_suffix(".pdf"))
-                redacted_files.append((out_name, red_pdf))
-            except Exception as e:
-                msg = f"Failed to process {rel_path}: {e}"
-                redacted_files.append((f"_errors/{rel_path}.txt".replace('..','.'), msg.encode("utf-8")))
-
-    out_buf = io.BytesIO()
-    with zipfile.ZipFile(out_buf, 'w', compression=zipfile.ZIP_DEFLATED) as zout:
-        for arcname, data in redacted_files:
-            zout.writestr(arcname, data)
-        csv_s = io.StringIO()
-        cw = csv.writer(csv_s)
-        cw.writerow(["file", "page", "pattern", "match"])
-        for h in audit_hits:
-            cw.writerow([h.rel_path, h.page_num, h.pattern, h.matched_text])
-        zout.writestr("audit.csv", csv_s.getvalue().encode("utf-8"))
+        zout.writestr("audit.csv", _audit_csv(audit_hits))
         report = {
-            "files_processed": len(redacted_files),
+            "files_processed": files_processed,
             "total_hits": len(audit_hits),
             "patterns": [p.pattern for p in patterns],
             "keep_last_digits": keep_last_digits,
@@ -1458,9 +3142,205 @@ def process_zip_bytes(zip_bytes: bytes, patterns: List[re.Pattern], keep_last_di
         }
         zout.writestr("report.json", json.dumps(report, indent=2).encode("utf-8"))
 
-    return out_buf.getvalue(), audit_hits, {
-        "files_processed": len(redacted_files),
+    return out_buf.getvalue() if out is None else None, audit_hits, {
+        "files_processed": files_processed,
         "total_hits": len(audit_hits),
         "keep_last_digits": keep_last_digits,
         "require_ssn_context": require_ssn_context,
     }
+
+# ======================================================
+# 6) PIPELINE
+# ======================================================
+# Stages run in order over one in-memory document set of (rel_path, bytes) pairs,
+# so a production is uploaded once and no intermediate ZIP is written or re-read.
+PIPELINE_STAGES: Dict[str, Dict[str, object]] = {
+    "unlock": {
+        "password_mode": "Single password for all",
+        "password_for_all": None,
+        "password_map": {},
+    },
+    "organize": {
+        "min_year": 1900,
+        "max_year": 2099,
+        "year_policy": "first",
+        "unknown_folder": "Unknown",
+    },
+    "redact": {
+        "presets": ["SSN"],
+        "regex_patterns": "",
+        "literal_patterns": "",
+        "case_sensitive": False,
+        "tolerant_literals": False,
+        "keep_last_digits": 0,
+        "require_ssn_context": DEFAULT_REQUIRE_SSN_CONTEXT,
+    },
+    "bates": {
+        "prefix": "J.DOE",
+        "start_num": 1,
+        "digits": 8,
+        "font_name": "Helvetica",
+        "font_size": 12,
+        "margin_right": 18.0,
+        "margin_bottom": 18.0,
+        "zone": None,
+        "zone_padding": 18.0,
+        "color_hex": "#0000FF",
+        "left_punch_margin": 0.0,
+        "border_all_pt": 0.0,
+        "engine": "pypdf2",
+        "output_profile": "standard",
+        "jpeg_quality": JPEG_QUALITY,
+        "jpeg_optimize": True,
+    },
+    "index": {
+        "party": "Client",
+        "title_text": "CLIENT NAME - DOCUMENTS",
+    },
+}
+
+def normalize_pipeline(stages: List[Dict[str, object]]) -> List[Dict[str, object]]:
+    """
+    Validate a pipeline spec: a list of {"stage": name, **params}. Missing params get
+    the same defaults as the single-tool endpoints. Raises ValueError on bad input.
+    """
+    if not isinstance(stages, list) or not stages:
+        raise ValueError("Pipeline needs at least one stage.")
+    normalized: List[Dict[str, object]] = []
+    for i, spec in enumerate(stages):
+        if not isinstance(spec, dict) or spec.get("stage") not in PIPELINE_STAGES:
+            raise ValueError(f"Stage {i + 1}: 'stage' must be one of {', '.join(PIPELINE_STAGES)}.")
+        name = spec["stage"]
+        defaults = PIPELINE_STAGES[name]
+        unknown = set(spec) - set(defaults) - {"stage"}
+        if unknown:
+            raise ValueError(f"Stage {i + 1} ({name}): unknown parameter(s) {', '.join(sorted(unknown))}.")
+        params: Dict[str, object] = {"stage": name}
+        for key, default in defaults.items():
+            value = spec.get(key, default)
+            try:
+                if isinstance(default, bool):
+                    value = value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes", "on")
+                elif isinstance(default, (int, float)) and value is not None:
+                    value = type(default)(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Stage {i + 1} ({name}): invalid value for {key}.")
+            params[key] = value
+        if name == "index" and i != len(stages) - 1:
+            raise ValueError("The index stage must be the last stage.")
+        if name == "bates" and params["engine"] not in BATES_ENGINES:
+            raise ValueError(f"Stage {i + 1} (bates): engine must be one of {', '.join(BATES_ENGINES)}.")
+        if name == "bates" and params["output_profile"] not in PDF_OUTPUT_PROFILES:
+            raise ValueError(f"Stage {i + 1} (bates): output_profile must be one of {', '.join(PDF_OUTPUT_PROFILES)}.")
+        if name == "bates" and not 1 <= params["jpeg_quality"] <= 100:
+            raise ValueError(f"Stage {i + 1} (bates): jpeg_quality must be between 1 and 100.")
+        if name == "redact":
+            load_patterns(params["presets"], params["regex_patterns"] or "", params["literal_patterns"] or "",
+                          params["case_sensitive"], params["tolerant_literals"])
+        normalized.append(params)
+    return normalized
+
+def _stage_progress(progress: Optional[ProgressCallback], **stage_fields) -> ProgressCallback:
+    def _progress(**fields) -> None:
+        _report(progress, **stage_fields, **fields)
+    return _progress
+
+def run_pipeline(files: List[Tuple[str, Source]], stages: List[Dict[str, object]],
+                 out: Optional[Output] = None,
+                 executor: Optional[concurrent.futures.Executor] = None,
+                 progress: Optional[ProgressCallback] = None) -> Tuple[Optional[bytes], Dict]:
+    """
+    Run unlock / organize / redact / bates / index stages over one document set, file
+    by file through the same code as the single tools. The output ZIP holds the final
+    documents plus discovery_index.xlsx (index stage), audit.csv (redact stage) and
+    pipeline_report.json with a summary per stage. PDFs that can't be unlocked are
+    dropped and listed there. With an `executor` (e.g. a process pool), every
+    stage spreads its files across it.
+    """
+    stages = normalize_pipeline(stages)
+    docs: List[Tuple[str, bytes]] = [(rel, b) for rel, b in _expand_zip_sources(files) if not _is_mac_resource_junk(rel)]
+    extras: List[Tuple[str, bytes]] = []
+    records: Optional[List[BatesRecord]] = None
+    summaries: List[Dict[str, object]] = []
+    report: Dict[str, object] = {"files_in": len(docs), "stages": summaries}
+
+    for stage_index, spec in enumerate(stages):
+        name = spec["stage"]
+        params = {k: v for k, v in spec.items() if k != "stage"}
+        stage_cb = _stage_progress(progress, stage=name, stage_index=stage_index, stages_total=len(stages))
+        summary: Dict[str, object] = {"stage": name, "files_in": len(docs)}
+
+        if name == "unlock":
+            if not PIKEPDF_AVAILABLE:
+                raise RuntimeError("pikepdf is not installed")
+            resolve = _password_resolver(params["password_mode"], params["password_for_all"], params["password_map"] or {})
+            pdfs = [(rel, data) for rel, data in docs if rel.lower().endswith(".pdf")]
+            results = iter(list(_unlock_each(pdfs, resolve, executor=executor, progress=stage_cb,
+                                             files_total=len(pdfs))))
+            failed: List[Dict[str, str]] = []
+            unlocked: List[Tuple[str, bytes]] = []
+            for rel, data in docs:
+                if rel.lower().endswith(".pdf"):
+                    _, status, data = next(results)
+                    if data is None:
+                        failed.append({"file": rel, "status": status})  # dropped: later stages can't read it
+                        continue
+                unlocked.append((rel, data))
+            docs = unlocked
+            summary["failed"] = failed
+            if failed:
+                report["unlock_failed"] = [f["file"] for f in failed]
+
+        elif name == "organize":
+            docs = list(_organize_each(docs, params["min_year"], params["max_year"], params["year_policy"],
+                                       params["unknown_folder"], executor=executor, progress=stage_cb,
+                                       files_total=len(docs)))
+            summary["folders"] = dict(Counter(rel.split("/", 1)[0] for rel, _ in docs))
+
+        elif name == "redact":
+            patterns = load_patterns(params["presets"], params["regex_patterns"] or "", params["literal_patterns"] or "",
+                                     params["case_sensitive"], params["tolerant_literals"])
+            to_redact = [(rel, data) for rel, data in docs if Path(rel).suffix.lower() in REDACT_EXTS]
+            skipped = [rel for rel, _ in docs if Path(rel).suffix.lower() not in REDACT_EXTS]
+            audit_hits: List[Hit] = []
+            redacted: List[Tuple[str, bytes]] = []
+            for rel, result in _redact_each(to_redact, patterns, params["keep_last_digits"],
+                                            params["require_ssn_context"], executor=executor, progress=stage_cb,
+                                            files_total=len(to_redact)):
+                if isinstance(result, Exception):
+                    extras.append(_error_entry(rel, result))
+                else:
+                    out_name, red_pdf, hits = result
+                    audit_hits.extend(hits)
+                    redacted.append((out_name, red_pdf))
+            docs = redacted
+            extras.append(("audit.csv", _audit_csv(audit_hits)))
+            summary["total_hits"] = report["total_hits"] = len(audit_hits)
+            summary["skipped"] = skipped
+
+        elif name == "bates":
+            color_rgb = _color_from_hex(str(params.pop("color_hex")))
+            records, last_used, docs, label_report = walk_and_label(docs, color_rgb=color_rgb, executor=executor,
+                                                                    progress=stage_cb, **params)
+            extras = [e for e in extras if e[0] not in BATES_MANIFEST_NAMES] + bates_manifest_entries(
+                records, last_used, label_report)
+            summary["last_bates_number"] = report["last_bates_number"] = last_used
+
+        elif name == "index":
+            rel_paths = [rel for rel, _ in docs]
+            labeled = {str(Path(r.rel_dir, r.filename)) for r in records} if records is not None else None
+            if labeled is not None and labeled == {str(Path(rel)) for rel in rel_paths}:
+                # Ranges are known from the bates stage; no need to OCR them back
+                det = _records_frame(records)
+            else:
+                det = scan_pairs_for_bates(docs, progress=stage_cb, files_total=len(docs), executor=executor)
+            extras.append(("discovery_index.xlsx", _index_xlsx(rel_paths, det, params["party"], params["title_text"])))
+
+        summary["files_out"] = len(docs)
+        summaries.append(summary)
+
+    _report(progress, stages_done=len(stages), stages_total=len(stages))
+    report["files_out"] = len(docs)
+    extras.append(("pipeline_report.json", json.dumps(report, indent=2).encode("utf-8")))
+    zip_bytes = _zip_from_pairs(docs + extras, out)
+    return zip_bytes, report
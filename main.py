@@ -1,18 +1,50 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import StreamingResponse, JSONResponse
-from typing import List, Optional
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Request, Header
+from fastapi.responses import StreamingResponse, JSONResponse, FileResponse, PlainTextResponse
+from starlette.background import BackgroundTask
+from starlette.requests import ClientDisconnect
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
 import io
-import zipfile
 import json
-from datetime import datetime
+import os
 
 # Import business logic
 import logic
+# CPU-bound logic calls run in a process pool so the event loop stays free
+import workers
+# Uploads are spooled to disk instead of being read into memory
+from uploads import Spool, UploadSessions
+# Background jobs with progress and on-disk result retention
+import jobs
+# Finished artifacts keyed on the SHA-256 of inputs + parameters
+import cache
+# Request / stage metrics in Prometheus text format
+import metrics
+# Cost-based admission control (bounded queue, 429 when full)
+import admission
+# Per-matter Bates counters with atomic range reservation (SQLite)
+import counters
+
+job_store = jobs.JobStore()
+result_cache = cache.ResultCache()
+admission_controller = admission.AdmissionController()
+upload_sessions = UploadSessions()
+bates_counters = counters.BatesCounters()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    job_store.recover()
+    yield
+    workers.shutdown()
 
 app = FastAPI(
     title="Discovery One-Stop API",
     description="API for legal document processing: Unlock, Organize, Bates Stamp, Redact.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -25,6 +57,8 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+app.add_middleware(metrics.MetricsMiddleware)
+
 @app.get("/")
 def home():
     return {
@@ -33,33 +67,256 @@ def home():
             "/unlock",
             "/organize",
             "/bates",
+            "/bates/plan",
             "/index",
-            "/redact"
+            "/redact",
+            "/pipeline",
+            "/uploads",
+            "/jobs/{unlock|organize|bates|index|redact|pipeline}",
+            "/jobs/{id}",
+            "/jobs/{id}/result",
+            "/cache",
+            "/counters",
+            "/metrics",
+            "/admission"
         ]
     }
 
+# -----------------------------------------------------------------------------
+# Shared plumbing: every endpoint parses its form into a Task (a logic.py call
+# writing its artifact into the request's spool area), which is then either run
+# and streamed back directly or submitted as a background job. Either way a
+# Task whose inputs and parameters were seen before is served from the cache;
+# anything else must be admitted by the admission controller before it runs.
+# -----------------------------------------------------------------------------
+ZIP_MEDIA_TYPE = "application/zip"
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+@dataclass
+class Task:
+    kind: str
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any]
+    spool: Spool
+    filename: str
+    media_type: str = ZIP_MEDIA_TYPE
+    # Summary headers derived from fn's return value (e.g. X-Last-Bates-Number)
+    result_headers: Optional[Callable[[Any], Dict[str, str]]] = None
+    # Every parameter that affects the output; part of the cache key
+    params: Dict[str, Any] = field(default_factory=dict)
+    # The uploads, priced for admission control once the cache has missed
+    inputs: List[Tuple[str, Any]] = field(default_factory=list)
+    cost: Optional[admission.Cost] = None
+    # Run fn in a thread here instead of a worker (fn submits its own work to the pool)
+    local: bool = False
+    # Whether the artifact may be served from / stored in the result cache
+    cacheable: bool = True
+    # Awaited once the task is admitted, just before fn runs (e.g. to reserve a Bates
+    # range), and with fn's result afterwards, or None if it failed, to settle it
+    before_run: Optional[Callable[[], Awaitable[None]]] = None
+    after_run: Optional[Callable[[Any], Awaitable[None]]] = None
+    out_path: Path = field(init=False)
+    ticket: Optional[admission.Ticket] = field(default=None, init=False)
+
+    def __post_init__(self):
+        self.out_path = self.spool.path(self.filename)
+
+    @property
+    def cache_key(self) -> str:
+        return cache.cache_key(self.kind, self.params, self.spool.digests)
+
+    async def reserve(self) -> None:
+        """Price the inputs and take a place in the admission queue now (raises 429 when it is full)."""
+        if self.cost is None:
+            self.cost = await admission.estimate(self.inputs)
+        self.ticket = admission_controller.reserve(self.cost)
+
+    async def lookup(self) -> Optional[Dict[str, Any]]:
+        """Place a cached artifact at out_path; returns its cache entry, or None on a miss."""
+        if not self.cacheable:
+            return None
+        return await asyncio.to_thread(result_cache.get, self.cache_key, self.out_path)
+
+    async def compute(self, progress: Optional[Callable[..., None]] = None,
+                      started: Optional[Callable[[], None]] = None) -> Dict[str, str]:
+        """
+        Run the logic call into out_path, cache the artifact and return its summary headers.
+        `started()` is called once the task is admitted.
+        """
+        if self.ticket is None:
+            await self.reserve()
+        try:
+            await self.ticket.wait()
+            if started is not None:
+                started()
+            if self.before_run is not None:
+                await self.before_run()
+            kwargs = dict(self.kwargs, out=self.out_path)
+            if progress is not None:
+                kwargs["progress"] = progress
+            run = workers.run_local if self.local else workers.run
+            try:
+                result, stages = await run(self.fn, *self.args, **kwargs)
+            except BaseException:
+                if self.after_run is not None:
+                    await asyncio.shield(self.after_run(None))
+                raise
+            if self.after_run is not None:
+                await self.after_run(result)
+            pages = stages.get("counters", {}).get("pages_processed")
+            if pages:
+                self.ticket.refine(pages)
+        finally:
+            self.ticket.release()
+        headers = self.result_headers(result) if self.result_headers else {}
+        if self.cacheable:
+            await asyncio.to_thread(result_cache.put, self.cache_key, self.out_path, self.filename, self.media_type,
+                                    headers)
+        return headers
+
+    async def execute(self, progress: Optional[Callable[..., None]] = None,
+                      started: Optional[Callable[[], None]] = None) -> Dict[str, str]:
+        entry = await self.lookup()
+        if entry is not None:
+            if self.ticket is not None:
+                self.ticket.release()
+            return entry["headers"]
+        return await self.compute(progress, started)
+
+def _split_ids(upload_ids: Optional[str]) -> List[str]:
+    return [u.strip() for u in (upload_ids or "").split(",") if u.strip()]
+
+async def _spool_uploads(files: Optional[List[UploadFile]], upload_ids: Optional[str] = None
+                         ) -> Tuple[Spool, List[Tuple[str, Any]]]:
+    """Spool multipart uploads and add finalized resumable uploads (comma-separated ids)."""
+    files = [f for f in files or [] if f.filename]
+    ids = _split_ids(upload_ids)
+    if not files and not ids:
+        raise HTTPException(status_code=400, detail="Upload files or reference finalized uploads with upload_ids.")
+    spool = Spool()
+    try:
+        file_pairs = await spool.add_all(files)
+        file_pairs += [spool.add_session(upload_sessions, upload_id) for upload_id in ids]
+        return spool, file_pairs
+    except Exception:
+        spool.cleanup()
+        raise
+
+async def _single_input(file: Optional[UploadFile], upload_id: Optional[str], exts: Tuple[str, ...],
+                        message: str) -> Tuple[Spool, Tuple[str, Any]]:
+    """Spool the one input of /index or /redact: a multipart file or a finalized upload."""
+    use_file = file is not None and bool(file.filename)
+    if use_file:
+        name = file.filename
+    elif len(_split_ids(upload_id)) == 1:
+        name = upload_sessions.status(upload_id.strip())["filename"]
+    else:
+        raise HTTPException(status_code=400, detail="Send one file or one upload_id.")
+    if not name.lower().endswith(exts):
+        raise HTTPException(status_code=400, detail=message)
+    spool, [pair] = await _spool_uploads([file] if use_file else [], None if use_file else upload_id)
+    return spool, pair
+
+# Result ZIPs are streamed to the client while the worker is still adding entries.
+# DISCOVERY_STREAM_RESULTS=0 waits for the finished archive instead. Tasks with
+# summary headers (X-Last-Bates-Number, X-Total-Hits, ...) always wait for it, as
+# headers can't be sent once the body has started.
+STREAM_RESULTS = os.environ.get("DISCOVERY_STREAM_RESULTS", "1") != "0"
+STREAM_CHUNK = 256 * 1024
+STREAM_POLL_SECONDS = 0.1
+
+def _cleanup_when_done(task: Task, work: asyncio.Future) -> None:
+    """Remove the task's spool once `work` has finished (the client may be gone by then)."""
+    def _done(future: asyncio.Future) -> None:
+        if not future.cancelled():
+            future.exception()  # retrieved: nobody is waiting for it any more
+        task.spool.cleanup()
+    work.add_done_callback(_done)
+
+async def _stream_result(task: Task):
+    """
+    Run `task` and return the file it writes. Without summary headers the download
+    starts as soon as the first entry lands; failures before the first byte become a
+    500 as usual. If the client goes away, the run still completes (and is cached)
+    before its spool is removed.
+    """
+    path = task.out_path
+    headers = {"Content-Disposition": f"attachment; filename={task.filename}"}
+    try:
+        entry = await task.lookup()
+        if entry is None:
+            await task.reserve()
+    except Exception:
+        task.spool.cleanup()
+        raise
+    if entry is not None:
+        headers.update(entry["headers"], **{"X-Cache": "HIT"})
+        return FileResponse(path, media_type=task.media_type, headers=headers,
+                             background=BackgroundTask(task.spool.cleanup))
+
+    stream = STREAM_RESULTS and task.result_headers is None
+    work = asyncio.ensure_future(task.compute())
+    try:
+        while not work.done() and (not stream or not path.exists() or path.stat().st_size == 0):
+            await asyncio.sleep(STREAM_POLL_SECONDS)
+        if work.done():
+            headers.update(work.result())  # raises on failure
+    except HTTPException:
+        task.spool.cleanup()
+        raise
+    except asyncio.CancelledError:  # client disconnected while waiting
+        _cleanup_when_done(task, work)
+        raise
+    except Exception as e:
+        task.spool.cleanup()
+        raise HTTPException(status_code=500, detail=str(e))
+    headers["X-Cache"] = "MISS"
+
+    async def _body():
+        try:
+            with open(path, "rb") as fh:
+                while True:
+                    done = work.done()
+                    chunk = fh.read(STREAM_CHUNK)
+                    if chunk:
+                        yield chunk
+                    elif done:
+                        work.result()  # a late failure aborts the (incomplete) download
+                        break
+                    else:
+                        await asyncio.sleep(STREAM_POLL_SECONDS)
+        finally:
+            _cleanup_when_done(task, work)
+
+    return StreamingResponse(_body(), media_type=task.media_type, headers=headers)
+
+async def _submit_job(task: Task) -> JSONResponse:
+    try:
+        await task.reserve()
+    except HTTPException:
+        task.spool.cleanup()
+        raise
+    job_id = job_store.submit(
+        task.kind,
+        task.execute,
+        task.out_path,
+        task.filename,
+        task.media_type,
+        cleanup=task.spool.cleanup,
+    )
+    return JSONResponse(status_code=202, content=dict(job_store.status(job_id), status_url=f"/jobs/{job_id}"))
+
 # -----------------------------------------------------------------------------
 # 1. UNLOCK
 # -----------------------------------------------------------------------------
-@app.post("/unlock")
-async def unlock_pdfs_endpoint(
-    files: List[UploadFile] = File(...),
+async def unlock_task(
+    files: Optional[List[UploadFile]] = File(None),
+    upload_ids: Optional[str] = Form(None),  # comma-separated ids of finalized /uploads
     password_mode: str = Form("Single password for all"),  # "Single password for all", "Per-file password list (CSV)", "Try no password"
     password_for_all: Optional[str] = Form(None),
     password_csv: Optional[UploadFile] = File(None)
-):
-    """
-    Unlock PDFs.
-    - Upload multiple PDFs or ZIPs.
-    - Provide password mode and optional password/CSV.
-    - Returns a ZIP of unlocked PDFs.
-    """
-    # Read files into memory
-    file_pairs = []
-    for f in files:
-        content = await f.read()
-        file_pairs.append((f.filename, content))
-    
+) -> Task:
     password_map = {}
     if password_csv:
         content = (await password_csv.read()).decode("utf-8", errors="replace")
@@ -80,58 +337,57 @@ async def unlock_pdfs_endpoint(
                 if len(row) >= 2:
                     password_map[row[0]] = row[1]
 
-    try:
-        result_zip = logic.unlock_pdfs(file_pairs, password_mode, password_for_all, password_map)
-        return StreamingResponse(
-            io.BytesIO(result_zip),
-            media_type="application/zip",
-            headers={"Content-Disposition": "attachment; filename=unlocked_pdfs.zip"}
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    spool, file_pairs = await _spool_uploads(files, upload_ids)
+    return Task(
+        "unlock", logic.unlock_pdfs, (file_pairs, password_mode, password_for_all, password_map), {},
+        spool, "unlocked_pdfs.zip",
+        params=dict(password_mode=password_mode, password_for_all=password_for_all, password_map=password_map),
+        inputs=file_pairs
+    )
+
+@app.post("/unlock")
+async def unlock_pdfs_endpoint(task: Task = Depends(unlock_task)):
+    """
+    Unlock PDFs.
+    - Upload multiple PDFs or ZIPs.
+    - Provide password mode and optional password/CSV.
+    - Returns a ZIP of unlocked PDFs.
+    """
+    return await _stream_result(task)
 
 # -----------------------------------------------------------------------------
 # 2. ORGANIZE
 # -----------------------------------------------------------------------------
-@app.post("/organize")
-async def organize_endpoint(
-    files: List[UploadFile] = File(...),
+async def organize_task(
+    files: Optional[List[UploadFile]] = File(None),
+    upload_ids: Optional[str] = Form(None),  # comma-separated ids of finalized /uploads
     min_year: int = Form(1900),
     max_year: int = Form(2099),
     year_policy: str = Form("first"),  # "first", "last", "max"
     unknown_folder: str = Form("Unknown")
-):
+) -> Task:
+    # ZIP uploads are expanded member by member inside logic.organize_by_year
+    spool, file_pairs = await _spool_uploads(files, upload_ids)
+    return Task(
+        "organize", logic.organize_by_year, (file_pairs, min_year, max_year, year_policy, unknown_folder), {},
+        spool, "organized_by_year.zip",
+        params=dict(min_year=min_year, max_year=max_year, year_policy=year_policy, unknown_folder=unknown_folder),
+        inputs=file_pairs
+    )
+
+@app.post("/organize")
+async def organize_endpoint(task: Task = Depends(organize_task)):
     """
     Organize PDFs by year detected in filename.
     """
-    file_pairs = []
-    for f in files:
-        content = await f.read()
-        # Handle ZIP upload if single file is ZIP
-        if f.filename.lower().endswith(".zip"):
-            with zipfile.ZipFile(io.BytesIO(content)) as zf:
-                for info in zf.infolist():
-                    if not info.is_dir() and not logic._is_mac_resource_junk(info.filename):
-                        file_pairs.append((info.filename, zf.read(info)))
-        else:
-            file_pairs.append((f.filename, content))
-
-    try:
-        result_zip = logic.organize_by_year(file_pairs, min_year, max_year, year_policy, unknown_folder)
-        return StreamingResponse(
-            io.BytesIO(result_zip),
-            media_type="application/zip",
-            headers={"Content-Disposition": "attachment; filename=organized_by_year.zip"}
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await _stream_result(task)
 
 # -----------------------------------------------------------------------------
 # 3. BATES LABELER
 # -----------------------------------------------------------------------------
-@app.post("/bates")
-async def bates_endpoint(
-    files: List[UploadFile] = File(...),
+async def bates_task(
+    files: Optional[List[UploadFile]] = File(None),
+    upload_ids: Optional[str] = Form(None),  # comma-separated ids of finalized /uploads
     prefix: str = Form("J.DOE"),
     start_num: int = Form(1),
     digits: int = Form(8),
@@ -143,193 +399,421 @@ async def bates_endpoint(
     zone_padding: float = Form(18.0),
     color_hex: str = Form("#0000FF"),
     left_punch_margin: float = Form(0.0),
-    border_all_pt: float = Form(0.0)
-):
+    border_all_pt: float = Form(0.0),
+    engine: str = Form("pypdf2"),  # "pypdf2" or "pymupdf" (faster, same output)
+    output_profile: str = Form("standard"),  # "compact": dedupe objects, object streams (smaller PDFs)
+    jpeg_quality: int = Form(logic.JPEG_QUALITY),  # labeled JPEG images: encoder quality 1-100
+    jpeg_optimize: bool = Form(True),  # optimize Huffman tables (smaller, slower on big photos)
+    previous: Optional[UploadFile] = File(None),  # bates_labeled.zip of an earlier run, to reuse unchanged files
+    previous_upload_id: Optional[str] = Form(None),  # or a finalized /uploads id of it
+    matter: Optional[str] = Form(None)  # reserve the range from this matter's counter instead of start_num
+) -> Task:
+    if engine not in logic.BATES_ENGINES:
+        raise HTTPException(status_code=400, detail=f"engine must be one of {', '.join(logic.BATES_ENGINES)}.")
+    if output_profile not in logic.PDF_OUTPUT_PROFILES:
+        raise HTTPException(status_code=400,
+                            detail=f"output_profile must be one of {', '.join(logic.PDF_OUTPUT_PROFILES)}.")
+    if not 1 <= jpeg_quality <= 100:
+        raise HTTPException(status_code=400, detail="jpeg_quality must be between 1 and 100.")
+    use_previous = previous is not None and bool(previous.filename)
+    if use_previous and not previous.filename.lower().endswith(".zip"):
+        raise HTTPException(status_code=400, detail="previous must be a labeled ZIP from /bates.")
+    color_rgb = logic._color_from_hex(color_hex)
+
+    # ZIP uploads are expanded member by member inside logic.walk_and_label
+    spool, file_pairs = await _spool_uploads(files, upload_ids)
+    previous_src = None
+    try:
+        if use_previous:
+            _, previous_src = await spool.add(previous)
+        elif previous_upload_id and previous_upload_id.strip():
+            _, previous_src = spool.add_session(upload_sessions, previous_upload_id.strip())
+    except Exception:
+        spool.cleanup()
+        raise
+
+    # The ZIP ends with bates_records.json/.csv (the BatesRecords), which /index
+    # reads instead of OCR-ing the labels back.
+    label_kwargs = dict(
+        prefix=prefix,
+        start_num=start_num,
+        digits=digits,
+        font_name=font_name,
+        font_size=font_size,
+        margin_right=margin_right,
+        margin_bottom=margin_bottom,
+        zone=zone,
+        zone_padding=zone_padding,
+        color_rgb=color_rgb,
+        left_punch_margin=left_punch_margin,
+        border_all_pt=border_all_pt,
+        engine=engine,
+        output_profile=output_profile,
+        jpeg_quality=jpeg_quality,
+        jpeg_optimize=jpeg_optimize
+    )
+    # With several workers, files are stamped across the pool from a thread here
+    executor = workers.pool_executor()
+    params = dict(label_kwargs, incremental=True) if previous_src is not None else dict(label_kwargs)
+    if matter and matter.strip():
+        params["matter"] = matter.strip()  # the range is reserved by _reserve_bates_range
+    call_kwargs = dict(label_kwargs, previous=previous_src) if previous_src is not None else dict(label_kwargs)
+    if executor is not None:
+        call_kwargs["executor"] = executor
+    return Task(
+        "bates", logic.walk_and_label_zip, (file_pairs,), call_kwargs,
+        spool, "bates_labeled.zip",
+        result_headers=lambda result: {"X-Last-Bates-Number": str(result[1]),
+                                       "X-Files-Reused": str(result[3]["files_reused"]),
+                                       "X-Bates-Engine": result[3]["engine"]},
+        # The previous ZIP is in the key through the spool digests
+        params=params,
+        inputs=file_pairs,
+        local=executor is not None
+    )
+
+async def _plan(task: Task, start_num: int) -> Dict[str, Any]:
+    return await asyncio.to_thread(
+        logic.plan_labels, task.args[0],
+        prefix=task.params["prefix"], start_num=start_num, digits=task.params["digits"],
+        engine=task.params["engine"], font_name=task.params["font_name"]
+    )
+
+def _reserve_bates_range(task: Task, request: Optional[Request] = None) -> None:
     """
-    Apply Bates labels to PDFs and Images.
+    With a `matter`, label from a range of the (matter, prefix) counter. The range is
+    reserved once the task is admitted (and, for a synchronous `request`, only if its
+    client is still there), sized from the plan, and settled afterwards to the pages
+    actually labeled (voided if labeling fails, or if it labeled more pages than the
+    range holds and the numbers after it are taken). Such a run is never served from
+    the cache, since every run takes new numbers.
     """
-    file_pairs = []
-    for f in files:
-        content = await f.read()
-        if f.filename.lower().endswith(".zip"):
-            with zipfile.ZipFile(io.BytesIO(content)) as zf:
-                for info in zf.infolist():
-                    if not info.is_dir() and not logic._is_mac_resource_junk(info.filename):
-                        file_pairs.append((info.filename, zf.read(info)))
-        else:
-            file_pairs.append((f.filename, content))
+    matter = task.params.get("matter")
+    if not matter:
+        return
+    reservation: Dict[str, Any] = {}
 
-    color_rgb = logic._color_from_hex(color_hex)
+    async def _reserve() -> None:
+        if request is not None and await request.is_disconnected():
+            raise ClientDisconnect()  # nobody is waiting for this run any more
+        pages = (await _plan(task, task.params["start_num"]))["pages_total"]
+        reservation.update(await asyncio.to_thread(
+            bates_counters.reserve, matter, task.params["prefix"], pages, task.params["start_num"],
+            ", ".join(name for name, _ in task.args[0])
+        ))
+        task.kwargs["start_num"] = reservation["first_number"]
+
+    async def _settle(result: Any) -> None:
+        if not reservation:
+            return
+        pages_used = result[1] - reservation["first_number"] + 1 if result is not None else 0
+        try:
+            reservation.update(await asyncio.to_thread(bates_counters.settle, reservation["id"], pages_used))
+        except HTTPException:
+            # The labels overlap the next reservation: the output is unusable, release the range
+            await asyncio.to_thread(bates_counters.settle, reservation["id"], 0)
+            raise
 
+    headers = task.result_headers
+    task.cacheable = False
+    task.before_run = _reserve
+    task.after_run = _settle
+    task.result_headers = lambda result: dict(headers(result), **{
+        "X-Bates-Reservation": reservation["id"],
+        "X-First-Bates-Number": str(reservation["first_number"]),
+    })
+
+@app.post("/bates")
+async def bates_endpoint(request: Request, task: Task = Depends(bates_task)):
+    """
+    Apply Bates labels to PDFs and Images.
+    """
+    _reserve_bates_range(task, request)
+    return await _stream_result(task)
+
+@app.post("/bates/plan")
+async def bates_plan_endpoint(task: Task = Depends(bates_task)):
+    """
+    Dry run of /bates with the same form: per-file page counts and first/last labels,
+    the ending number and an estimated run time, without stamping anything.
+    """
     try:
-        records, last_used, labeled_pairs = logic.walk_and_label(
-            file_pairs,
-            prefix=prefix,
-            start_num=start_num,
-            digits=digits,
-            font_name=font_name,
-            font_size=font_size,
-            margin_right=margin_right,
-            margin_bottom=margin_bottom,
-            zone=zone,
-            zone_padding=zone_padding,
-            color_rgb=color_rgb,
-            left_punch_margin=left_punch_margin,
-            border_all_pt=border_all_pt
-        )
-        
-        # Create ZIP of labeled files
-        zip_bytes = logic._zip_from_pairs(labeled_pairs)
-        
-        # We can also return the records as JSON in a header or separate endpoint, 
-        # but for simplicity here we return the ZIP.
-        # Ideally, we might return a multipart response with JSON + ZIP, 
-        # but standard browser download expects a single stream.
-        # We'll include the records as a CSV inside the ZIP? 
-        # Or just return the ZIP for now as per "Swiss Army Knife" flow.
-        
-        return StreamingResponse(
-            io.BytesIO(zip_bytes),
-            media_type="application/zip",
-            headers={
-                "Content-Disposition": "attachment; filename=bates_labeled.zip",
-                "X-Last-Bates-Number": str(last_used)
-            }
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        start_num = task.params["start_num"]
+        matter = task.params.get("matter")
+        if matter:
+            # Where a reservation made now would start; nothing is reserved
+            counter = await asyncio.to_thread(bates_counters.counter, matter, task.params["prefix"])
+            if counter["next_number"] is not None:
+                start_num = counter["next_number"]
+        plan = await _plan(task, start_num)
+    finally:
+        task.spool.cleanup()
+    plan["upload_bytes"] = (await admission.estimate(task.inputs)).bytes
+    plan["estimated_seconds"] = round(plan["pages_total"] * admission_controller.seconds_per_page, 1)
+    return plan
 
 # -----------------------------------------------------------------------------
 # 4. DISCOVERY INDEX
 # -----------------------------------------------------------------------------
-@app.post("/index")
-async def index_endpoint(
-    file: UploadFile = File(...), # Expecting a labeled ZIP
+async def index_task(
+    file: Optional[UploadFile] = File(None), # Expecting a labeled ZIP
+    upload_id: Optional[str] = Form(None),  # or a finalized /uploads id
     party: str = Form("Client"),
     title_text: str = Form("CLIENT NAME - DOCUMENTS")
-):
+) -> Task:
+    spool, pair = await _single_input(file, upload_id, (".zip",), "Input must be a ZIP file.")
+    content = pair[1]
+    index_kwargs = dict(party=party, title_text=title_text)
+    return Task(
+        "index", logic.build_index_from_zip, (content,), index_kwargs,
+        spool, "discovery.xlsx", media_type=XLSX_MEDIA_TYPE,
+        params=index_kwargs,
+        inputs=[pair]
+    )
+
+@app.post("/index")
+async def index_endpoint(task: Task = Depends(index_task)):
     """
     Generate Discovery Index Excel from a ZIP of labeled files.
+    Uses the bates_records manifest written by /bates when present (no OCR).
     """
-    if not file.filename.lower().endswith(".zip"):
-        raise HTTPException(status_code=400, detail="Input must be a ZIP file.")
-
-    content = await file.read()
-    pairs = []
-    rows = []
-    
-    try:
-        with zipfile.ZipFile(io.BytesIO(content), "r") as zf:
-            for info in zf.infolist():
-                if info.is_dir() or logic._is_mac_resource_junk(info.filename):
-                    continue
-                data = zf.read(info)
-                pairs.append((info.filename, data))
-                
-                # Basic metadata
-                p = logic.Path(info.filename)
-                rel_dir = str(p.parent) if str(p.parent) != "." else ""
-                cat = p.parts[-2] if len(p.parts) > 1 else ""
-                rows.append({"rel_dir": rel_dir, "filename": p.name, "category": cat})
-        
-        df = logic.pd.DataFrame(rows)
-        
-        # Scan for Bates
-        det = logic.scan_pairs_for_bates(pairs)
-        if not det.empty:
-            df = df.merge(det[["rel_dir","filename","first_label","last_label"]], on=["rel_dir","filename"], how="left")
-
-        # Prepare for Excel
-        if {"first_label","last_label"}.issubset(df.columns):
-            fl = df["first_label"].fillna("").astype(str)
-            ll = df["last_label"].fillna("").astype(str)
-            df["Bates Range"] = logic.np.where(
-                (fl != "") & (ll != "") & (fl != ll),
-                fl + " - " + ll,
-                logic.np.where(fl != "", fl, ll)
-            )
-        else:
-            df["Bates Range"] = ""
-
-        df.rename(columns={"category":"Category", "filename":"Document Name/Title"}, inplace=True)
-        
-        df["Date Produced"] = df.apply(
-            lambda r: logic._extract_date_produced_from_rel(r.get("rel_dir",""), r.get("Document Name/Title","")),
-            axis=1
-        )
-        df["Date Produced"] = df["Date Produced"].apply(
-            lambda d: d if logic.pd.notnull(d) and d != "" else datetime.today().date()
-        )
-
-        xlsx_bytes = logic.build_discovery_xlsx(
-            df[["Date Produced","Document Name/Title","Category","Bates Range"]],
-            party=party,
-            title_text=title_text
-        )
-
-        return StreamingResponse(
-            io.BytesIO(xlsx_bytes),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": "attachment; filename=discovery.xlsx"}
-        )
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await _stream_result(task)
 
 # -----------------------------------------------------------------------------
 # 5. REDACTION
 # -----------------------------------------------------------------------------
-@app.post("/redact")
-async def redact_endpoint(
-    file: UploadFile = File(...), # ZIP or PDF
+async def redact_task(
+    file: Optional[UploadFile] = File(None), # ZIP or PDF
+    upload_id: Optional[str] = Form(None),  # or a finalized /uploads id
     presets: List[str] = Form(["SSN"]),
     regex_patterns: Optional[str] = Form(None), # newline separated
     literal_patterns: Optional[str] = Form(None), # comma separated
     case_sensitive: bool = Form(False),
     keep_last_digits: int = Form(0),
-    require_ssn_context: bool = Form(True)
-):
-    """
-    Redact PDF or ZIP of PDFs.
-    """
-    content = await file.read()
-    
+    require_ssn_context: bool = Form(True),
+    tolerant_literals: bool = Form(False) # literal words may be split by spaces, line breaks or dashes
+) -> Task:
     # Compile patterns
     try:
-        patterns = logic.load_patterns(presets, regex_patterns or "", literal_patterns or "", case_sensitive)
+        patterns = logic.load_patterns(presets, regex_patterns or "", literal_patterns or "", case_sensitive,
+                                       tolerant_literals)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
     # If single PDF, wrap in ZIP for uniform processing or handle separately?
     # Logic expects ZIP bytes for `process_zip_bytes`.
-    # If it's a PDF, let's zip it in memory first to reuse `process_zip_bytes` easily,
-    # or we could expose `redact_pdf_bytes` directly. 
+    # If it's a PDF, let's zip it (on disk, uncompressed) first to reuse `process_zip_bytes` easily,
+    # or we could expose `redact_pdf_bytes` directly.
     # Reusing `process_zip_bytes` gives us the audit report for free.
-    
-    input_zip_bytes = content
-    if file.filename.lower().endswith(".pdf"):
-        buf = io.BytesIO()
-        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-            zf.writestr(file.filename, content)
-        input_zip_bytes = buf.getvalue()
-    elif not file.filename.lower().endswith(".zip"):
-        raise HTTPException(status_code=400, detail="File must be PDF or ZIP.")
 
+    spool, pair = await _single_input(file, upload_id, (".pdf", ".zip"), "File must be PDF or ZIP.")
+    name, content = pair
     try:
-        out_zip, hits, summary = logic.process_zip_bytes(
-            input_zip_bytes,
-            patterns,
-            keep_last_digits,
-            require_ssn_context=require_ssn_context
-        )
-        
-        return StreamingResponse(
-            io.BytesIO(out_zip),
-            media_type="application/zip",
-            headers={
-                "Content-Disposition": "attachment; filename=redacted_output.zip",
-                "X-Total-Hits": str(summary["total_hits"])
-            }
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        input_zip = content
+        if name.lower().endswith(".pdf"):
+            input_zip = await asyncio.to_thread(spool.wrap_in_zip, name, content)
+    except Exception:
+        spool.cleanup()
+        raise
+
+    # With several workers, large PDFs are redacted in page ranges across the pool from a thread here
+    executor = workers.pool_executor()
+    call_kwargs: Dict[str, Any] = dict(require_ssn_context=require_ssn_context)
+    if executor is not None:
+        call_kwargs["executor"] = executor
+    return Task(
+        "redact", logic.process_zip_bytes, (input_zip, patterns, keep_last_digits),
+        call_kwargs,
+        spool, "redacted_output.zip",
+        result_headers=lambda result: {"X-Total-Hits": str(result[2]["total_hits"])},
+        params=dict(presets=presets, regex_patterns=regex_patterns, literal_patterns=literal_patterns,
+                    case_sensitive=case_sensitive, keep_last_digits=keep_last_digits,
+                    require_ssn_context=require_ssn_context, tolerant_literals=tolerant_literals),
+        inputs=[pair],
+        local=executor is not None
+    )
+
+@app.post("/redact")
+async def redact_endpoint(task: Task = Depends(redact_task)):
+    """
+    Redact PDF or ZIP of PDFs.
+    """
+    return await _stream_result(task)
+
+# -----------------------------------------------------------------------------
+# 6. PIPELINE
+# -----------------------------------------------------------------------------
+async def pipeline_task(
+    files: Optional[List[UploadFile]] = File(None),
+    upload_ids: Optional[str] = Form(None),  # comma-separated ids of finalized /uploads
+    stages: str = Form(...)  # JSON list, e.g. [{"stage": "unlock"}, {"stage": "bates", "prefix": "J.DOE"}, {"stage": "index"}]
+) -> Task:
+    try:
+        spec = logic.normalize_pipeline(json.loads(stages))
+    except ValueError as e:  # includes JSON decode errors
+        raise HTTPException(status_code=400, detail=str(e))
+
+    spool, file_pairs = await _spool_uploads(files, upload_ids)
+
+    def _headers(result):
+        report = result[1]
+        headers = {}
+        if "last_bates_number" in report:
+            headers["X-Last-Bates-Number"] = str(report["last_bates_number"])
+        if "total_hits" in report:
+            headers["X-Total-Hits"] = str(report["total_hits"])
+        return headers
+
+    # With several workers, every stage spreads its files across the pool from a thread here
+    executor = workers.pool_executor()
+    return Task(
+        "pipeline", logic.run_pipeline, (file_pairs, spec), {"executor": executor} if executor is not None else {},
+        spool, "pipeline_output.zip",
+        result_headers=_headers,
+        params={"stages": spec},
+        inputs=file_pairs,
+        local=executor is not None
+    )
+
+@app.post("/pipeline")
+async def pipeline_endpoint(task: Task = Depends(pipeline_task)):
+    """
+    Run several tools in one request over a single upload.
+    `stages` is a JSON list of {"stage": "unlock|organize|redact|bates|index", ...params};
+    params and defaults match the single-tool endpoints (bates takes `color_hex`,
+    unlock takes `password_map` as an object). Returns one ZIP with the final
+    documents, discovery_index.xlsx, audit.csv and pipeline_report.json.
+    """
+    return await _stream_result(task)
+
+# -----------------------------------------------------------------------------
+# 7. RESUMABLE UPLOADS
+# Create a session, PUT numbered chunks (any order, in parallel, retry freely)
+# with their SHA-256 in X-Chunk-SHA256, check GET /uploads/{id} for what is
+# missing, then finalize. Pass the id as `upload_ids` / `upload_id` to any tool.
+# -----------------------------------------------------------------------------
+@app.post("/uploads", status_code=201)
+def create_upload(
+    filename: str = Form(...),
+    size: int = Form(...),  # total bytes
+    chunk_size: Optional[int] = Form(None)
+):
+    return upload_sessions.create(filename, size, chunk_size)
+
+@app.get("/uploads/{upload_id}")
+def upload_status(upload_id: str):
+    """Received / missing chunk indices and the byte ranges already stored."""
+    return upload_sessions.status(upload_id)
+
+@app.put("/uploads/{upload_id}/chunks/{index}")
+async def upload_chunk(upload_id: str, index: int, request: Request,
+                       x_chunk_sha256: str = Header(...)):
+    return await upload_sessions.put_chunk(upload_id, index, request.stream(), x_chunk_sha256)
+
+@app.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, sha256: Optional[str] = Form(None)):
+    """Assemble the chunks; `sha256` (optional) is checked against the whole file."""
+    return await asyncio.to_thread(upload_sessions.finalize, upload_id, sha256)
+
+@app.delete("/uploads/{upload_id}", status_code=204)
+def delete_upload(upload_id: str):
+    upload_sessions.delete(upload_id)
+
+# -----------------------------------------------------------------------------
+# 8. JOBS
+# Same inputs as the endpoints above, but the request returns a job id at once
+# (202). Poll GET /jobs/{id} for per-file / per-page progress, then download
+# GET /jobs/{id}/result. Results are kept for DISCOVERY_JOBS_TTL_SECONDS.
+# -----------------------------------------------------------------------------
+@app.post("/jobs/unlock", status_code=202)
+async def unlock_job(task: Task = Depends(unlock_task)):
+    return await _submit_job(task)
+
+@app.post("/jobs/organize", status_code=202)
+async def organize_job(task: Task = Depends(organize_task)):
+    return await _submit_job(task)
+
+@app.post("/jobs/bates", status_code=202)
+async def bates_job(task: Task = Depends(bates_task)):
+    _reserve_bates_range(task)
+    return await _submit_job(task)
+
+@app.post("/jobs/index", status_code=202)
+async def index_job(task: Task = Depends(index_task)):
+    return await _submit_job(task)
+
+@app.post("/jobs/redact", status_code=202)
+async def redact_job(task: Task = Depends(redact_task)):
+    return await _submit_job(task)
+
+@app.post("/jobs/pipeline", status_code=202)
+async def pipeline_job(task: Task = Depends(pipeline_task)):
+    return await _submit_job(task)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Request counts, latency histograms, bytes in/out and per-stage timings (Prometheus text format)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admission")
+def admission_status():
+    """Admission control state: work in flight, queue depth and the current Retry-After estimate."""
+    return admission_controller.status()
+
+@app.get("/cache")
+def cache_stats():
+    """Result cache hit/miss counters and size."""
+    return result_cache.stats()
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    status = job_store.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job.")
+    return status
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    status = job_store.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job.")
+    path = job_store.result_path(job_id)
+    if path is None or not path.exists():
+        detail = status.get("error") or f"Job is {status['status']}."
+        raise HTTPException(status_code=409, detail=detail)
+    meta = job_store.touch(job_id)
+    return FileResponse(
+        path,
+        media_type=meta["media_type"],
+        headers={"Content-Disposition": f"attachment; filename={meta['filename']}", **meta.get("headers", {})},
+    )
+
+# -----------------------------------------------------------------------------
+# 9. BATES COUNTERS
+# Send `matter` with /bates (or /jobs/bates) to label from a reserved range, or
+# reserve ranges here and pass each first_number as start_num.
+# -----------------------------------------------------------------------------
+@app.get("/counters")
+def list_counters():
+    """Every (matter, prefix) counter with its next free number."""
+    return bates_counters.matters()
+
+@app.post("/counters/reserve", status_code=201)
+def reserve_range(
+    matter: str = Form(...),
+    prefix: str = Form(...),
+    pages: int = Form(...),
+    start_num: int = Form(1),  # first number of a new counter; ignored once it has reservations
+    note: str = Form("")
+):
+    return bates_counters.reserve(matter, prefix, pages, start_num, note)
+
+@app.get("/counters/lookup")
+def lookup_number(matter: str, prefix: str, number: int):
+    """The reservation holding Bates number `number` (404 if none does)."""
+    return bates_counters.lookup(matter, prefix, number)
+
+@app.get("/counters/reservations")
+def list_reservations(matter: str, prefix: str):
+    """Next free number and every reservation of one counter, in number order."""
+    return bates_counters.counter(matter, prefix)
@@ -0,0 +1,189 @@
+"""
+In-process metrics with Prometheus text exposition (``GET /metrics``).
+
+No client library or external service is needed: counters and histograms live
+in this module and are rendered in the Prometheus text format on request, so
+they can be scraped locally or just read with curl.
+
+Exported series:
+- ``discovery_http_requests_total{method,endpoint,status}``
+- ``discovery_http_request_duration_seconds{method,endpoint}`` (until the last body byte)
+- ``discovery_http_request_bytes_total{endpoint}`` / ``discovery_http_response_bytes_total{endpoint}``
+- ``discovery_stage_duration_seconds{stage}``: timings recorded inside logic.py
+  (pdf_parse, overlay_render, merge, compact, ocr, regex_scan, apply_redactions,
+  zip_compress, xlsx_build), shipped back from the worker processes
+- ``discovery_pages_processed_total`` / ``discovery_ocr_pages_total``
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            lines.extend(self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        if not self._values and not self.labelnames:
+            yield f"{self.name} 0"
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe_many(self, values: Iterable[float], **labels: Any) -> None:
+        key = self._key(labels)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for value in values:
+                i = bisect.bisect_left(self.buckets, value)
+                if i < len(self.buckets):
+                    state["buckets"][i] += 1
+                state["sum"] += value
+                state["count"] += 1
+
+    def observe(self, value: float, **labels: Any) -> None:
+        self.observe_many((value,), **labels)
+
+    def samples(self) -> Iterable[str]:
+        for key, state in sorted(self._values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, state["buckets"]):
+                cumulative += n
+                le = 'le="%s"' % _fmt(bound)
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {state['count']}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(state['sum'])}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {state['count']}"
+
+
+REQUESTS = Counter("discovery_http_requests_total", "HTTP requests handled.", ("method", "endpoint", "status"))
+REQUEST_DURATION = Histogram("discovery_http_request_duration_seconds",
+                             "Time from request start to the last response byte.", ("method", "endpoint"))
+BYTES_IN = Counter("discovery_http_request_bytes_total", "Request body bytes received.", ("endpoint",))
+BYTES_OUT = Counter("discovery_http_response_bytes_total", "Response body bytes sent.", ("endpoint",))
+STAGE_DURATION = Histogram("discovery_stage_duration_seconds", "Time spent per processing stage in logic.py.",
+                           ("stage",), buckets=STAGE_BUCKETS)
+PAGES = Counter("discovery_pages_processed_total", "PDF pages and images stamped or redacted.")
+OCR_PAGES = Counter("discovery_ocr_pages_total", "Pages or images sent to OCR.")
+
+_STAGE_COUNTERS = {"pages_processed": PAGES, "ocr_pages": OCR_PAGES}
+
+
+def record_stages(data: Dict[str, Dict]) -> None:
+    """Fold the output of logic.collect_metrics() (from any process) into the registry."""
+    for stage, durations in data.get("timings", {}).items():
+        STAGE_DURATION.observe_many(durations, stage=stage)
+    for name, n in data.get("counters", {}).items():
+        counter = _STAGE_COUNTERS.get(name)
+        if counter is not None:
+            counter.inc(n)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests, bytes and latency per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = {"status": 500, "in": 0, "out": 0}
+
+        async def _receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                state["in"] += len(message.get("body", b""))
+            return message
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["out"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, _receive, _send)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            REQUESTS.inc(method=method, endpoint=endpoint, status=state["status"])
+            REQUEST_DURATION.observe(time.perf_counter() - start, method=method, endpoint=endpoint)
+            BYTES_IN.inc(state["in"], endpoint=endpoint)
+            BYTES_OUT.inc(state["out"], endpoint=endpoint)
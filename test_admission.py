@@ -0,0 +1,107 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+from fastapi import HTTPException
+
+import admission
+from admission import AdmissionController, Cost
+
+
+def test_queue_is_fifo():
+    controller = AdmissionController(max_pages=10, max_bytes=0, queue_depth=4)
+    first = controller.reserve(Cost(pages=8, bytes=0))
+    big = controller.reserve(Cost(pages=5, bytes=0))
+    small = controller.reserve(Cost(pages=1, bytes=0))
+    # The small request would fit, but doesn't overtake the one queued before it
+    assert (first.admitted, big.admitted, small.admitted) == (True, False, False)
+    first.release()
+    assert (big.admitted, small.admitted) == (True, True)
+    assert (controller.running, controller.pages_in_flight) == (2, 6)
+
+
+def test_bytes_budget_queues_too():
+    controller = AdmissionController(max_pages=0, max_bytes=100, queue_depth=4)
+    first = controller.reserve(Cost(pages=1000, bytes=60))
+    second = controller.reserve(Cost(pages=1, bytes=60))
+    assert (first.admitted, second.admitted) == (True, False)
+    first.release()
+    assert second.admitted
+
+
+def test_oversized_request_runs_alone():
+    controller = AdmissionController(max_pages=10, max_bytes=0, queue_depth=4)
+    alone = controller.reserve(Cost(pages=50, bytes=0))
+    assert alone.admitted  # nothing else is running
+    other = controller.reserve(Cost(pages=1, bytes=0))
+    assert not other.admitted
+    alone.release()
+    small = controller.reserve(Cost(pages=1, bytes=0))
+    oversized = controller.reserve(Cost(pages=50, bytes=0))
+    assert (other.admitted, small.admitted, oversized.admitted) == (True, True, False)
+    other.release()
+    assert not oversized.admitted
+    small.release()
+    assert oversized.admitted and controller.running == 1
+
+
+def test_full_queue_answers_429_with_retry_after():
+    controller = AdmissionController(max_pages=10, max_bytes=0, queue_depth=1)
+    controller.seconds_per_page = 0.5
+    controller.reserve(Cost(pages=10, bytes=0))
+    controller.reserve(Cost(pages=4, bytes=0))
+    with pytest.raises(HTTPException) as e:
+        controller.reserve(Cost(pages=1, bytes=0))
+    assert e.value.status_code == 429
+    assert e.value.headers["Retry-After"] == "7"  # (10 running + 4 queued) pages * 0.5 s
+    assert controller.rejected == 1
+    assert controller.status()["queued"] == 1
+
+
+def test_refine_and_release_accounting():
+    controller = AdmissionController(max_pages=10, max_bytes=100, queue_depth=4)
+    running = controller.reserve(Cost(pages=6, bytes=30))
+    queued = controller.reserve(Cost(pages=6, bytes=30))
+    running.refine(2)
+    assert (controller.pages_in_flight, controller.bytes_in_flight) == (2, 30)
+    queued.refine(3)  # not admitted yet: only its price changes
+    assert controller.pages_in_flight == 2 and queued.cost == Cost(pages=3, bytes=30)
+    running.release()
+    running.release()  # idempotent
+    assert queued.admitted
+    assert (controller.running, controller.pages_in_flight, controller.bytes_in_flight) == (1, 3, 30)
+    waiting = controller.reserve(Cost(pages=20, bytes=0))
+    waiting.release()  # gives up its place in line
+    assert controller.status()["queued"] == 0
+    queued.release()
+    assert (controller.running, controller.pages_in_flight, controller.bytes_in_flight) == (0, 0, 0)
+
+
+def test_wait_returns_once_admitted():
+    async def _run():
+        controller = AdmissionController(max_pages=1, max_bytes=0, queue_depth=4)
+        first = controller.reserve(Cost(pages=1, bytes=0))
+        second = controller.reserve(Cost(pages=1, bytes=0))
+        await asyncio.wait_for(first.wait(), 1)
+        waiter = asyncio.ensure_future(second.wait())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        first.release()
+        await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(_run())
+
+
+def test_estimate_prices_from_sizes_and_the_zip_directory(tmp_path):
+    per_page = admission.ESTIMATED_BYTES_PER_PAGE
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("a/doc.pdf", b"\0" * (3 * per_page))  # compresses to almost nothing
+        zf.writestr("a/photo.jpg", b"x")
+        zf.writestr("a/notes.txt", b"x" * per_page)
+    path = tmp_path / "big.pdf"
+    path.write_bytes(b"\0" * (per_page + 1))
+    cost = admission._estimate([("in.zip", buf.getvalue()), ("big.pdf", str(path)), ("x.png", b"png")])
+    assert cost == Cost(pages=3 + 1 + 2 + 1, bytes=len(buf.getvalue()) + per_page + 1 + 3)
+    assert admission._estimate([("bad.zip", b"not a zip")]) == Cost(pages=1, bytes=9)
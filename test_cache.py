@@ -0,0 +1,52 @@
+import cache
+
+
+def _put(store, tmp_path, key, data, headers=None):
+    src = tmp_path / f"src-{key[:8]}"
+    src.write_bytes(data)
+    store.put(key, src, "out.zip", "application/zip", headers or {})
+
+
+def test_cache_key_covers_kind_params_inputs_and_version(monkeypatch):
+    base = cache.cache_key("bates", {"prefix": "A", "digits": 6}, [("a.pdf", "00")])
+    assert base == cache.cache_key("bates", {"digits": 6, "prefix": "A"}, [("a.pdf", "00")])
+    assert base != cache.cache_key("redact", {"prefix": "A", "digits": 6}, [("a.pdf", "00")])
+    assert base != cache.cache_key("bates", {"prefix": "B", "digits": 6}, [("a.pdf", "00")])
+    assert base != cache.cache_key("bates", {"prefix": "A", "digits": 6}, [("a.pdf", "01")])
+    assert base != cache.cache_key("bates", {"prefix": "A", "digits": 6}, [("b.pdf", "00")])
+    assert cache.cache_key("bates", {}, [("a", "0"), ("b", "1")]) != cache.cache_key("bates", {}, [("b", "1"), ("a", "0")])
+    monkeypatch.setattr(cache, "CACHE_VERSION", cache.CACHE_VERSION + 1)
+    assert base != cache.cache_key("bates", {"prefix": "A", "digits": 6}, [("a.pdf", "00")])
+
+
+def test_cache_hit_and_miss(tmp_path):
+    store = cache.ResultCache(str(tmp_path / "cache"), max_bytes=1000)
+    key = cache.cache_key("bates", {}, [])
+    assert store.get(key, tmp_path / "miss") is None
+    _put(store, tmp_path, key, b"artifact", {"X-Last-Bates-Number": "9"})
+    entry = store.get(key, tmp_path / "hit")
+    assert entry["headers"] == {"X-Last-Bates-Number": "9"} and entry["filename"] == "out.zip"
+    assert (tmp_path / "hit").read_bytes() == b"artifact"
+    assert (store.hits, store.misses) == (1, 1)
+    assert store.stats()["entries"] == 1 and store.stats()["bytes"] == 8
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    store = cache.ResultCache(str(tmp_path / "cache"), max_bytes=100)
+    keys = [cache.cache_key("bates", {"n": i}, []) for i in range(3)]
+    _put(store, tmp_path, keys[0], b"x" * 40)
+    _put(store, tmp_path, keys[1], b"x" * 40)
+    assert store.get(keys[0], tmp_path / "a") is not None  # now more recent than keys[1]
+    _put(store, tmp_path, keys[2], b"x" * 40)
+    assert store.get(keys[1], tmp_path / "b") is None
+    assert store.get(keys[0], tmp_path / "c") is not None and store.get(keys[2], tmp_path / "d") is not None
+    _put(store, tmp_path, cache.cache_key("bates", {"n": "big"}, []), b"x" * 101)  # larger than the cap
+    assert store.stats()["entries"] == 2
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    store = cache.ResultCache(str(tmp_path / "cache"), max_bytes=0)
+    key = cache.cache_key("bates", {}, [])
+    _put(store, tmp_path, key, b"artifact")
+    assert store.get(key, tmp_path / "out") is None
+    assert not (tmp_path / "cache").exists()
@@ -0,0 +1,97 @@
+import concurrent.futures
+
+import pytest
+from fastapi import HTTPException
+
+import counters
+
+
+def _ranges(store, matter="M", prefix="P"):
+    return [(r["first_number"], r["last_number"], r["pages"]) for r in store.counter(matter, prefix)["reservations"]]
+
+
+def test_concurrent_reservations_do_not_overlap(tmp_path):
+    path = str(tmp_path / "counters.sqlite3")
+    with concurrent.futures.ThreadPoolExecutor(8) as pool:
+        # A store per thread, as separate workers would open it
+        taken = list(pool.map(lambda pages: counters.BatesCounters(path).reserve("M", "P", pages, 100),
+                              [3, 1, 4, 1, 5, 9, 2, 6] * 4))
+    spans = sorted((r["first_number"], r["last_number"]) for r in taken)
+    assert spans[0][0] == 100
+    assert all(b[0] == a[1] + 1 for a, b in zip(spans, spans[1:]))
+    assert counters.BatesCounters(path).counter("M", "P")["next_number"] == spans[-1][1] + 1
+
+
+def test_start_num_only_seeds_a_new_counter(tmp_path):
+    store = counters.BatesCounters(str(tmp_path / "c.sqlite3"))
+    assert store.counter("M", "P")["next_number"] is None
+    assert store.reserve("M", "P", 2, 0)["first_number"] == 0
+    assert store.reserve("M", "P", 2, 500)["first_number"] == 2
+    assert store.reserve("M", "Q", 2, 500)["first_number"] == 500
+
+
+def test_settle_shrinks_and_grows_the_latest_reservation(tmp_path):
+    store = counters.BatesCounters(str(tmp_path / "c.sqlite3"))
+    first = store.reserve("M", "P", 10, 1)
+    latest = store.reserve("M", "P", 10)
+    # The latest reservation hands unused numbers back and may grow
+    assert store.settle(latest["id"], 4)["last_number"] == 14
+    assert store.counter("M", "P")["next_number"] == 15
+    assert store.settle(latest["id"], 12)["last_number"] == 22
+    assert store.counter("M", "P")["next_number"] == 23
+    # An earlier one keeps its unused numbers unassigned and can't grow into the next
+    assert store.settle(first["id"], 7)["last_number"] == 7
+    assert store.counter("M", "P")["next_number"] == 23
+    with pytest.raises(HTTPException) as e:
+        store.settle(first["id"], 8)
+    assert e.value.status_code == 409
+    assert _ranges(store) == [(1, 7, 7), (11, 22, 12)]
+    with pytest.raises(HTTPException) as e:
+        store.lookup("M", "P", 9)
+    assert e.value.status_code == 404
+    assert store.lookup("M", "P", 11)["id"] == latest["id"]
+
+
+def test_void_releases_the_range(tmp_path):
+    store = counters.BatesCounters(str(tmp_path / "c.sqlite3"))
+    kept = store.reserve("M", "P", 5, 1)
+    failed = store.reserve("M", "P", 5)
+    assert store.settle(failed["id"], 0)["pages"] == 0
+    assert store.counter("M", "P")["next_number"] == 6
+    assert store.reserve("M", "P", 1)["first_number"] == 6
+    # Voiding an earlier reservation leaves its numbers unassigned
+    store.settle(kept["id"], 0)
+    with pytest.raises(HTTPException) as e:
+        store.lookup("M", "P", 3)
+    assert e.value.status_code == 404
+    assert store.counter("M", "P")["next_number"] == 7
+    with pytest.raises(HTTPException) as e:
+        store.settle("missing", 0)
+    assert e.value.status_code == 404
+
+
+def test_counter_endpoints_and_plan(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    import benchmark
+    import main
+    monkeypatch.setattr(main, "bates_counters", counters.BatesCounters(str(tmp_path / "c.sqlite3")))
+    client = TestClient(main.app)
+    pdf = ("files", ("a.pdf", benchmark.make_pdf(3), "application/pdf"))
+    plan = client.post("/bates/plan", files=[pdf], data={"matter": "M", "prefix": "P", "start_num": "0"}).json()
+    assert (plan["first_bates_number"], plan["last_bates_number"]) == (0, 2)
+
+    r = client.post("/counters/reserve", data={"matter": "M", "prefix": "P", "pages": "3", "start_num": "0"})
+    assert r.status_code == 201 and r.json()["last_number"] == 2
+    # A plan shows where a reservation made now would start (even at 0), without reserving
+    client.post("/counters/reserve", data={"matter": "M", "prefix": "Q", "pages": "0", "start_num": "0"})
+    plan = client.post("/bates/plan", files=[pdf], data={"matter": "M", "prefix": "Q", "start_num": "7"}).json()
+    assert plan["first_bates_number"] == 0
+    plan = client.post("/bates/plan", files=[pdf], data={"matter": "M", "prefix": "P"}).json()
+    assert (plan["first_bates_number"], plan["last_bates_number"]) == (3, 5)
+    assert client.get("/counters/reservations", params={"matter": "M", "prefix": "P"}).json()["next_number"] == 3
+
+    assert client.get("/counters/lookup", params={"matter": "M", "prefix": "P", "number": 1}).json()["pages"] == 3
+    assert client.get("/counters/lookup", params={"matter": "M", "prefix": "P", "number": 3}).status_code == 404
+    assert client.get("/counters").json() == [{"matter": "M", "prefix": "P", "next_number": 3},
+                                              {"matter": "M", "prefix": "Q", "next_number": 0}]
+    assert client.post("/counters/reserve", data={"matter": " ", "prefix": "P", "pages": "1"}).status_code == 400
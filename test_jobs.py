@@ -0,0 +1,127 @@
+import asyncio
+import subprocess
+import sys
+import time
+
+import pytest
+
+import jobs
+
+
+def test_job_ids_cannot_leave_the_store(tmp_path):
+    store = jobs.JobStore(str(tmp_path / "jobs"))
+    (tmp_path / "job.json").write_text('{"id": "x", "status": "done"}')
+    for job_id in ("..", "../jobs", "0" * 31 + "/", "A" * 32, "g" * 32):
+        with pytest.raises(KeyError):
+            store.progress_path(job_id)
+        assert store.status(job_id) is None
+        assert store.result_path(job_id) is None
+
+
+def test_job_lifecycle(tmp_path):
+    store = jobs.JobStore(str(tmp_path / "jobs"))
+    out = tmp_path / "out.zip"
+
+    async def _run():
+        admitted = asyncio.Event()
+
+        async def _work(progress, started):
+            await admitted.wait()
+            started()
+            progress(files_done=0, files_total=1)
+            out.write_bytes(b"result")
+            return {"X-Last-Bates-Number": "7"}
+
+        async def _fail(progress, started):
+            started()
+            raise ValueError("bad input")
+
+        job_id = store.submit("bates", _work, out, "bates_labeled.zip", "application/zip")
+        failed_id = store.submit("redact", _fail, tmp_path / "none", "redacted.zip", "application/zip")
+        await asyncio.sleep(0.05)
+        assert store.status(job_id)["status"] == jobs.QUEUED
+        admitted.set()
+        while store.status(job_id)["status"] != jobs.DONE:
+            await asyncio.sleep(0.01)
+        return job_id, failed_id
+
+    job_id, failed_id = asyncio.run(_run())
+    view = store.status(job_id)
+    assert view["started_at"] is not None and view["progress"]["files_total"] == 1
+    assert view["result"]["headers"] == {"X-Last-Bates-Number": "7"} and view["result"]["size"] == 6
+    assert store.result_path(job_id).read_bytes() == b"result" and not out.exists()
+    failed = store.status(failed_id)
+    assert (failed["status"], failed["error"]) == (jobs.FAILED, "bad input")
+    assert store.result_path(failed_id) is None
+
+
+def test_status_is_running_once_started(tmp_path):
+    store = jobs.JobStore(str(tmp_path / "jobs"))
+
+    async def _run():
+        release = asyncio.Event()
+
+        async def _work(progress, started):
+            started()  # admitted, but nothing reported yet
+            await release.wait()
+            return {}
+
+        job_id = store.submit("unlock", _work, tmp_path / "out.zip", "unlocked.zip", "application/zip")
+        await asyncio.sleep(0.05)
+        status = store.status(job_id)["status"]
+        release.set()
+        await asyncio.sleep(0.05)
+        return status
+
+    assert asyncio.run(_run()) == jobs.RUNNING
+
+
+def _finished_job(store, size, last_access, finished_at=None):
+    job_id = store.create("bates", "bates_labeled.zip", "application/zip")
+    (store.root / job_id / "result.zip").write_bytes(b"x" * size)
+    store._update(job_id, status=jobs.DONE, result_file="result.zip", size=size, last_access=last_access,
+                  finished_at=finished_at or time.time())
+    return job_id
+
+
+def test_eviction_by_ttl_then_least_recently_used(tmp_path):
+    store = jobs.JobStore(str(tmp_path / "jobs"), max_bytes=100, ttl_seconds=3600)
+    expired = _finished_job(store, 10, time.time(), finished_at=time.time() - 7200)
+    oldest = _finished_job(store, 60, 1)
+    older = _finished_job(store, 60, 2)
+    newest = _finished_job(store, 60, 3)
+    running = store.create("redact", "redacted.zip", "application/zip")
+    store.touch(oldest)  # downloaded just now: the most recently used
+    store.evict()
+    assert {d.name for d in store.root.iterdir()} == {oldest, running}
+    assert store.status(newest) is None and store.status(older) is None and store.status(expired) is None
+
+
+def _create_in_process(root, keep_running):
+    code = ("import sys; sys.path.insert(0, %r); import jobs; "
+            "print(jobs.JobStore(%r).create('bates', 'a.zip', 'application/zip'), flush=True)"
+            % (str(jobs.Path(jobs.__file__).parent), str(root)))
+    if keep_running:
+        code += "; import time; time.sleep(60)"
+    proc = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True)
+    return proc, proc.stdout.readline().strip()
+
+
+def test_recover_only_fails_jobs_of_exited_processes(tmp_path):
+    root = tmp_path / "jobs"
+    exited, exited_job = _create_in_process(root, keep_running=False)
+    exited.wait()
+    sibling, sibling_job = _create_in_process(root, keep_running=True)
+    try:
+        store = jobs.JobStore(str(root))
+        own_job = store.create("redact", "r.zip", "application/zip")
+        store.recover()
+        assert store.status(exited_job)["status"] == jobs.FAILED
+        assert store.status(sibling_job)["status"] == jobs.QUEUED
+        assert store.status(own_job)["status"] == jobs.QUEUED
+    finally:
+        sibling.kill()
+        sibling.wait()
+    store.recover()
+    assert store.status(sibling_job)["status"] == jobs.FAILED
+    assert store.status(own_job)["status"] == jobs.QUEUED
@@ -0,0 +1,298 @@
+import concurrent.futures
+import random
+import re
+import threading
+
+import pytest
+
+import logic
+
+
+def _per_pattern(patterns, text):
+    return [(i, m.span()) for i, p in enumerate(patterns) for m in p.finditer(text)]
+
+
+def test_pattern_set_keeps_patterns_sharing_a_literal_guard():
+    # Two regexes guarded by [AB] and the literals Acme/Bob, whose union guard is also [AB]
+    patterns = logic.load_patterns([], "(?:Acct|Bank)\\s*#\\s*\\d{6,}\n(?:Acct|Bank)\\s+No\\.?\\s*\\d{6,}",
+                                   "Acme, Bob", False)
+    text = "Statement of account. " * 50 + "Acct # 12345678 and Bank No. 99887766 for Acme and Bob."
+    ps = logic.PatternSet(patterns)
+    assert [(i, m.span()) for i, m in ps.finditer(text)] == _per_pattern(patterns, text)
+    assert ps.fullmatches("Acct#12345678") == [0]
+
+
+def test_pattern_set_matches_per_pattern_scans():
+    rnd = random.Random(0)
+    regexes = logic.PRESETS["SSN"] + logic.PRESETS["Email"] + [
+        r"(?:Acct|Bank)\s*#\s*\d{6,}", r"(?:Acct|Bank)\s+No\.?\s*\d{6,}", r"A\w+", r"B\d+", r"x*"]
+    literals = ["Acme", "Bob", "Ann", "Acct", "12345678", "a@b.co"]
+    pieces = ["Acct", "Bank", "#", "No.", "12345678", "Acme", "Bob", "Ann", "a@b.co", "123-45-6789",
+              "123456789", " ", "\n", "x"]
+    for _ in range(2000):
+        patterns = [re.compile(p, re.IGNORECASE) for p in rnd.sample(regexes, rnd.randint(0, len(regexes)))]
+        patterns += [re.compile(re.escape(s), re.IGNORECASE) for s in rnd.sample(literals, rnd.randint(0, 4))]
+        if not patterns:
+            continue
+        ps = logic.PatternSet(patterns)
+        text = "filler text " * rnd.choice([0, 100]) + " ".join(
+            rnd.choice(pieces) for _ in range(rnd.randint(0, 15)))
+        assert [(i, m.span()) for i, m in ps.finditer(text)] == _per_pattern(patterns, text)
+        for word in text.split():
+            assert ps.fullmatches(word) == [i for i, p in enumerate(patterns) if p.fullmatch(word)]
+
+
+def test_pattern_set_literal_automaton_matches_per_pattern_scans():
+    rnd = random.Random(1)
+    names = [f"Name{i:03d}" for i in range(logic.LITERAL_AUTOMATON_MIN + 5)]
+    patterns = logic.load_patterns(["SSN"], r"Acct\s*#\s*\d{6,}", "\n".join(names + ["Jane Q Doe"]), False,
+                                   tolerant_literals=True)
+    ps = logic.PatternSet(patterns)
+    assert ps._matcher is not None
+    for _ in range(200):
+        text = " ".join(rnd.choice(names + ["Jane-Q\nDoe", "123-45-6789", "Acct # 1234567", "filler"])
+                        for _ in range(rnd.randint(0, 40)))
+        assert [(i, m.span()) for i, m in ps.finditer(text)] == _per_pattern(patterns, text)
+
+
+
+class _BrokenPool(concurrent.futures.ThreadPoolExecutor):
+    """An executor whose workers all die: every future fails as BrokenProcessPool would."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        future.set_exception(concurrent.futures.BrokenExecutor("worker died"))
+        return future
+
+
+def test_ordered_map_propagates_call_errors_without_repeating_them():
+    calls = []
+    lock = threading.Lock()
+
+    def _fn(x):
+        with lock:
+            calls.append(x)
+        if x == 3:
+            raise ValueError("corrupt file")
+        return x * 10
+
+    with concurrent.futures.ThreadPoolExecutor(2) as pool:
+        got = []
+        with pytest.raises(ValueError):
+            for key, result in logic._ordered_map(_fn, ((i, (i,)) for i in range(6)), pool):
+                got.append((key, result))
+    assert got == [(0, 0), (1, 10), (2, 20)]
+    assert calls.count(3) == 1
+
+
+def test_ordered_map_runs_calls_here_when_the_pool_is_broken():
+    main = threading.get_ident()
+    with _BrokenPool(1) as pool:
+        got = list(logic._ordered_map(lambda x: (x, threading.get_ident()), ((i, (i,)) for i in range(5)), pool))
+    assert got == [(i, (i, main)) for i in range(5)]
+    pool = concurrent.futures.ThreadPoolExecutor(1)
+    pool.shutdown()
+    assert list(logic._ordered_map(lambda x: x + 1, ((i, (i,)) for i in range(3)), pool)) == [(0, 1), (1, 2), (2, 3)]
+
+
+def _pii_pdf():
+    import io
+    from reportlab.pdfgen import canvas
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, invariant=1)
+    c.drawString(72, 720, "Claimant SSN 123-45-6789 on file")
+    c.drawString(72, 700, "Contact j.doe@example.com today")
+    c.save()
+    return buf.getvalue()
+
+
+def _redacted_text(pdf, patterns):
+    out, hits = logic.redact_pdf_bytes(pdf, patterns, require_ssn_context=False)
+    with logic.fitz.open(stream=out, filetype="pdf") as doc:
+        return "".join(page.get_text() for page in doc), {h.matched_text for h in hits}
+
+
+def test_redact_removes_matched_text():
+    text, matched = _redacted_text(_pii_pdf(), logic.load_patterns(["SSN", "Email"], "", "", False))
+    assert matched == {"123-45-6789", "j.doe@example.com"}
+    assert "123-45-6789" not in text and "j.doe@example.com" not in text
+    assert "Claimant SSN" in text and "Contact" in text
+
+
+def test_redact_last_resort_search_tries_variants(monkeypatch):
+    # Neither the words nor the characters line up, so the boxes come from searching the page
+    monkeypatch.setattr(logic._TextBoxes, "_locate", staticmethod(lambda words, text: None))
+    monkeypatch.setattr(logic._TextBoxes, "_page_chars", lambda self: None)
+    search_for = logic.fitz.Page.search_for
+
+    def _search_for(page, needle, **kwargs):
+        # A page whose search text spells the dashes as U+2010
+        if "-" in needle:
+            return []
+        return search_for(page, needle.replace("\u2010", "-"), **kwargs)
+
+    monkeypatch.setattr(logic.fitz.Page, "search_for", _search_for)
+    text, matched = _redacted_text(_pii_pdf(), logic.load_patterns(["SSN"], "", "", False))
+    assert matched == {"123-45-6789"}
+    assert "123-45-6789" not in text and "Claimant SSN" in text
+
+
+def test_redact_each_reports_a_failed_file_once(monkeypatch):
+    redact_file = logic._redact_file
+    calls = []
+
+    def _counted(rel_path, *args, **kwargs):
+        calls.append(rel_path)
+        return redact_file(rel_path, *args, **kwargs)
+
+    monkeypatch.setattr(logic, "_redact_file", _counted)
+    patterns = logic.load_patterns(["SSN"], "", "", False)
+    files = [("bad.pdf", b"%PDF-1.4 not really"), ("good.pdf", _pii_pdf())]
+    with concurrent.futures.ThreadPoolExecutor(2) as pool:
+        results = dict(logic._redact_each(files, patterns, 0, False, executor=pool))
+    assert isinstance(results["bad.pdf"], Exception)
+    assert results["good.pdf"][0] == "good.pdf"
+    assert calls.count("bad.pdf") == 1
+
+
+def test_redact_pdf_ranges_falls_back_only_for_a_broken_pool(monkeypatch):
+    import benchmark
+    pdf = benchmark.make_pii_pdf(3, pii_rate=0.5)
+    patterns = logic.load_patterns(["SSN", "Email"], "", "", False)
+    expected = sorted((h.page_num, h.matched_text) for h in logic.redact_pdf_bytes(pdf, patterns, 0)[1])
+    with _BrokenPool(1) as pool:
+        _, hits = logic.redact_pdf_ranges(pdf, patterns, 0, executor=pool, range_pages=1)
+    assert sorted((h.page_num, h.matched_text) for h in hits) == expected
+
+    def _fail(*args):
+        raise ValueError("OCR failed")
+
+    local = []
+    monkeypatch.setattr(logic, "_redact_range_in_worker", _fail)
+    monkeypatch.setattr(logic, "redact_pdf_bytes", lambda *a, **k: local.append(a))
+    with concurrent.futures.ThreadPoolExecutor(2) as pool, pytest.raises(ValueError):
+        logic.redact_pdf_ranges(pdf, patterns, 0, executor=pool, range_pages=1)
+    assert local == []
+
+
+_LABEL_OPTIONS = dict(prefix="ABC", start_num=1, digits=6, font_name="Helvetica", font_size=10,
+                      color_rgb=(0, 0, 0))
+
+
+def _labels(records):
+    return [(r.rel_dir, r.filename, r.pages_or_files, r.first_label, r.last_label) for r in records]
+
+
+def _label_inputs():
+    import benchmark
+    return [(f"docs/f{i:02d}.pdf", benchmark.make_pii_pdf(1 + i % 3, seed=i)) for i in range(8)]
+
+
+def test_walk_and_label_parallel_matches_sequential(monkeypatch):
+    files = _label_inputs()
+    records, last, pairs, _ = logic.walk_and_label(files, **_LABEL_OPTIONS)
+    main = threading.get_ident()
+    label_file = logic._label_file
+    labeled_here = []
+
+    def _label_file(data, *args, **kwargs):
+        if threading.get_ident() == main:
+            labeled_here.append(args)
+        return label_file(data, *args, **kwargs)
+
+    monkeypatch.setattr(logic, "_label_file", _label_file)
+    for count in (logic._label_count, lambda data, suffix, engine: 1):  # right, then wrong page-count predictions
+        monkeypatch.setattr(logic, "_label_count", count)
+        with concurrent.futures.ThreadPoolExecutor(2) as pool:
+            p_records, p_last, p_pairs, _ = logic.walk_and_label(files, executor=pool, **_LABEL_OPTIONS)
+        assert _labels(p_records) == _labels(records)
+        assert p_last == last == sum(1 + i % 3 for i in range(8))
+        assert [name for name, _ in p_pairs] == [name for name, _ in pairs]
+        # A misprediction resubmits the remaining files to the executor rather than labeling them here
+        assert labeled_here == []
+
+
+def test_walk_and_label_parallel_reads_each_file_once_per_pass(monkeypatch):
+    read_source = logic._read_source
+    reads = []
+    monkeypatch.setattr(logic, "_read_source", lambda src: reads.append(src) or read_source(src))
+    files = _label_inputs()
+    with concurrent.futures.ThreadPoolExecutor(2) as pool:
+        logic.walk_and_label(files, executor=pool, **_LABEL_OPTIONS)
+    assert len(reads) == 2 * len(files)
+
+
+def _label_spans(pdf):
+    """(page rotation, label, bbox, direction) of each label, in unrotated page space."""
+    found = []
+    with logic.fitz.open(stream=pdf, filetype="pdf") as doc:
+        for page in doc:
+            rotation = page.rotation
+            page.set_rotation(0)
+            for block in page.get_text("dict")["blocks"]:
+                for line in block.get("lines", ()):
+                    for span in line["spans"]:
+                        if span["text"].startswith("ABC"):
+                            found.append((rotation, span["text"], tuple(round(v) for v in span["bbox"]),
+                                          tuple(round(v, 3) for v in line["dir"])))
+    return found
+
+
+def test_bates_engines_place_labels_alike_on_rotated_pages():
+    import benchmark
+    with logic.fitz.open(stream=benchmark.make_pdf(4), filetype="pdf") as src:
+        for i, page in enumerate(src):
+            page.set_rotation(90 * i)
+        pdf = src.tobytes()
+    outputs = {}
+    for engine in logic.BATES_ENGINES:
+        records, _, pairs, report = logic.walk_and_label(
+            [("r.pdf", pdf)], engine=engine, zone="Bottom Center (Z2)", border_all_pt=9, **_LABEL_OPTIONS)
+        assert report["engine"] == engine
+        outputs[engine] = _label_spans(pairs[0][1])
+    assert [rotation for rotation, *_ in outputs["pypdf2"]] == [0, 90, 180, 270]
+    assert outputs["pymupdf"] == outputs["pypdf2"]
+
+
+def test_bates_engine_fallback_is_reported():
+    import benchmark
+    _, _, _, report = logic.walk_and_label([("a.pdf", benchmark.make_pdf(1))], engine="pymupdf",
+                                           **dict(_LABEL_OPTIONS, font_name="DejaVuSans"))
+    assert report["engine"] == "pypdf2"
+
+
+def test_walk_and_label_reuses_only_unchanged_files():
+    import io
+    import zipfile
+    import benchmark
+    files = _label_inputs()[:4]
+    _, last, previous, _ = logic.walk_and_label_zip(files, **_LABEL_OPTIONS)
+    with zipfile.ZipFile(io.BytesIO(previous)) as zf:
+        before = {name: zf.read(name) for name, _ in files}
+
+    def _run(inputs, **changes):
+        records, run_last, pairs, report = logic.walk_and_label(inputs, previous=previous,
+                                                                **dict(_LABEL_OPTIONS, **changes))
+        return _labels(records), run_last, dict(pairs), report
+
+    labels, run_last, pairs, report = _run(files)
+    assert (report["files_reused"], report["files_labeled"], run_last) == (4, 0, last)
+    assert pairs == before
+
+    # A changed source is restamped; files whose range still starts at the same number are reused
+    changed = list(files)
+    changed[1] = (files[1][0], benchmark.make_pii_pdf(2, seed=99))
+    changed_labels, _, pairs, report = _run(changed)
+    assert (report["files_reused"], report["files_labeled"]) == (3, 1)
+    assert changed_labels == labels
+    assert pairs[files[1][0]] != before[files[1][0]]
+    assert all(pairs[name] == before[name] for name, _ in files if name != files[1][0])
+
+    # A different page count moves every later range, so those files are restamped too
+    changed[1] = (files[1][0], benchmark.make_pii_pdf(3, seed=99))
+    _, run_last, _, report = _run(changed)
+    assert (report["files_reused"], report["files_labeled"], run_last) == (1, 3, last + 1)
+
+    # Different settings reuse nothing
+    _, _, _, report = _run(files, font_size=11)
+    assert (report["files_reused"], report["files_labeled"]) == (0, 4)
@@ -0,0 +1,54 @@
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def registered():
+    """Metrics created by a test, dropped from the process-wide registry afterwards."""
+    created = []
+    yield created.append
+    for metric in created:
+        metrics._registry.remove(metric)
+
+
+def test_counter_renders_labels_and_escapes_values(registered):
+    requests = metrics.Counter("test_requests_total", "Requests.", ("endpoint", "status"))
+    unlabeled = metrics.Counter("test_pages_total", "Pages.")
+    registered(requests)
+    registered(unlabeled)
+    assert unlabeled.render() == ["# HELP test_pages_total Pages.", "# TYPE test_pages_total counter",
+                                  "test_pages_total 0"]
+    requests.inc(endpoint="/bates", status=200)
+    requests.inc(2, endpoint="/bates", status=200)
+    requests.inc(endpoint='/a"b\\c\nd', status=500)
+    assert requests.render()[2:] == [
+        'test_requests_total{endpoint="/a\\"b\\\\c\\nd",status="500"} 1',
+        'test_requests_total{endpoint="/bates",status="200"} 3',
+    ]
+
+
+def test_histogram_renders_cumulative_buckets(registered):
+    histogram = metrics.Histogram("test_seconds", "Durations.", ("stage",), buckets=(0.1, 1.0))
+    registered(histogram)
+    histogram.observe_many([0.05, 0.1, 0.5, 5.0], stage="ocr")
+    assert histogram.render() == [
+        "# HELP test_seconds Durations.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="ocr",le="0.1"} 2',
+        'test_seconds_bucket{stage="ocr",le="1.0"} 3',
+        'test_seconds_bucket{stage="ocr",le="+Inf"} 4',
+        'test_seconds_sum{stage="ocr"} 5.65',
+        'test_seconds_count{stage="ocr"} 4',
+    ]
+
+
+def test_record_stages_feeds_the_registry():
+    before = metrics.PAGES._values.get((), 0)
+    metrics.record_stages({"timings": {"test_stage": [0.002, 0.003]},
+                           "counters": {"pages_processed": 5, "unknown": 1}})
+    assert metrics.PAGES._values[()] == before + 5
+    text = metrics.render()
+    assert text.endswith("\n")
+    assert 'discovery_stage_duration_seconds_count{stage="test_stage"} 2' in text
+    assert "# TYPE discovery_http_requests_total counter" in text
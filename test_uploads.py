@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+import io
+import time
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+import uploads
+
+CHUNK = uploads.MIN_SESSION_CHUNK
+
+
+def _put(sessions, upload_id, index, data, sha256=None):
+    async def _body():
+        for i in range(0, len(data), 1000):
+            yield data[i:i + 1000]
+
+    return asyncio.run(sessions.put_chunk(upload_id, index, _body(), sha256 or hashlib.sha256(data).hexdigest()))
+
+
+def _status_code(call, *args, **kwargs):
+    with pytest.raises(HTTPException) as e:
+        call(*args, **kwargs)
+    return e.value.status_code
+
+
+def test_chunked_upload_in_any_order(tmp_path):
+    sessions = uploads.UploadSessions(str(tmp_path / "uploads"))
+    data = bytes(range(256)) * (2 * CHUNK // 256) + b"tail"
+    session = sessions.create("../prod.zip", len(data), CHUNK)
+    upload_id = session["id"]
+    assert (session["filename"], session["chunks_total"], session["missing"]) == ("prod.zip", 3, [0, 1, 2])
+
+    status = _put(sessions, upload_id, 2, data[2 * CHUNK:])
+    assert (status["received"], status["missing"], status["ranges"]) == ([2], [0, 1], [[2 * CHUNK, len(data)]])
+    assert _status_code(sessions.finalize, upload_id) == 409  # still incomplete
+    _put(sessions, upload_id, 0, data[:CHUNK])
+    _put(sessions, upload_id, 0, data[:CHUNK])  # a retried chunk replaces the first copy
+    status = _put(sessions, upload_id, 1, data[CHUNK:2 * CHUNK])
+    assert status["missing"] == [] and status["ranges"] == [[0, len(data)]]
+
+    assert _status_code(sessions.finalize, upload_id, sha256="0" * 64) == 422
+    digest = hashlib.sha256(data).hexdigest()
+    status = sessions.finalize(upload_id, sha256=digest)
+    assert (status["status"], status["sha256"]) == ("complete", digest)
+    filename, path, source_digest = sessions.source(upload_id)
+    assert (filename, path.read_bytes(), source_digest) == ("prod.zip", data, digest)
+    assert sessions.finalize(upload_id)["status"] == "complete"  # idempotent
+    assert _status_code(_put, sessions, upload_id, 0, data[:CHUNK]) == 409
+
+
+def test_chunks_of_the_wrong_size_index_or_checksum_are_rejected(tmp_path):
+    sessions = uploads.UploadSessions(str(tmp_path / "uploads"))
+    upload_id = sessions.create("a.pdf", CHUNK + 10, CHUNK)["id"]
+    assert _status_code(_put, sessions, upload_id, 1, b"x" * 11) == 400  # longer than the last chunk
+    assert _status_code(_put, sessions, upload_id, 0, b"x" * (CHUNK - 1)) == 400  # short
+    assert _status_code(_put, sessions, upload_id, 2, b"x" * 10) == 400  # no such chunk
+    assert _status_code(_put, sessions, upload_id, 1, b"x" * 10, sha256="0" * 64) == 422
+    assert sessions.status(upload_id)["received"] == []
+    assert _status_code(sessions.source, upload_id) == 409  # not finalized
+
+
+def test_sessions_are_validated_and_expire(tmp_path):
+    sessions = uploads.UploadSessions(str(tmp_path / "uploads"), ttl_seconds=60)
+    assert _status_code(sessions.create, "a.pdf", 10, CHUNK - 1) == 400
+    assert _status_code(sessions.status, "../../etc") == 404
+    assert _status_code(sessions.status, "0" * 32) == 404
+    stale = sessions.create("a.pdf", 10, CHUNK)["id"]
+    meta = sessions._meta(stale)
+    uploads._write_json(sessions._dir(stale) / "session.json", dict(meta, last_access=time.time() - 120))
+    fresh = sessions.create("b.pdf", 10, CHUNK)["id"]  # creating a session evicts idle ones
+    assert _status_code(sessions.status, stale) == 404
+    assert sessions.status(fresh)["status"] == "open"
+    sessions.delete(fresh)
+    assert _status_code(sessions.status, fresh) == 404
+
+
+def test_spool_keeps_small_uploads_in_memory_and_spills_the_rest(tmp_path, monkeypatch):
+    monkeypatch.setenv("DISCOVERY_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setenv("DISCOVERY_SPOOL_MEMORY_BYTES", "100")
+    monkeypatch.setenv("DISCOVERY_MAX_UPLOAD_BYTES", "1000")
+    spool = uploads.Spool()
+    small, large = b"s" * 60, b"L" * 300
+
+    async def _add(*files):
+        return await spool.add_all([UploadFile(io.BytesIO(data), filename=name) for name, data in files])
+
+    pairs = asyncio.run(_add(("a.pdf", small), ("b.pdf", large), ("c.pdf", small)))
+    assert pairs[0] == ("a.pdf", small)
+    assert pairs[1][0] == "b.pdf" and pairs[1][1].read_bytes() == large and pairs[1][1].parent.parent == spool.dir
+    assert pairs[2][1].read_bytes() == small  # the memory budget is used up
+    assert spool.digests == [(n, hashlib.sha256(d).hexdigest()) for n, d in (("a.pdf", small), ("b.pdf", large),
+                                                                          ("c.pdf", small))]
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(_add(("d.pdf", b"x" * 600)))
+    assert e.value.status_code == 413
+    spool.cleanup()
+    assert not spool.dir.exists()
@@ -0,0 +1,339 @@
+"""
+Upload spooling.
+
+Uploads are streamed in fixed-size chunks into a per-request spool directory
+instead of being read whole with ``await f.read()``. Small uploads stay in
+memory as ``bytes`` until the request's memory budget is used up; everything
+else goes to disk and is handed to logic.py as a path. Outputs are written into
+the same directory, and the whole directory is removed once the response has
+been sent.
+
+Configuration (environment variables):
+- ``DISCOVERY_SPOOL_DIR``: parent directory for spool areas (default: system temp).
+- ``DISCOVERY_SPOOL_MEMORY_BYTES``: upload bytes a single request may keep in
+  RAM before spilling to disk (default: 16 MiB).
+- ``DISCOVERY_MAX_UPLOAD_BYTES``: total upload size accepted per request
+  (default: 0 = unlimited). Larger requests get HTTP 413.
+
+Resumable uploads
+-----------------
+Multi-gigabyte productions can instead be sent in numbered chunks
+(``UploadSessions``). Each chunk carries a SHA-256 and is stored as its own file,
+so chunks may arrive in any order, in parallel, and be retried individually.
+A finalized session is one file on disk that any processing endpoint can use
+by id (``upload_ids`` / ``upload_id`` form fields) without re-uploading it::
+
+    <DISCOVERY_UPLOADS_DIR>/<upload id>/
+        session.json    filename, size, chunk size, status, digest
+        chunks/<n>      received chunks (removed once finalized)
+        data            the assembled file
+
+- ``DISCOVERY_UPLOADS_DIR``: session store (default: ``<temp>/discovery-uploads``).
+- ``DISCOVERY_UPLOADS_TTL_SECONDS``: idle sessions/files are removed after this (default: 24h).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, UploadFile
+
+CHUNK_SIZE = 1024 * 1024
+
+# Resumable upload chunk sizes
+DEFAULT_SESSION_CHUNK = 8 * 1024 * 1024
+MIN_SESSION_CHUNK = 64 * 1024
+MAX_SESSION_CHUNK = 64 * 1024 * 1024
+
+Source = Union[bytes, Path]
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def spool_root() -> Optional[str]:
+    return os.environ.get("DISCOVERY_SPOOL_DIR") or None
+
+
+def memory_budget() -> int:
+    return max(0, _env_int("DISCOVERY_SPOOL_MEMORY_BYTES", 16 * 1024 * 1024))
+
+
+def max_upload_bytes() -> int:
+    return max(0, _env_int("DISCOVERY_MAX_UPLOAD_BYTES", 0))
+
+
+class Spool:
+    """A per-request spool area: uploaded inputs plus any outputs written for the response."""
+
+    def __init__(self) -> None:
+        root = spool_root()
+        if root:
+            os.makedirs(root, exist_ok=True)
+        self.dir = Path(tempfile.mkdtemp(prefix="discovery-", dir=root))
+        self.total_bytes = 0
+        self.memory_bytes = 0
+        self._budget = memory_budget()
+        self._limit = max_upload_bytes()
+        self._counter = 0
+        # (filename, sha256) of every upload in order; the result cache key
+        self.digests: List[Tuple[str, str]] = []
+
+    def path(self, name: str) -> Path:
+        """Path for an output file inside the spool area."""
+        return self.dir / name
+
+    def _new_input_path(self, filename: str) -> Path:
+        # Inputs are stored under generated names; the display name travels with
+        # the (name, source) pair, so client-supplied paths never touch the disk.
+        self._counter += 1
+        inputs = self.dir / "in"
+        inputs.mkdir(exist_ok=True)
+        return inputs / f"{self._counter:06d}{Path(filename or '').suffix.lower()}"
+
+    def _account(self, n: int) -> None:
+        self.total_bytes += n
+        if self._limit and self.total_bytes > self._limit:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload exceeds the {self._limit} byte limit for a single request.",
+            )
+
+    async def add(self, upload: UploadFile) -> Tuple[str, Source]:
+        """Spool one upload; returns (filename, bytes-or-path)."""
+        buf = bytearray()
+        digest = hashlib.sha256()
+        fh = None
+        dest: Optional[Path] = None
+        try:
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                self._account(len(chunk))
+                digest.update(chunk)
+                if fh is None and self.memory_bytes + len(buf) + len(chunk) <= self._budget:
+                    buf.extend(chunk)
+                    continue
+                if fh is None:
+                    dest = self._new_input_path(upload.filename)
+                    fh = open(dest, "wb")
+                    fh.write(buf)
+                    buf = bytearray()
+                fh.write(chunk)
+        finally:
+            if fh is not None:
+                fh.close()
+        self.digests.append((upload.filename, digest.hexdigest()))
+        if dest is not None:
+            return upload.filename, dest
+        self.memory_bytes += len(buf)
+        return upload.filename, bytes(buf)
+
+    async def add_all(self, uploads: List[UploadFile]) -> List[Tuple[str, Source]]:
+        return [await self.add(f) for f in uploads]
+
+    def add_session(self, sessions: "UploadSessions", upload_id: str) -> Tuple[str, Source]:
+        """Use a finalized resumable upload in place (no copy); returns (filename, path)."""
+        filename, path, digest = sessions.source(upload_id)
+        self.digests.append((filename, digest))
+        return filename, path
+
+    def wrap_in_zip(self, name: str, src: Source) -> Path:
+        """Store a single file in an uncompressed ZIP on disk (for ZIP-only logic)."""
+        dest = self.path("input.zip")
+        with zipfile.ZipFile(dest, "w", zipfile.ZIP_STORED) as zf:
+            if isinstance(src, (bytes, bytearray)):
+                zf.writestr(name, src)
+            else:
+                zf.write(src, name)
+        return dest
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _ranges(indices: List[int], chunk_size: int, size: int) -> List[List[int]]:
+    """Collapse received chunk indices into [start, end) byte ranges."""
+    out: List[List[int]] = []
+    for i in indices:
+        start, end = i * chunk_size, min(size, (i + 1) * chunk_size)
+        if out and out[-1][1] == start:
+            out[-1][1] = end
+        else:
+            out.append([start, end])
+    return out
+
+
+class UploadSessions:
+    """On-disk store of resumable, chunked uploads."""
+
+    def __init__(self, root: Optional[str] = None, ttl_seconds: Optional[int] = None):
+        self.root = Path(root or os.environ.get("DISCOVERY_UPLOADS_DIR") or Path(tempfile.gettempdir(), "discovery-uploads"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else _env_int("DISCOVERY_UPLOADS_TTL_SECONDS", 24 * 3600)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _dir(self, upload_id: str) -> Path:
+        if len(upload_id) != 32 or not all(c in "0123456789abcdef" for c in upload_id):
+            raise HTTPException(status_code=404, detail="Unknown upload.")
+        return self.root / upload_id
+
+    def _meta(self, upload_id: str) -> Dict[str, Any]:
+        meta = _read_json(self._dir(upload_id) / "session.json")
+        if meta is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired upload.")
+        return meta
+
+    def _update(self, upload_id: str, **fields: Any) -> Dict[str, Any]:
+        with self._lock:
+            meta = self._meta(upload_id)
+            meta.update(fields, last_access=time.time())
+            _write_json(self._dir(upload_id) / "session.json", meta)
+            return meta
+
+    def create(self, filename: str, size: int, chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        self.evict()
+        chunk_size = chunk_size or DEFAULT_SESSION_CHUNK
+        if size < 0 or not MIN_SESSION_CHUNK <= chunk_size <= MAX_SESSION_CHUNK:
+            raise HTTPException(
+                status_code=400,
+                detail=f"size must be >= 0 and chunk_size between {MIN_SESSION_CHUNK} and {MAX_SESSION_CHUNK} bytes.",
+            )
+        upload_id = uuid.uuid4().hex
+        d = self._dir(upload_id)
+        (d / "chunks").mkdir(parents=True)
+        now = time.time()
+        _write_json(d / "session.json", {
+            "id": upload_id, "filename": Path(filename).name or "upload", "size": size, "chunk_size": chunk_size,
+            "chunks_total": max(1, -(-size // chunk_size)), "status": "open", "created_at": now, "last_access": now,
+        })
+        return self.status(upload_id)
+
+    def _received(self, upload_id: str) -> List[int]:
+        chunks = self._dir(upload_id) / "chunks"
+        if not chunks.exists():
+            return []
+        return sorted(int(p.name) for p in chunks.iterdir() if p.name.isdigit())
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        meta = self._meta(upload_id)
+        view = {k: meta[k] for k in ("id", "filename", "size", "chunk_size", "chunks_total", "status")}
+        if meta["status"] == "complete":
+            view.update(sha256=meta["sha256"], received=list(range(meta["chunks_total"])), missing=[],
+                        ranges=[[0, meta["size"]]] if meta["size"] else [])
+            return view
+        received = self._received(upload_id)
+        have = set(received)
+        view.update(
+            received=received,
+            missing=[i for i in range(meta["chunks_total"]) if i not in have],
+            ranges=_ranges(received, meta["chunk_size"], meta["size"]),
+        )
+        return view
+
+    async def put_chunk(self, upload_id: str, index: int, body: AsyncIterator[bytes], sha256: str) -> Dict[str, Any]:
+        """Store chunk `index` if its SHA-256 matches; re-sending a chunk replaces it."""
+        meta = self._meta(upload_id)
+        if meta["status"] != "open":
+            raise HTTPException(status_code=409, detail="Upload is already finalized.")
+        if not 0 <= index < meta["chunks_total"]:
+            raise HTTPException(status_code=400, detail=f"Chunk index must be between 0 and {meta['chunks_total'] - 1}.")
+        expected = min(meta["chunk_size"], meta["size"] - index * meta["chunk_size"])
+        chunks = self._dir(upload_id) / "chunks"
+        tmp = chunks / f".{index}.{uuid.uuid4().hex}.tmp"
+        digest = hashlib.sha256()
+        n = 0
+        try:
+            with open(tmp, "wb") as fh:
+                async for piece in body:
+                    n += len(piece)
+                    if n > expected:
+                        raise HTTPException(status_code=400, detail=f"Chunk {index} must be {expected} bytes.")
+                    digest.update(piece)
+                    fh.write(piece)
+            if n != expected:
+                raise HTTPException(status_code=400, detail=f"Chunk {index} must be {expected} bytes, got {n}.")
+            if digest.hexdigest() != (sha256 or "").strip().lower():
+                raise HTTPException(status_code=422, detail=f"Checksum mismatch for chunk {index}; please resend it.")
+            os.replace(tmp, chunks / str(index))
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        self._update(upload_id)
+        return self.status(upload_id)
+
+    def finalize(self, upload_id: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Assemble the chunks into one file (blocking; run off the event loop)."""
+        meta = self._meta(upload_id)
+        if meta["status"] == "complete":
+            return self.status(upload_id)
+        status = self.status(upload_id)
+        if status["missing"]:
+            raise HTTPException(status_code=409, detail={"message": "Upload is incomplete.", "missing": status["missing"]})
+        d = self._dir(upload_id)
+        digest = hashlib.sha256()
+        tmp = d / ".data.tmp"
+        with open(tmp, "wb") as out:
+            for i in range(meta["chunks_total"]):
+                with open(d / "chunks" / str(i), "rb") as fh:
+                    while True:
+                        piece = fh.read(CHUNK_SIZE)
+                        if not piece:
+                            break
+                        digest.update(piece)
+                        out.write(piece)
+        if sha256 and digest.hexdigest() != sha256.strip().lower():
+            tmp.unlink()
+            raise HTTPException(status_code=422, detail="Checksum mismatch for the assembled file.")
+        os.replace(tmp, d / "data")
+        shutil.rmtree(d / "chunks", ignore_errors=True)
+        self._update(upload_id, status="complete", sha256=digest.hexdigest())
+        return self.status(upload_id)
+
+    def source(self, upload_id: str) -> Tuple[str, Path, str]:
+        """(filename, path, sha256) of a finalized upload, for use as a processing input."""
+        meta = self._meta(upload_id)
+        if meta["status"] != "complete":
+            raise HTTPException(status_code=409, detail=f"Upload {upload_id} is not finalized.")
+        self._update(upload_id)
+        return meta["filename"], self._dir(upload_id) / "data", meta["sha256"]
+
+    def delete(self, upload_id: str) -> None:
+        self._meta(upload_id)
+        shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+
+    def evict(self) -> None:
+        """Remove sessions (finished or not) idle for longer than the TTL."""
+        now = time.time()
+        for d in list(self.root.iterdir()):
+            meta = _read_json(d / "session.json")
+            last = meta.get("last_access", 0) if meta else d.stat().st_mtime
+            if now - last > self.ttl_seconds:
+                shutil.rmtree(d, ignore_errors=True)
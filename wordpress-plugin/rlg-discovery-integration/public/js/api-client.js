@@ -20,7 +20,8 @@ jQuery(document).ready(function ($) {
         pdfDoc: null,        // Current PDF document
         currentPage: 1,
         totalPages: 1,
-        renderedImage: null  // Rendered page as Image object
+        renderedImage: null, // Rendered page as Image object
+        estimatedSeconds: undefined // Server's run-time estimate from /bates/plan
     };
 
     function formatBatesLabel(prefix, startNum, digits) {
@@ -115,6 +116,11 @@ jQuery(document).ready(function ($) {
         var infoText = files.length + ' file' + (files.length !== 1 ? 's' : '');
         if (hasLoadingFiles) {
             infoText += ' (loading page counts...)';
+        } else {
+            infoText += ', ' + (currentNum - startNum) + ' pages';
+            if (batesPreviewState.estimatedSeconds !== undefined) {
+                infoText += ' (about ' + Math.max(1, Math.ceil(batesPreviewState.estimatedSeconds)) + 's to label)';
+            }
         }
         $indexPreview.find('.rlg-preview-info').html(infoText);
 
@@ -391,10 +397,39 @@ jQuery(document).ready(function ($) {
         }
     }
 
+    // Page counts from the server's dry run (/bates/plan), which reads only each
+    // PDF's page tree; resolves false so the caller can fall back to pdf.js.
+    function loadPlannedPageCounts(zipFile) {
+        var files = batesPreviewState.files;
+        var base = typeof rlgSettings !== 'undefined' ? rlgSettings.apiUrl : '';
+        if (!zipFile || zipFile.size > CHUNKED_THRESHOLD) return Promise.resolve(false);
+
+        var formData = new FormData();
+        formData.append('files', zipFile);
+        return fetch(base + '/bates/plan', { method: 'POST', body: formData })
+            .then(checkResponse)
+            .then(function(response) { return response.json(); })
+            .then(function(plan) {
+                if (batesPreviewState.files !== files) return true; // a different upload was chosen meanwhile
+                var pages = {};
+                plan.files.forEach(function(row) {
+                    pages[row.rel_dir === '.' ? row.filename : row.rel_dir + '/' + row.filename] = row.pages;
+                });
+                var complete = files.every(function(file) { return pages[file.fullPath || file.name] !== undefined; });
+                if (!complete) return false;
+                files.forEach(function(file) { file.pageCount = pages[file.fullPath || file.name]; });
+                batesPreviewState.estimatedSeconds = plan.estimated_seconds;
+                generateBatesIndexPreview();
+                return true;
+            })
+            .catch(function() { return false; });
+    }
+
     // Load page counts for all files in batesPreviewState.files
-    async function loadAllPageCounts() {
+    async function loadAllPageCounts(zipFile) {
         var files = batesPreviewState.files;
         if (!files || files.length === 0) return;
+        if (await loadPlannedPageCounts(zipFile)) return;
 
         var loadPromises = files.map(function(file, index) {
             return new Promise(function(resolve) {
@@ -509,6 +544,7 @@ jQuery(document).ready(function ($) {
 
                 batesPreviewState.files = files;
                 batesPreviewState.currentFileIndex = 0;
+                batesPreviewState.estimatedSeconds = undefined;
 
                 // Show index preview immediately (with loading indicators)
                 generateBatesIndexPreview();
@@ -517,7 +553,7 @@ jQuery(document).ready(function ($) {
                 loadFileAtIndex(0);
 
                 // Load page counts for all files in background
-                loadAllPageCounts();
+                loadAllPageCounts(firstFile);
             };
             reader.readAsArrayBuffer(firstFile);
 
@@ -742,6 +778,177 @@ jQuery(document).ready(function ($) {
         }
     })();
 
+    // =========================================================================
+    // BACKGROUND JOBS
+    // Long runs outlive request timeouts, so tools are submitted to
+    // /jobs/<tool>, polled for progress and downloaded when done.
+    // =========================================================================
+    var JOB_POLL_MS = 1000;
+
+    function checkResponse(response) {
+        if (!response.ok) {
+            return response.json().catch(function() { return {}; }).then(function(body) {
+                var detail = body.detail && body.detail.message ? body.detail.message : body.detail;
+                throw new Error(detail || ('Network response was not ok: ' + response.statusText));
+            });
+        }
+        return response;
+    }
+
+    function describeProgress(progress) {
+        if (!progress || progress.files_total === undefined) return 'Processing...';
+        var text = 'Processing file ' + Math.min(progress.files_done + 1, progress.files_total) + ' of ' + progress.files_total;
+        if (progress.current_pages_total) {
+            text += ' (page ' + progress.current_pages_done + ' of ' + progress.current_pages_total + ')';
+        }
+        return text + '...';
+    }
+
+    // =========================================================================
+    // RESUMABLE UPLOADS
+    // Files above CHUNKED_THRESHOLD are sent to /uploads in checksummed chunks
+    // (a few in parallel, each retried on failure) and then referenced by id.
+    // The session id is remembered, so re-submitting the same file after a
+    // dropped connection only sends the chunks that are still missing.
+    // =========================================================================
+    var CHUNKED_THRESHOLD = 32 * 1024 * 1024;
+    var CHUNK_BYTES = 8 * 1024 * 1024;
+    var CHUNK_PARALLEL = 3;
+    var CHUNK_RETRIES = 5;
+
+    function sha256Hex(buffer) {
+        return crypto.subtle.digest('SHA-256', buffer).then(function(hash) {
+            return Array.prototype.map.call(new Uint8Array(hash), function(b) {
+                return ('0' + b.toString(16)).slice(-2);
+            }).join('');
+        });
+    }
+
+    function uploadSession(base, file) {
+        var storageKey = 'rlg-upload:' + file.name + ':' + file.size + ':' + file.lastModified;
+        var known = window.localStorage ? localStorage.getItem(storageKey) : null;
+
+        function create() {
+            var body = new FormData();
+            body.append('filename', file.name);
+            body.append('size', file.size);
+            body.append('chunk_size', CHUNK_BYTES);
+            return fetch(base + '/uploads', { method: 'POST', body: body })
+                .then(checkResponse)
+                .then(function(response) { return response.json(); })
+                .then(function(session) {
+                    if (window.localStorage) localStorage.setItem(storageKey, session.id);
+                    return session;
+                });
+        }
+
+        if (!known) return create();
+        return fetch(base + '/uploads/' + known)
+            .then(function(response) { return response.ok ? response.json() : create(); })
+            .catch(create);
+    }
+
+    function uploadResumable(base, file, onProgress) {
+        return uploadSession(base, file).then(function(session) {
+            if (session.status === 'complete') return session.id;
+
+            var queue = session.missing.slice();
+            var done = session.chunks_total - queue.length;
+
+            function putChunk(index, attempt) {
+                var start = index * session.chunk_size;
+                var blob = file.slice(start, Math.min(file.size, start + session.chunk_size));
+                return new Response(blob).arrayBuffer()
+                    .then(function(buffer) {
+                        return sha256Hex(buffer).then(function(sum) {
+                            return fetch(base + '/uploads/' + session.id + '/chunks/' + index, {
+                                method: 'PUT',
+                                headers: { 'X-Chunk-SHA256': sum },
+                                body: buffer
+                            });
+                        });
+                    })
+                    .then(checkResponse)
+                    .catch(function(error) {
+                        if (attempt >= CHUNK_RETRIES) throw error;
+                        return new Promise(function(resolve) { setTimeout(resolve, 1000 * Math.pow(2, attempt)); })
+                            .then(function() { return putChunk(index, attempt + 1); });
+                    });
+            }
+
+            function worker() {
+                if (!queue.length) return Promise.resolve();
+                var index = queue.shift();
+                return putChunk(index, 0).then(function() {
+                    done += 1;
+                    onProgress(done, session.chunks_total);
+                    return worker();
+                });
+            }
+
+            var workers = [];
+            for (var i = 0; i < CHUNK_PARALLEL; i++) workers.push(worker());
+            return Promise.all(workers)
+                .then(function() { return fetch(base + '/uploads/' + session.id + '/finalize', { method: 'POST' }); })
+                .then(checkResponse)
+                .then(function() { return session.id; });
+        });
+    }
+
+    // Replace large files in the form with finalized upload ids
+    function prepareUploads(base, formData, $status) {
+        var large = [];
+        formData.forEach(function(value, key) {
+            if ((key === 'files' || key === 'file') && value instanceof File && value.size > CHUNKED_THRESHOLD) {
+                large.push({ key: key, file: value });
+            }
+        });
+        if (!large.length) return Promise.resolve(formData);
+
+        var ids = { files: [], file: [] };
+        return large.reduce(function(previous, item) {
+            return previous.then(function() {
+                return uploadResumable(base, item.file, function(done, total) {
+                    $status.html('<span class="rlg-status loading">Uploading ' + item.file.name + ' (' +
+                        Math.round(100 * done / total) + '%)... <span class="rlg-spinner"></span></span>');
+                }).then(function(id) { ids[item.key].push(id); });
+            });
+        }, Promise.resolve()).then(function() {
+            var prepared = new FormData();
+            formData.forEach(function(value, key) {
+                var isLarge = large.some(function(item) { return item.file === value; });
+                if (!isLarge) prepared.append(key, value);
+            });
+            if (ids.files.length) prepared.append('upload_ids', ids.files.join(','));
+            if (ids.file.length) prepared.append('upload_id', ids.file[0]);
+            return prepared;
+        });
+    }
+
+    function runJob(endpoint, formData, $status) {
+        var base = typeof rlgSettings !== 'undefined' ? rlgSettings.apiUrl : '';
+
+        function poll(jobId) {
+            return new Promise(function(resolve) { setTimeout(resolve, JOB_POLL_MS); })
+                .then(function() { return fetch(base + '/jobs/' + jobId).then(checkResponse); })
+                .then(function(response) { return response.json(); })
+                .then(function(job) {
+                    if (job.status === 'failed') throw new Error(job.error || 'Job failed');
+                    if (job.status === 'done') {
+                        return fetch(base + job.result.url).then(checkResponse).then(function(r) { return r.blob(); });
+                    }
+                    $status.html('<span class="rlg-status loading">' + describeProgress(job.progress) + ' <span class="rlg-spinner"></span></span>');
+                    return poll(jobId);
+                });
+        }
+
+        return prepareUploads(base, formData, $status)
+            .then(function(prepared) { return fetch(base + '/jobs' + endpoint, { method: 'POST', body: prepared }); })
+            .then(checkResponse)
+            .then(function(response) { return response.json(); })
+            .then(function(job) { return poll(job.id); });
+    }
+
     // =========================================================================
     // FORM SUBMISSION HANDLER
     // =========================================================================
@@ -772,16 +979,7 @@ jQuery(document).ready(function ($) {
         $status.html('<span class="rlg-status loading">Processing... <span class="rlg-spinner"></span></span>');
         $btn.prop('disabled', true);
 
-        fetch(apiUrl, {
-            method: 'POST',
-            body: formData
-        })
-            .then(function(response) {
-                if (!response.ok) {
-                    throw new Error('Network response was not ok: ' + response.statusText);
-                }
-                return response.blob();
-            })
+        runJob(endpoint, formData, $status)
             .then(function(blob) {
                 if (endpoint === '/bates') {
                     lastBatesOutput = blob;
@@ -226,6 +226,12 @@ function rlg_shortcode_redact($atts) {
                         Case Sensitive
                     </label>
                 </div>
+                <div class="rlg-form-group rlg-checkbox-toggle">
+                    <label>
+                        <input type="checkbox" name="tolerant_literals">
+                        Match Literals Across Line Breaks and Dashes
+                    </label>
+                </div>
             </section>
             <section class="rlg-section-flex">
                 <h4>SSN Options</h4>
@@ -0,0 +1,111 @@
+"""
+Process-pool execution layer for the CPU-bound work in logic.py.
+
+Every endpoint in main.py is ``async``. Calling PDF parsing, stamping, OCR or
+redaction directly on the event loop blocks every other request on the worker,
+including ``GET /`` health checks. ``run`` ships a call to a shared
+``ProcessPoolExecutor`` and awaits the result without blocking the loop.
+Stage timings recorded by logic.py during the call travel back with the result
+and are folded into metrics.py.
+
+Configuration (environment variables):
+- ``DISCOVERY_WORKERS``: number of worker processes (default: CPU count).
+  ``0`` runs work in the event loop's default thread pool instead, which keeps
+  the loop responsive for I/O but shares the GIL with it (handy for debugging).
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import metrics
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def worker_count() -> int:
+    """Configured number of worker processes (0 = thread pool fallback)."""
+    return max(0, _env_int("DISCOVERY_WORKERS", os.cpu_count() or 1))
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[Executor]:
+    """Return the shared process pool, creating it on first use.
+
+    Returns None when ``DISCOVERY_WORKERS=0`` (thread pool fallback).
+    """
+    global _pool
+    n = worker_count()
+    if n == 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # "spawn" avoids forking a process that already runs uvicorn's
+            # event loop and threads.
+            _pool = ProcessPoolExecutor(
+                max_workers=n,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown(wait: bool = True) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait, cancel_futures=True)
+            _pool = None
+
+
+def _call_with_metrics(call: Callable[[], Any]) -> Tuple[Any, Dict[str, Dict]]:
+    import logic
+    with logic.collect_metrics() as data:
+        result = call()
+    return result, {"timings": dict(data["timings"]), "counters": dict(data["counters"])}
+
+
+def pool_executor() -> Optional[Executor]:
+    """The shared pool when it has more than one worker for a call to fan its files and page ranges out to."""
+    return get_pool() if worker_count() > 1 else None
+
+
+async def run_local(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, Dict[str, Dict]]:
+    """Run ``fn(*args, **kwargs)`` in a thread of this process; returns its result
+    and the stage metrics it recorded (already added to ``/metrics``).
+
+    For calls that fan their CPU-bound parts out to the pool themselves
+    (``logic.walk_and_label``, ``logic.process_zip_bytes`` or ``logic.run_pipeline``
+    with ``executor=pool_executor()``); a worker process cannot submit to the
+    pool it belongs to.
+    """
+    call = functools.partial(fn, *args, **kwargs)
+    result, stages = await asyncio.to_thread(_call_with_metrics, call)
+    metrics.record_stages(stages)
+    return result, stages
+
+
+async def run(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, Dict[str, Dict]]:
+    """Run ``fn(*args, **kwargs)`` in the worker pool and await its result and
+    stage metrics, as ``run_local`` does.
+
+    ``fn`` and its arguments must be picklable (module-level functions in
+    logic.py, bytes, paths, compiled regexes, plain containers).
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs)
+    result, stages = await loop.run_in_executor(get_pool(), functools.partial(_call_with_metrics, call))
+    metrics.record_stages(stages)
+    return result, stages